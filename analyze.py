@@ -0,0 +1,66 @@
+"""Analyze many positions with strategy_ultimate.analyze_batch.
+
+    python analyze.py games.qlog --budget 0.5 --workers 4
+    python analyze.py states.jsonl --out analysis.jsonl
+    cat states.jsonl | python analyze.py -
+
+The input is a game log written with --game-log, or JSON lines holding
+one state each ({"board": [...], "piece": ...}, optionally wrapped as
+{"state": {...}}). One JSON line is written per input state, in input
+order: the state, the move, its score for the side to move, the search
+depth, the node count and the principal variation.
+"""
+
+import argparse
+import itertools
+import json
+import sys
+import time
+
+import strategy_ultimate
+from game_log import MAGIC, iter_records, record_state
+
+def iter_states(path):
+    """Stream the states of a game log or of a JSON lines file ('-' for stdin)."""
+    if path != '-':
+        with open(path, 'rb') as f:
+            is_log = f.read(len(MAGIC)) == MAGIC
+        if is_log:
+            for _, codes, pending, _, _ in iter_records(path):
+                yield record_state(codes, pending)
+            return
+    with (sys.stdin if path == '-' else open(path, encoding='utf8')) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                obj = json.loads(line)
+                yield obj.get('state', obj)
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze Quarto positions with strategy_ultimate')
+    parser.add_argument('input', help="Game log or JSON lines file of states ('-' for stdin)")
+    parser.add_argument('--budget', type=float, default=1.0, help='Search time per state, in seconds')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (0 = no pool)')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many states')
+    parser.add_argument('--out', default=None, help='Output JSON lines file (default: stdout)')
+    args = parser.parse_args()
+
+    states = itertools.islice(iter_states(args.input), args.limit)
+    # The states are both analyzed and echoed in the output
+    states, echoed = itertools.tee(states)
+    out = open(args.out, 'w', encoding='utf8') if args.out else sys.stdout
+    start = time.perf_counter()
+    count = errors = 0
+    try:
+        for state, result in zip(echoed, strategy_ultimate.analyze_batch(states, args.budget, args.workers)):
+            out.write(json.dumps(dict(result, state=state)) + '\n')
+            out.flush()
+            count += 1
+            errors += 'error' in result
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"[ANALYZE] {count} positions, {errors} erreurs en {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Compare the kernel backends of kernels.py: same results, different speeds.
+
+    python bench_kernels.py
+    python bench_kernels.py --states 20000 --backends python,numba
+
+Every backend runs in its own process (the backend is chosen when
+kernels.py is imported) on the same random states (fuzz.random_state
+with --seed). For each kernel it reports a digest of all the results,
+which must be equal across backends, the time per call, and the time of
+the first call, which includes the JIT compilation with Numba.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+BACKENDS = ('python', 'numba')
+
+def corpus(states, seed):
+    """(codes, empty squares mask, available pieces mask) of random states."""
+    import codec
+    import fuzz
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(states):
+        codes, _, available = codec.decode_state(fuzz.random_state(rng))
+        empties = sum(1 << i for i, c in enumerate(codes) if c == codec.EMPTY)
+        cases.append((tuple(codes), empties, available))
+    return cases
+
+def kernel_calls():
+    """Kernel name -> function of a corpus case."""
+    import kernels
+    return {
+        'is_win': lambda codes, empties, available: kernels.is_win(codes),
+        'scan': lambda codes, empties, available: kernels.scan(codes),
+        'winning_squares': lambda codes, empties, available: kernels.winning_squares(codes, empties, available),
+        'losing_pieces': lambda codes, empties, available: kernels.losing_pieces(codes, empties, available),
+        'line_states': lambda codes, empties, available: kernels.line_states(codes),
+    }
+
+def run_backend(states, seed):
+    """Digest, seconds per call and first call seconds of every kernel, with this process's backend."""
+    cases = corpus(states, seed)
+    report = {}
+    for name, call in kernel_calls().items():
+        start = time.perf_counter()
+        call(*cases[0])
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        results = [call(*case) for case in cases]
+        seconds = time.perf_counter() - start
+        digest = hashlib.sha1(repr([tuple(r) if isinstance(r, list) else r for r in results]).encode()).hexdigest()
+        report[name] = {'digest': digest, 'per_call': seconds / len(cases), 'first_call': first}
+    return report
+
+def measure(backend, states, seed):
+    """run_backend in a child process using backend; None if the backend is not available."""
+    env = dict(os.environ, QUARTO_KERNELS=backend)
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', '--states', str(states), '--seed', str(seed)],
+        env=env, capture_output=True, text=True, check=True,
+    ).stdout
+    result = json.loads(out.splitlines()[-1])
+    return result['report'] if result['backend'] == backend else None
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the kernel backends')
+    parser.add_argument('--states', type=int, default=5000, help='Random states per kernel')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random states')
+    parser.add_argument('--backends', default=','.join(BACKENDS), help='Comma-separated backends to compare')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import kernels
+        print(json.dumps({'backend': kernels.BACKEND, 'report': run_backend(args.states, args.seed)}))
+        return
+
+    reports = {}
+    for backend in args.backends.split(','):
+        report = measure(backend, args.states, args.seed)
+        if report is None:
+            print(f"[BENCH] backend {backend} indisponible")
+        else:
+            reports[backend] = report
+    if not reports:
+        raise SystemExit(1)
+    names = next(iter(reports.values()))
+    identical = True
+    print(f"[BENCH] {args.states} états, graine {args.seed}")
+    for name in names:
+        digests = {report[name]['digest'] for report in reports.values()}
+        identical &= len(digests) == 1
+        timings = ', '.join(f"{backend} {report[name]['per_call'] * 1e6:.2f} µs "
+                            f"(1er appel {report[name]['first_call'] * 1000:.1f} ms)"
+                            for backend, report in reports.items())
+        print(f"  {name:16} {'identiques' if len(digests) == 1 else 'DIFFÉRENTS'}: {timings}")
+    raise SystemExit(0 if identical else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark of the strategy_ultimate search features.
+
+    python bench_search.py --budget 0.5
+
+The benchmark positions are middlegame and endgame states reached by
+seeded random play (no line completed, no piece completing a line), so
+they are the same on every run. Each configuration of SEARCH_FLAGS
+searches every position by iterative deepening from a cold table:
+
+- for --budget seconds, reporting the mean depth completed (the effective
+  depth gain is the difference with the baseline, which has every
+  feature disabled);
+- up to --depth full moves, reporting the mean time taken and how often
+  the move is the one of the baseline at that depth.
+"""
+
+import argparse
+import random
+import time
+
+import strategy_ultimate
+
+# Module flags of strategy_ultimate toggled by the configurations
+SEARCH_FLAGS = ('NULL_WINDOW_SEARCH', 'LATE_MOVE_REDUCTIONS', 'THREAT_EXTENSIONS')
+CONFIGURATIONS = (
+    ('baseline', ()),
+    ('null window', ('NULL_WINDOW_SEARCH',)),
+    ('null window + LMR', ('NULL_WINDOW_SEARCH', 'LATE_MOVE_REDUCTIONS')),
+    ('threat extensions', ('THREAT_EXTENSIONS',)),
+    ('all', SEARCH_FLAGS),
+)
+# Pieces on the board of the benchmark positions
+FILLED = (5, 6, 7, 8, 9, 10)
+
+def benchmark_positions(per_filling=4, seed=0):
+    """States with FILLED pieces where the side to move cannot win at once."""
+    rng = random.Random(seed)
+    pieces = sorted(strategy_ultimate.get_all_pieces())
+    positions = []
+    for filled in FILLED:
+        found = 0
+        while found < per_filling:
+            board = [None] * 16
+            order = rng.sample(pieces, filled + 1)
+            for pos, piece in zip(rng.sample(range(16), filled), order):
+                board[pos] = piece
+            threats = strategy_ultimate.threat_lines(board)
+            if strategy_ultimate.is_winning(board) or strategy_ultimate.completing_position(threats, order[-1]):
+                continue
+            positions.append({'board': board, 'piece': order[-1]})
+            found += 1
+    return positions
+
+def deepest_search(state, budget, max_depth=16):
+    """Iterative deepening from a cold table; returns (depth completed, nodes, pos, piece)."""
+    strategy_ultimate.transposition_table.clear()
+    strategy_ultimate.history.clear()
+    strategy_ultimate.last_search['nodes'] = 0
+    board = state['board']
+    available = sorted(strategy_ultimate.get_all_pieces() - set(board) - {state['piece']})
+    empties = board.count(None)
+    start = time.time()
+    depth_done, move = 0, (None, None)
+    for depth in range(1, min(max_depth, empties) + 1):
+        pos, piece, _ = strategy_ultimate.minimax_with_pruning(
+            board, state['piece'], available, depth,
+            float('-inf'), float('inf'), True, depth, start, budget
+        )
+        if time.time() - start > budget:
+            break
+        depth_done, move = depth, (pos, piece)
+    return depth_done, strategy_ultimate.last_search['nodes'], move[0], move[1]
+
+def set_flags(enabled):
+    for flag in SEARCH_FLAGS:
+        setattr(strategy_ultimate, flag, flag in enabled)
+
+def run(positions, budget, fixed_depth=4):
+    """
+    Per configuration: (name, mean depth in budget, mean nodes in budget,
+    mean seconds to fixed_depth, share of moves at fixed_depth equal to the baseline's).
+    """
+    saved = {flag: getattr(strategy_ultimate, flag) for flag in SEARCH_FLAGS}
+    rows = []
+    baseline = None
+    try:
+        for name, enabled in CONFIGURATIONS:
+            set_flags(enabled)
+            results = [deepest_search(state, budget) for state in positions]
+            start = time.time()
+            fixed = [deepest_search(state, float('inf'), fixed_depth)[2:] for state in positions]
+            seconds = time.time() - start
+            if baseline is None:
+                baseline = fixed
+            same = sum(r == b for r, b in zip(fixed, baseline))
+            rows.append((
+                name,
+                sum(r[0] for r in results) / len(results),
+                sum(r[1] for r in results) / len(results),
+                seconds / len(positions),
+                same / len(positions),
+            ))
+    finally:
+        for flag, value in saved.items():
+            setattr(strategy_ultimate, flag, value)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the strategy_ultimate search features')
+    parser.add_argument('--budget', type=float, default=0.5, help='Search time per position, in seconds')
+    parser.add_argument('--depth', type=int, default=4, help='Fixed depth of the timed searches, in full moves')
+    parser.add_argument('--positions', type=int, default=4, help='Positions per number of pieces on the board')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the benchmark positions')
+    args = parser.parse_args()
+
+    positions = benchmark_positions(args.positions, args.seed)
+    print(f"[BENCH] {len(positions)} positions, {args.budget}s par position")
+    print(f"{'configuration':<20} {'profondeur':>10} {'noeuds':>10} "
+          f"{f'temps p{args.depth}':>10} {f'même coup p{args.depth}':>14}")
+    for name, depth, nodes, seconds, same in run(positions, args.budget, args.depth):
+        print(f"{name:<20} {depth:>10.2f} {nodes:>10.0f} {seconds:>9.3f}s {same:>14.0%}")
+
+if __name__ == '__main__':
+    main()
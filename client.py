@@ -4,6 +4,11 @@ import json
 import random
 import strategy
 import sys
+import time
+from memory_budget import add_memory_arguments, budget_from_args, report_memory
+from move_cache import MoveCache
+from profiler import add_profile_arguments, close_profiler, profiler_from_args
+from startup import seconds_since_start
 from datetime import datetime
 
 async def readJSON(reader):
@@ -23,9 +28,11 @@ async def writeJSON(writer, obj):
     writer.write(message)
     await writer.drain()
 
-async def handle_connection(reader, writer):
+async def handle_connection(reader, writer, cache=None, recorder=None, metrics=None, profiler=None):
     request = await readJSON(reader)
     req_type = request.get('request')
+    if metrics is not None:
+        metrics.request(req_type if req_type in ('ping', 'play') else 'unknown')
     if req_type == 'ping':
         print('[PING]')
         await writeJSON(writer, {'response': 'pong'})
@@ -33,14 +40,38 @@ async def handle_connection(reader, writer):
         state = request.get('state')
         print(f"[PLAY] Etat reçu: {state}")
         try:
-            move = strategy.gen_move(state)
+            start = time.perf_counter()
+            move = cache.lookup(state) if cache is not None else None
+            if move is not None:
+                print(f"[CACHE] Coup trouvé en cache: {move}")
+                source = 'cache'
+            else:
+                if profiler is not None:
+                    move = profiler.call(strategy.gen_move, state)
+                else:
+                    move = strategy.gen_move(state)
+                if cache is not None:
+                    cache.store(state, move)
+                source = 'search'
+            if metrics is not None:
+                metrics.move(source, time.perf_counter() - start, strategy)
             print(f"[MOVE] Coup proposé: {move}")
+            if recorder is not None:
+                # A log that cannot be written must not cost the move
+                try:
+                    recorder.record(state, move)
+                except OSError as e:
+                    print(f"[LOG] Écriture du journal de partie impossible: {e}")
             await writeJSON(writer, {'response': 'move', 'move': move})
         except Exception as e:
             print(f"[ERROR] Erreur lors de la génération du coup: {e}")
+            if metrics is not None:
+                metrics.error('play')
             await writeJSON(writer, {'response': 'error', 'error': str(e)})
     else:
         print(f"[ERROR] Requête inconnue: {req_type}")
+        if metrics is not None:
+            metrics.error('unknown_request')
         await writeJSON(writer, {'response': 'error', 'error': f"Unknown request '{req_type}'"})
     writer.close()
     await writer.wait_closed()
@@ -118,6 +149,24 @@ async def subscribe(host, port_server, port_client, name, matricules, max_retrie
     
     return False
 
+def load_move_cache(size, path=None):
+    """Create the move cache, warm-loaded from path if given."""
+    if size <= 0:
+        return None
+    cache = MoveCache(size)
+    if path:
+        print(f"[CACHE] {cache.load(path)} coups chargés depuis {path}")
+    return cache
+
+def close_move_cache(cache, path=None):
+    """Report cache metrics and save it to path if given."""
+    if cache is None:
+        return
+    stats = cache.stats()
+    print(f"[CACHE] hits={stats['hits']} misses={stats['misses']} ratio={stats['hit_ratio']:.1%} entries={stats['entries']}")
+    if path:
+        cache.save(path)
+
 async def main():
     parser = argparse.ArgumentParser(description='Quarto IA Client')
     parser.add_argument('--host', required=True, help='Server IP address')
@@ -125,16 +174,46 @@ async def main():
     parser.add_argument('--port-client', type=int, required=True, help='Port this client listens on')
     parser.add_argument('--name', required=True, help='Client name')
     parser.add_argument('--matricules', nargs='+', required=True, help='Matricules of the two students')
+    parser.add_argument('--move-cache', type=int, default=0,
+                        help='Number of cached moves (default 0: strategy.py answers are random, not worth replaying)')
+    parser.add_argument('--move-cache-file', help='File the move cache is loaded from and saved to on shutdown')
+    parser.add_argument('--game-log', help='Append every received state and returned move to this binary game log')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics on http://0.0.0.0:PORT/metrics')
+    add_memory_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    cache = load_move_cache(args.move_cache, args.move_cache_file)
+    budgets = budget_from_args(args, strategy, cache)
+    recorder = None
+    if args.game_log:
+        from game_log import GameRecorder
+        recorder = GameRecorder(args.game_log)
+    profiler = profiler_from_args(args)
+    metrics = None
+    if args.metrics_port:
+        from metrics import ClientMetrics, start_metrics_server
+        metrics = ClientMetrics(cache, strategy)
+        metrics.memory_budgets = budgets
 
     # Try to subscribe to the server
+    subscribe_start = time.perf_counter()
     if not await subscribe(args.host, args.port_server, args.port_client, args.name, args.matricules):
         print(f"Could not subscribe to server. Exiting.")
         return
+    subscribed = time.perf_counter() - subscribe_start
 
     try:
-        server = await asyncio.start_server(handle_connection, '0.0.0.0', args.port_client)
+        async def handler(reader, writer):
+            await handle_connection(reader, writer, cache, recorder, metrics, profiler)
+        server = await asyncio.start_server(handler, '0.0.0.0', args.port_client)
         print(f"Client listening on port {args.port_client}")
+        ready = seconds_since_start()
+        print(f"[STARTUP] Prêt à servir {ready * 1000:.0f} ms après le lancement "
+              f"(dont {subscribed * 1000:.0f} ms d'inscription)")
+        if metrics is not None:
+            metrics.startup_seconds = ready
+            await start_metrics_server(metrics, args.metrics_port)
+            print(f"[METRICS] http://0.0.0.0:{args.metrics_port}/metrics")
         async with server:
             await server.serve_forever()
     except OSError as e:
@@ -143,6 +222,13 @@ async def main():
             print("Try specifying a different port with --port-client option.")
         else:
             print(f"⚠️  ERROR: {e}")
+    finally:
+        report_memory(strategy, cache, budgets)
+        close_move_cache(cache, args.move_cache_file)
+        close_profiler(profiler)
+        if recorder is not None:
+            recorder.close()
+            print(f"[LOG] {recorder.moves} coups de {recorder.games} parties enregistrés dans {args.game_log}")
 
 if __name__ == '__main__':
     try:
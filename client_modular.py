@@ -1,8 +1,15 @@
 import argparse
 import asyncio
 import json
+import os
 import sys
+import time
 import importlib
+from codec import GameTracker, InvalidStateError, decode_state
+from memory_budget import add_memory_arguments, budget_from_args, report_memory
+from move_cache import MoveCache
+from profiler import add_profile_arguments, close_profiler, profiler_from_args
+from startup import seconds_since_start
 from datetime import datetime
 
 async def readJSON(reader):
@@ -22,28 +29,67 @@ async def writeJSON(writer, obj):
     writer.write(message)
     await writer.drain()
 
-async def handle_connection(reader, writer, strategy_mod):
+async def handle_connection(reader, writer, strategy_mod, cache=None, recorder=None, metrics=None, tracker=None,
+                            profiler=None):
     request = await readJSON(reader)
     req_type = request.get('request')
+    if metrics is not None:
+        metrics.request(req_type if req_type in ('ping', 'play') else 'unknown')
     if req_type == 'ping':
         print('[PING]')
         await writeJSON(writer, {'response': 'pong'})
     elif req_type == 'play':
         state = request.get('state')
         print(f"[PLAY] Etat reçu: {state}")
+        if tracker is not None:
+            notify_new_game(tracker, state, strategy_mod)
         try:
-            move = strategy_mod.gen_move(state)
+            start = time.perf_counter()
+            move = cache.lookup(state) if cache is not None else None
+            if move is not None:
+                print(f"[CACHE] Coup trouvé en cache: {move}")
+                source = 'cache'
+            else:
+                if profiler is not None:
+                    move = profiler.call(strategy_mod.gen_move, state)
+                else:
+                    move = strategy_mod.gen_move(state)
+                if cache is not None:
+                    cache.store(state, move)
+                source = 'search'
+            if metrics is not None:
+                metrics.move(source, time.perf_counter() - start, strategy_mod)
             print(f"[MOVE] Coup proposé: {move}")
+            if recorder is not None:
+                # A log that cannot be written must not cost the move
+                try:
+                    recorder.record(state, move)
+                except OSError as e:
+                    print(f"[LOG] Écriture du journal de partie impossible: {e}")
             await writeJSON(writer, {'response': 'move', 'move': move})
         except Exception as e:
             print(f"[ERROR] Erreur lors de la génération du coup: {e}")
+            if metrics is not None:
+                metrics.error('play')
             await writeJSON(writer, {'response': 'error', 'error': str(e)})
     else:
         print(f"[ERROR] Requête inconnue: {req_type}")
+        if metrics is not None:
+            metrics.error('unknown_request')
         await writeJSON(writer, {'response': 'error', 'error': f"Unknown request '{req_type}'"})
     writer.close()
     await writer.wait_closed()
 
+def notify_new_game(tracker, state, strategy_mod):
+    """Let the strategy drop what it kept from the previous game when a new one starts."""
+    try:
+        codes, pending, _ = decode_state(state)
+    except InvalidStateError:
+        return  # reported by gen_move
+    if tracker.starts_game(codes, pending) and hasattr(strategy_mod, 'new_game'):
+        print("[GAME] Nouvelle partie")
+        strategy_mod.new_game()
+
 async def check_server(host, port, timeout=2):
     try:
         _, writer = await asyncio.wait_for(
@@ -104,6 +150,31 @@ async def subscribe(host, port_server, port_client, name, matricules, max_retrie
             return False
     return False
 
+def load_move_cache(size, path=None):
+    """Create the move cache, warm-loaded from path if given."""
+    if size <= 0:
+        return None
+    cache = MoveCache(size)
+    if path:
+        print(f"[CACHE] {cache.load(path)} coups chargés depuis {path}")
+    return cache
+
+def close_move_cache(cache, path=None):
+    """Report cache metrics and save it to path if given."""
+    if cache is None:
+        return
+    stats = cache.stats()
+    print(f"[CACHE] hits={stats['hits']} misses={stats['misses']} ratio={stats['hit_ratio']:.1%} entries={stats['entries']}")
+    if path:
+        cache.save(path)
+
+async def save_tt_periodically(strategy_mod, path, interval):
+    """Snapshot the strategy's transposition table every interval seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        saved = strategy_mod.save_transposition_table(path)
+        print(f"[TT] {saved} entrées sauvegardées dans {path}")
+
 async def main():
     parser = argparse.ArgumentParser(description='Quarto IA Client')
     parser.add_argument('--host', required=True, help='Server IP address')
@@ -112,16 +183,63 @@ async def main():
     parser.add_argument('--name', required=True, help='Client name')
     parser.add_argument('--matricules', nargs='+', required=True, help='Matricules of the two students')
     parser.add_argument('--strategy', required=True, help='Strategy module to use (strategy, strategy_random, strategy_strong)')
+    parser.add_argument('--move-cache', type=int, default=1024, help='Number of cached moves (0 disables the cache)')
+    parser.add_argument('--move-cache-file', help='File the move cache is loaded from and saved to on shutdown')
+    parser.add_argument('--game-log', help='Append every received state and returned move to this binary game log')
+    parser.add_argument('--metrics-port', type=int, help='Serve Prometheus metrics on http://0.0.0.0:PORT/metrics')
+    parser.add_argument('--tt-file', help='Transposition table snapshot restored at startup and saved on shutdown')
+    parser.add_argument('--tt-save-interval', type=float, default=0, help='Also save the transposition table every N seconds')
+    parser.add_argument('--shared-tt', help='Name of the shared memory transposition table of this host')
+    parser.add_argument('--shared-tt-mb', type=float, default=64, help='Size of the shared transposition table if it gets created')
+    parser.add_argument('--search-workers', help='host:port,... of remote_search.py workers sharing the searches')
+    add_memory_arguments(parser)
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    cache = load_move_cache(args.move_cache, args.move_cache_file)
+    recorder = None
+    if args.game_log:
+        from game_log import GameRecorder
+        recorder = GameRecorder(args.game_log)
+    profiler = profiler_from_args(args)
+    metrics = None
+    if args.metrics_port:
+        from metrics import ClientMetrics, start_metrics_server
+        metrics = ClientMetrics(cache)
+    if args.shared_tt:
+        # Picked up at import by the strategy and by its worker processes
+        os.environ['QUARTO_SHARED_TT'] = args.shared_tt
+        os.environ['QUARTO_SHARED_TT_MB'] = str(args.shared_tt_mb)
+    if args.search_workers:
+        os.environ['QUARTO_SEARCH_WORKERS'] = args.search_workers
     strategy_mod = importlib.import_module(args.strategy)
+    budgets = budget_from_args(args, strategy_mod, cache)
+    if metrics is not None:
+        metrics.strategy_mod = strategy_mod
+        metrics.memory_budgets = budgets
+    persist_tt = args.tt_file and hasattr(strategy_mod, 'save_transposition_table')
+    if persist_tt:
+        # Restored from a background thread so subscription is not delayed
+        strategy_mod.load_transposition_table(args.tt_file)
+    subscribe_start = time.perf_counter()
     if not await subscribe(args.host, args.port_server, args.port_client, args.name, args.matricules):
         print(f"Could not subscribe to server. Exiting.")
         return
+    subscribed = time.perf_counter() - subscribe_start
+    tracker = GameTracker()
     try:
         async def handler(reader, writer):
-            await handle_connection(reader, writer, strategy_mod)
+            await handle_connection(reader, writer, strategy_mod, cache, recorder, metrics, tracker, profiler)
         server = await asyncio.start_server(handler, '0.0.0.0', args.port_client)
         print(f"Client listening on port {args.port_client}")
+        ready = seconds_since_start()
+        print(f"[STARTUP] Prêt à servir {ready * 1000:.0f} ms après le lancement "
+              f"(dont {subscribed * 1000:.0f} ms d'inscription)")
+        if metrics is not None:
+            metrics.startup_seconds = ready
+            await start_metrics_server(metrics, args.metrics_port)
+            print(f"[METRICS] http://0.0.0.0:{args.metrics_port}/metrics")
+        if persist_tt and args.tt_save_interval > 0:
+            asyncio.create_task(save_tt_periodically(strategy_mod, args.tt_file, args.tt_save_interval))
         async with server:
             await server.serve_forever()
     except OSError as e:
@@ -130,6 +248,16 @@ async def main():
             print("Try specifying a different port with --port-client option.")
         else:
             print(f"⚠️  ERROR: {e}")
+    finally:
+        report_memory(strategy_mod, cache, budgets)
+        close_move_cache(cache, args.move_cache_file)
+        close_profiler(profiler)
+        if recorder is not None:
+            recorder.close()
+            print(f"[LOG] {recorder.moves} coups de {recorder.games} parties enregistrés dans {args.game_log}")
+        if persist_tt:
+            saved = strategy_mod.save_transposition_table(args.tt_file)
+            print(f"[TT] {saved} entrées sauvegardées dans {args.tt_file}")
 
 if __name__ == '__main__':
     try:
@@ -0,0 +1,135 @@
+"""Compact integer encoding of Quarto pieces, boards and positions.
+
+A piece is coded on 4 bits, one per attribute (size, color, weight, shape):
+bit 3 is 0 for 'B' and 1 for 'S', bit 0 is 0 for 'C' and 1 for 'P'.
+Empty squares are coded as EMPTY.
+"""
+
+ATTRIBUTES = ('BS', 'DL', 'EF', 'CP')
+EMPTY = 16
+
+# PIECES[code] is the piece string for that code
+PIECES = [
+    ''.join(ATTRIBUTES[i][(code >> (3 - i)) & 1] for i in range(4))
+    for code in range(16)
+]
+PIECE_CODES = {piece: code for code, piece in enumerate(PIECES)}
+
+def piece_to_code(piece):
+    """Code of a piece string, EMPTY for None."""
+    if piece is None:
+        return EMPTY
+    return PIECE_CODES[piece]
+
+def code_to_piece(code):
+    """Piece string of a code, None for EMPTY."""
+    if code == EMPTY:
+        return None
+    return PIECES[code]
+
+def encode_board(board):
+    """List of piece codes for a board of piece strings."""
+    return [EMPTY if p is None else PIECE_CODES[p] for p in board]
+
+def decode_board(codes):
+    """Board of piece strings for a list of piece codes."""
+    return [None if c == EMPTY else PIECES[c] for c in codes]
+
+def pack_position(codes, pending_code):
+    """Pack 16 square codes and the pending piece code into one integer (85 bits)."""
+    key = pending_code
+    for c in reversed(codes):
+        key = (key << 5) | c
+    return key
+
+def unpack_position(key):
+    """Inverse of pack_position: returns (codes, pending_code)."""
+    codes = []
+    for _ in range(16):
+        codes.append(key & 31)
+        key >>= 5
+    return codes, key & 31
+
+POSITION_KEY_BYTES = 11
+
+def board_extends(previous, board):
+    """True if board (codes) keeps every piece of previous and has more pieces."""
+    added = 0
+    for before, after in zip(previous, board):
+        if before != EMPTY:
+            if after != before:
+                return False
+        elif after != EMPTY:
+            added += 1
+    return added > 0
+
+def continues_game(previous_codes, previous_pending, codes, pending):
+    """True if the position (codes, pending) can follow the previous one in the same game."""
+    if board_extends(previous_codes, codes):
+        return True
+    # The opening piece was just chosen on the empty board
+    return previous_pending == EMPTY and pending != EMPTY and codes == previous_codes
+
+class GameTracker:
+    """Tells whether each new position starts a game or continues the previous one."""
+
+    def __init__(self):
+        self.previous = None
+
+    def starts_game(self, codes, pending):
+        """Remember the position; True if it does not continue the previous one."""
+        previous, self.previous = self.previous, (codes, pending)
+        return previous is None or not continues_game(*previous, codes, pending)
+
+ALL_PIECES_MASK = (1 << 16) - 1
+
+class InvalidStateError(ValueError):
+    """A state received from the server that does not describe a Quarto position."""
+
+def _describe(value):
+    return repr(value) if len(repr(value)) <= 40 else repr(value)[:37] + '...'
+
+def decode_state(state):
+    """
+    Validate a server state and decode it in one pass.
+    Returns (codes, pending_code, available_mask): the 16 square codes,
+    the code of the piece to place (EMPTY if none) and the 16-bit set of
+    the codes of the pieces neither on the board nor pending.
+    Raises InvalidStateError with the offending square or piece.
+    """
+    if not isinstance(state, dict):
+        raise InvalidStateError(f"state must be an object, got {_describe(state)}")
+    board = state.get('board')
+    if not isinstance(board, (list, tuple)):
+        raise InvalidStateError(f"state['board'] must be a list of 16 squares, got {_describe(board)}")
+    if len(board) != 16:
+        raise InvalidStateError(f"state['board'] must be a list of 16 squares, got {len(board)}")
+    codes = []
+    used = 0
+    for square, piece in enumerate(board):
+        if piece is None:
+            codes.append(EMPTY)
+            continue
+        code = PIECE_CODES.get(piece) if isinstance(piece, str) else None
+        if code is None:
+            raise InvalidStateError(f"square {square}: invalid piece {_describe(piece)} "
+                                    f"(expected one of [BS][DL][EF][CP] or null)")
+        if used >> code & 1:
+            raise InvalidStateError(f"square {square}: piece {piece} is already on square {codes.index(code)}")
+        used |= 1 << code
+        codes.append(code)
+    pending = state.get('piece')
+    pending_code = EMPTY
+    if pending is not None:
+        pending_code = PIECE_CODES.get(pending) if isinstance(pending, str) else None
+        if pending_code is None:
+            raise InvalidStateError(f"state['piece']: invalid piece {_describe(pending)} "
+                                    f"(expected one of [BS][DL][EF][CP] or null)")
+        if used >> pending_code & 1:
+            raise InvalidStateError(f"state['piece']: piece {pending} is already on square {codes.index(pending_code)}")
+        used |= 1 << pending_code
+    return codes, pending_code, ALL_PIECES_MASK & ~used
+
+def mask_pieces(mask):
+    """Piece strings of the codes in a 16-bit set, in code order."""
+    return [PIECES[code] for code in range(16) if mask >> code & 1]
@@ -0,0 +1,250 @@
+"""Retrograde-analysis endgame database.
+
+The generator enumerates every canonical position with at most K empty
+squares reachable from a set of seed positions, then solves them layer by
+layer from the fullest boards up (retrograde analysis). Each position is
+the side to move holding `pending`, which it must place before giving a
+piece. Results are stored as win/draw/loss plus distance in plies.
+
+File layout (little-endian header, then two packed sections):
+    magic 'QEDB', version, max_empties, reserved, count
+    count sorted 11-byte big-endian canonical keys
+    count value bytes: result << 6 | distance
+
+The rank of a key in the sorted key section is a minimal perfect hash of
+the canonical position; the value section is indexed by that rank. At
+runtime the file is memory-mapped read-only and probed by binary search.
+"""
+
+import mmap
+import os
+import random
+import struct
+import time
+
+from codec import EMPTY, POSITION_KEY_BYTES, encode_board, piece_to_code, unpack_position
+from symmetry import LINES, canonical_key
+
+LOSS, DRAW, WIN = 0, 1, 2
+RESULT_NAMES = {LOSS: 'loss', DRAW: 'draw', WIN: 'win'}
+
+MAGIC = b'QEDB'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHI')
+
+LINES_THROUGH = [[line for line in LINES if pos in line] for pos in range(16)]
+
+def wins_with(codes, pos, piece):
+    """True if placing piece (code) on the empty square pos completes a line."""
+    for line in LINES_THROUGH[pos]:
+        common = piece
+        common_absent = piece ^ 15
+        for i in line:
+            if i == pos:
+                continue
+            c = codes[i]
+            if c == EMPTY:
+                break
+            common &= c
+            common_absent &= c ^ 15
+        else:
+            if common or common_absent:
+                return True
+    return False
+
+def _available(codes, pending):
+    used = set(codes)
+    used.add(pending)
+    return [c for c in range(16) if c not in used]
+
+def _children(codes, pending):
+    """Canonical keys of all positions after placing pending and giving a piece."""
+    available = _available(codes, pending)
+    for pos in range(16):
+        if codes[pos] != EMPTY:
+            continue
+        new_codes = codes[:]
+        new_codes[pos] = pending
+        for give in available:
+            yield canonical_key(new_codes, give)
+
+def _immediate_win(codes, pending):
+    return any(codes[pos] == EMPTY and wins_with(codes, pos, pending) for pos in range(16))
+
+def solve_position(codes, pending, child_values):
+    """Value byte of a position given the values of its children."""
+    if _immediate_win(codes, pending):
+        return WIN << 6 | 1
+    if codes.count(EMPTY) == 1:
+        return DRAW << 6 | 1
+    best_win = None
+    best_draw = None
+    worst_loss = 0
+    for key in _children(codes, pending):
+        value = child_values[key]
+        result, distance = value >> 6, value & 63
+        if result == LOSS:
+            if best_win is None or distance < best_win:
+                best_win = distance
+        elif result == DRAW:
+            best_draw = max(best_draw or 0, distance)
+        else:
+            worst_loss = max(worst_loss, distance)
+    if best_win is not None:
+        return WIN << 6 | (best_win + 1)
+    if best_draw is not None:
+        return DRAW << 6 | (best_draw + 1)
+    return LOSS << 6 | (worst_loss + 1)
+
+def solve(seeds, max_empties, verbose=False):
+    """Solve every position with at most max_empties empties reachable from the seeds.
+
+    Returns a dict mapping canonical keys to value bytes.
+    """
+    layers = {e: set() for e in range(1, max_empties + 1)}
+    for codes, pending in seeds:
+        empties = codes.count(EMPTY)
+        if 1 <= empties <= max_empties:
+            layers[empties].add(canonical_key(codes, pending))
+
+    # Forward pass: enumerate the reachable positions layer by layer
+    for e in range(max_empties, 1, -1):
+        for key in layers[e]:
+            codes, pending = unpack_position(key)
+            if _immediate_win(codes, pending):
+                continue
+            layers[e - 1].update(_children(codes, pending))
+        if verbose:
+            print(f"[ENDGAME] {len(layers[e])} positions with {e} empties")
+
+    # Retrograde pass: from the fullest boards up
+    values = {}
+    for e in range(1, max_empties + 1):
+        for key in layers[e]:
+            codes, pending = unpack_position(key)
+            values[key] = solve_position(codes, pending, values)
+    return values
+
+def random_seeds(count, empties, rng=random):
+    """Random non-terminal positions with the given number of empty squares."""
+    seeds = []
+    while len(seeds) < count:
+        codes = [EMPTY]*16
+        pieces = list(range(16))
+        rng.shuffle(pieces)
+        squares = list(range(16))
+        rng.shuffle(squares)
+        for pos, piece in zip(squares[:16 - empties], pieces):
+            if wins_with(codes, pos, piece):
+                break
+            codes[pos] = piece
+        else:
+            seeds.append((codes, pieces[16 - empties]))
+    return seeds
+
+def write_database(path, values, max_empties):
+    """Write solved values to a packed database file."""
+    keys = sorted(values)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, max_empties, 0, len(keys)))
+        f.write(b''.join(k.to_bytes(POSITION_KEY_BYTES, 'big') for k in keys))
+        f.write(bytes(values[k] for k in keys))
+    os.replace(tmp, path)
+
+class EndgameDB:
+    """Read-only memory-mapped endgame database."""
+
+    def __init__(self, path):
+        """Map the database at path; ValueError if it is not a complete version VERSION database."""
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty")
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} endgame database")
+        magic, version, self.max_empties, _, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} endgame database")
+        # Every key is followed, after the last one, by a one-byte value
+        expected = HEADER.size + self.count * (POSITION_KEY_BYTES + 1)
+        if len(self._map) != expected or not 0 <= self.max_empties <= 16:
+            self.close()
+            raise ValueError(f"{path} is truncated or corrupted ({len(self._map)} bytes, {expected} expected)")
+        self._keys = HEADER.size
+        self._values = self._keys + self.count * POSITION_KEY_BYTES
+
+    @property
+    def nbytes(self):
+        """Size of the mapping; pages are only resident once probed."""
+        return len(self._map)
+
+    def _index(self, key):
+        target = key.to_bytes(POSITION_KEY_BYTES, 'big')
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._keys + mid * POSITION_KEY_BYTES
+            probe = self._map[start:start + POSITION_KEY_BYTES]
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def probe_codes(self, codes, pending):
+        """(result, distance) for the side to move, or None if not in the database."""
+        if codes.count(EMPTY) > self.max_empties:
+            return None
+        index = self._index(canonical_key(codes, pending))
+        if index is None:
+            return None
+        value = self._map[self._values + index]
+        return value >> 6, value & 63
+
+    def probe(self, board, pending):
+        """Probe a board of piece strings with the pending piece string."""
+        return self.probe_codes(encode_board(board), piece_to_code(pending))
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+def open_endgame_db(path):
+    """Open the database at path, or return None if there is none."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return EndgameDB(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"[ENDGAME] Could not open {path}: {e}")
+        return None
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description='Build the Quarto endgame database')
+    parser.add_argument('--max-empties', type=int, default=5, help='Largest number of empty squares to solve')
+    parser.add_argument('--seeds', type=int, default=200, help='Number of random seed positions')
+    parser.add_argument('--random-seed', type=int, default=None, help='Random seed for reproducible builds')
+    parser.add_argument('--out', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame.db'),
+                        help='Output database file')
+    args = parser.parse_args()
+
+    rng = random.Random(args.random_seed)
+    start = time.time()
+    seeds = random_seeds(args.seeds, args.max_empties, rng)
+    values = solve(seeds, args.max_empties, verbose=True)
+    write_database(args.out, values, args.max_empties)
+    counts = {name: 0 for name in RESULT_NAMES.values()}
+    for value in values.values():
+        counts[RESULT_NAMES[value >> 6]] += 1
+    print(f"[ENDGAME] Wrote {len(values)} positions to {args.out} in {time.time() - start:.1f}s: {counts}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+"""Differential fuzzing of the fast engine primitives against strategy.py.
+
+    python fuzz.py --states 1000000 --workers 8
+    python fuzz.py --checks wins,search --states 20000 --seed 7
+
+random_state draws valid Quarto states ({"board": [...], "piece": ...},
+as validate_pieces.print_pieces_status takes them), uniform over the
+number of filled squares. Every check (CHECKS) compares a fast
+primitive with the plain string-based reference code (strategy.is_winning,
+the piece sets of validate_pieces) or with an exact solver built on it,
+and returns a description of the mismatch, or None.
+
+States are generated and checked in chunks across a process pool, each
+chunk from its own seed, so a run is reproducible for a given --seed.
+The first failure of each check is shrunk, by removing pieces while it
+still fails, and reported as a minimal failing state.
+"""
+
+import argparse
+import contextlib
+import io
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import codec
+import endgame_db
+import strategy
+import strategy_strong
+import strategy_ultimate
+import validate_pieces
+from symmetry import canonical_key
+from tables import PERMUTATIONS
+
+# Largest number of empty squares solved exactly by the search check
+SEARCH_MAX_EMPTIES = 4
+
+def random_state(rng, filled=None):
+    """
+    A valid state of a game in progress: distinct pieces, no completed
+    line, and a pending piece unless the board is empty (first move).
+    filled defaults to a number of pieces drawn uniformly in 0..15.
+    """
+    if filled is None:
+        filled = rng.randrange(16)
+    while True:
+        pieces = rng.sample(codec.PIECES, filled + 1)
+        board = [None] * 16
+        for pos, piece in zip(rng.sample(range(16), filled), pieces):
+            board[pos] = piece
+        if not strategy.is_winning(board):
+            pending = pieces[-1] if filled or rng.random() < 0.5 else None
+            return {'board': board, 'piece': pending}
+
+def reference_available(state):
+    """Pieces neither on the board nor pending, as validate_pieces counts them."""
+    used = set(p for p in state['board'] if p is not None) | {state.get('piece')}
+    return validate_pieces.get_all_pieces() - used
+
+def placed(board, pos, piece):
+    new_board = board[:]
+    new_board[pos] = piece
+    return new_board
+
+def solve(board, pending, available):
+    """Exact value for the side placing pending: 1 win, 0 draw, -1 loss (string reference code)."""
+    empties = [i for i, p in enumerate(board) if p is None]
+    if any(strategy.is_winning(placed(board, pos, pending)) for pos in empties):
+        return 1
+    if not available or len(empties) == 1:
+        return 0
+    best = -1
+    for pos in empties:
+        new_board = placed(board, pos, pending)
+        for piece in available:
+            best = max(best, -solve(new_board, piece, [p for p in available if p != piece]))
+            if best == 1:
+                return 1
+    return best
+
+# -------------- CHECKS --------------
+
+def check_decode(state):
+    """codec.decode_state, encode/decode and pack/unpack against the plain piece sets."""
+    codes, pending, mask = codec.decode_state(state)
+    if set(codec.mask_pieces(mask)) != reference_available(state):
+        return f"available {sorted(codec.mask_pieces(mask))}"
+    if codec.decode_board(codes) != state['board'] or codec.code_to_piece(pending) != state.get('piece'):
+        return "decode_board(decode_state) differs from the state"
+    if codec.unpack_position(codec.pack_position(codes, pending)) != (codes, pending):
+        return "pack_position does not round-trip"
+    return None
+
+def check_wins(state):
+    """Winning placements of every piece: endgame_db.wins_with, threat_lines, scan_lines vs is_winning."""
+    board = state['board']
+    codes = codec.encode_board(board)
+    threats = strategy_ultimate.threat_lines(board)
+    empties = [i for i, p in enumerate(board) if p is None]
+    for piece in sorted(reference_available(state) | {state.get('piece')} - {None}):
+        code = codec.PIECE_CODES[piece]
+        winning = []
+        for pos in empties:
+            new_board = placed(board, pos, piece)
+            expected = strategy.is_winning(new_board)
+            if endgame_db.wins_with(codes, pos, code) != expected:
+                return f"wins_with({pos}, {piece}) != {expected}"
+            if strategy_ultimate.scan_lines(new_board)[0] != expected:
+                return f"scan_lines after {piece} on {pos} != {expected}"
+            if expected:
+                winning.append(pos)
+        found = strategy_ultimate.completing_position(threats, piece)
+        if (found is None) != (not winning) or (found is not None and found not in winning):
+            return f"completing_position({piece}) = {found}, winning squares {winning}"
+    return None
+
+def check_gives(state):
+    """strategy_strong.classify_gives marks exactly the pieces winning at once for the receiver."""
+    board = state['board']
+    if state.get('piece') is None:
+        return None
+    empties = [i for i, p in enumerate(board) if p is None]
+    pos = empties[0]
+    board = placed(board, pos, state['piece'])
+    if strategy.is_winning(board):
+        return None
+    empties = empties[1:]
+    available = reference_available(state)
+    mask = sum(1 << codec.PIECE_CODES[p] for p in available)
+    ranks = strategy_strong.classify_gives(codec.encode_board(board), empties, mask)
+    for piece in available:
+        loses = any(strategy.is_winning(placed(board, i, piece)) for i in empties)
+        if (ranks[codec.PIECE_CODES[piece]] == strategy_strong.GIVE_LOSES) != loses:
+            return f"classify_gives({piece}) after placing on {pos}: {ranks[codec.PIECE_CODES[piece]]}, loses {loses}"
+    return None
+
+def check_symmetry(state, rng=None):
+    """Symmetric states share their canonical key and their winning status."""
+    rng = rng or random.Random(str(state))
+    codes, pending, _ = codec.decode_state(state)
+    perm = rng.choice(PERMUTATIONS)
+    mask = rng.randrange(16)
+    moved = [codes[perm[i]] for i in range(16)]
+    moved = [c if c == codec.EMPTY else c ^ mask for c in moved]
+    moved_pending = pending if pending == codec.EMPTY else pending ^ mask
+    if canonical_key(moved, moved_pending) != canonical_key(codes, pending):
+        return f"canonical key differs after permutation {perm} and mask {mask}"
+    for pos in (i for i, c in enumerate(codes) if c == codec.EMPTY and pending != codec.EMPTY):
+        new_moved = moved[:]
+        new_moved[perm.index(pos)] = moved_pending
+        if strategy.is_winning(codec.decode_board(new_moved)) != strategy.is_winning(
+                placed(state['board'], pos, state['piece'])):
+            return f"winning status of square {pos} not preserved by the symmetry"
+    return None
+
+def check_search(state):
+    """strategy_ultimate's full-depth search against the exact solver (small endgames only)."""
+    board = state['board']
+    empties = board.count(None)
+    if state.get('piece') is None or empties > SEARCH_MAX_EMPTIES:
+        return None
+    available = sorted(reference_available(state))
+    expected = solve(board, state['piece'], available)
+    # Late-move reductions may stop at the horizon on purpose: search exactly
+    saved = strategy_ultimate.LATE_MOVE_REDUCTIONS
+    strategy_ultimate.LATE_MOVE_REDUCTIONS = False
+    strategy_ultimate.transposition_table.clear()
+    try:
+        pos, _, score = strategy_ultimate.search_place(
+            board[:], state['piece'], available, empties,
+            float('-inf'), float('inf'), True, time.time(), float('inf'), root=True
+        )
+    finally:
+        strategy_ultimate.LATE_MOVE_REDUCTIONS = saved
+    value = 1 if score >= 1000 else -1 if score <= -1000 else 0
+    if value != expected:
+        return f"search score {score}, exact value {expected}"
+    if expected == 1 and solve_after(board, state['piece'], available, pos) != 1:
+        return f"search move {pos} does not keep the win"
+    return None
+
+def solve_after(board, pending, available, pos):
+    """Exact value of placing pending on pos and then giving the best piece."""
+    new_board = placed(board, pos, pending)
+    if strategy.is_winning(new_board):
+        return 1
+    if not available:
+        return 0
+    return max(-solve(new_board, piece, [p for p in available if p != piece]) for piece in available)
+
+CHECKS = {
+    'decode': check_decode,
+    'wins': check_wins,
+    'gives': check_gives,
+    'symmetry': check_symmetry,
+    'search': check_search,
+}
+
+def run_check(name, state):
+    """Mismatch description of one check on one state, or None."""
+    try:
+        return CHECKS[name](state)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+# -------------- SHRINKING --------------
+
+def smaller_states(state):
+    """States with one piece less (a placed one, or the pending one on an empty board)."""
+    board = state['board']
+    for pos, piece in enumerate(board):
+        if piece is not None:
+            yield {'board': placed(board, pos, None), 'piece': state['piece']}
+    if state['piece'] is not None and all(p is None for p in board):
+        yield {'board': board[:], 'piece': None}
+
+def shrink(name, state, fails=None):
+    """Remove pieces from a failing state while the check keeps failing; returns the smallest one."""
+    fails = fails or (lambda s: run_check(name, s) is not None)
+    shrunk = True
+    while shrunk:
+        shrunk = False
+        for candidate in smaller_states(state):
+            if fails(candidate):
+                state, shrunk = candidate, True
+                break
+    return state
+
+# -------------- HARNESS --------------
+
+def fuzz_chunk(names, seed, count):
+    """Check count states drawn from seed; returns (count, {check: (state, message)} of the first failures)."""
+    rng = random.Random(seed)
+    failures = {}
+    for _ in range(count):
+        state = random_state(rng)
+        for name in names:
+            if name in failures:
+                continue
+            message = run_check(name, state)
+            if message is not None:
+                failures[name] = (state, message)
+    return count, failures
+
+def fuzz(names, states, workers=None, seed=0, chunk=2000, verbose=False):
+    """
+    Run the checks on `states` random states; returns {check: (minimal state, message)}.
+    workers=0 checks every chunk in this process.
+    """
+    chunks = [(names, f"{seed}:{i}", min(chunk, states - i * chunk)) for i in range((states + chunk - 1) // chunk)]
+    first = {}
+    done = 0
+    start = time.time()
+    pool = None
+    if workers == 0:
+        results = (fuzz_chunk(*args) for args in chunks)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(fuzz_chunk, *zip(*chunks)) if chunks else []
+    try:
+        for count, failures in results:
+            done += count
+            for name, failure in failures.items():
+                first.setdefault(name, failure)
+            if verbose:
+                print(f"[FUZZ] {done}/{states} états, {len(first)} vérifications en échec, "
+                      f"{done / max(time.time() - start, 1e-9):.0f} états/s")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    report = {}
+    for name, (state, _) in first.items():
+        minimal = shrink(name, state)
+        report[name] = (minimal, run_check(name, minimal))
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Differential fuzzing of the Quarto engine primitives')
+    parser.add_argument('--states', type=int, default=100000, help='Number of random states')
+    parser.add_argument('--checks', default=','.join(CHECKS), help=f"Comma-separated checks among {', '.join(CHECKS)}")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (0 = no pool)')
+    parser.add_argument('--chunk', type=int, default=2000, help='States per task')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the random states')
+    args = parser.parse_args()
+
+    names = [name for name in args.checks.split(',') if name]
+    unknown = [name for name in names if name not in CHECKS]
+    if unknown:
+        parser.error(f"unknown checks: {', '.join(unknown)}")
+    start = time.time()
+    report = fuzz(names, args.states, args.workers, args.seed, args.chunk, verbose=True)
+    print(f"[FUZZ] {args.states} états vérifiés en {time.time() - start:.1f}s")
+    for name in names:
+        if name not in report:
+            print(f"[OK] {name}")
+            continue
+        state, message = report[name]
+        print(f"[ECHEC] {name}: {message}")
+        print(f"  état minimal: {state}")
+        with contextlib.redirect_stdout(io.StringIO()) as status:
+            validate_pieces.print_pieces_status(state)
+        print('  ' + status.getvalue().strip().replace('\n', '\n  '))
+    raise SystemExit(1 if report else 0)
+
+if __name__ == '__main__':
+    main()
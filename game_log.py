@@ -0,0 +1,98 @@
+"""Compact binary log of the games played by a client.
+
+File layout: a 5-byte header (b'QLOG' and a version byte) followed by
+frames, each starting with a one-byte tag:
+
+    b'G' + float64 time    a new game starts
+    b'M' + 19 bytes        a position and the move answered:
+                           16 square codes, pending code, move pos
+                           (255 for none) and given piece code
+
+Squares and pieces use the codes of codec.py, one byte each. Readers
+stream the file frame by frame, so logs of millions of moves are never
+loaded in memory.
+"""
+
+import struct
+import time
+
+from codec import GameTracker, code_to_piece, decode_board, encode_board, piece_to_code
+
+MAGIC = b'QLOG'
+VERSION = 1
+GAME = b'G'
+MOVE = b'M'
+GAME_FRAME = struct.Struct('<d')
+MOVE_SIZE = 19
+NO_POS = 255
+
+class GameRecorder:
+    """Appends every (state, move) answered by a client to a game log."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC + bytes([VERSION]))
+        self._tracker = GameTracker()
+        self.moves = 0
+        self.games = 0
+
+    def record(self, state, move):
+        """Log one answered position; returns False if it cannot be encoded."""
+        try:
+            codes = encode_board(state['board'])
+            pending = piece_to_code(state.get('piece'))
+            pos = move.get('pos')
+            piece = piece_to_code(move.get('piece'))
+        except (KeyError, TypeError, AttributeError):
+            return False
+        if len(codes) != 16:
+            return False
+        if self._tracker.starts_game(codes, pending):
+            self._file.write(GAME + GAME_FRAME.pack(time.time()))
+            self.games += 1
+        self._file.write(MOVE + bytes(codes) + bytes([pending, NO_POS if pos is None else pos, piece]))
+        self._file.flush()
+        self.moves += 1
+        return True
+
+    def close(self):
+        self._file.close()
+
+def iter_records(path):
+    """
+    Stream the move records of a log as (game, codes, pending, pos, piece)
+    tuples, where game counts the games seen so far (from 0) and pos is
+    None when no square was played.
+    """
+    with open(path, 'rb') as f:
+        header = f.read(len(MAGIC) + 1)
+        if header[:len(MAGIC)] != MAGIC or header[len(MAGIC):] != bytes([VERSION]):
+            raise ValueError(f"{path} is not a version {VERSION} game log")
+        game = -1
+        while True:
+            tag = f.read(1)
+            if not tag:
+                return
+            if tag == GAME:
+                if len(f.read(GAME_FRAME.size)) < GAME_FRAME.size:
+                    return
+                game += 1
+            elif tag == MOVE:
+                data = f.read(MOVE_SIZE)
+                if len(data) < MOVE_SIZE:
+                    # truncated by a crash while writing
+                    return
+                pos = data[17]
+                yield max(game, 0), list(data[:16]), data[16], None if pos == NO_POS else pos, data[18]
+            else:
+                raise ValueError(f"{path}: unknown frame tag {tag!r} at offset {f.tell() - 1}")
+
+def record_state(codes, pending):
+    """Server-style state dict of a logged position."""
+    return {'board': decode_board(codes), 'piece': code_to_piece(pending)}
+
+def record_move(pos, piece):
+    """Move dict of a logged answer."""
+    return {'pos': pos, 'piece': code_to_piece(piece)}
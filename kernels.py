@@ -0,0 +1,189 @@
+"""Hot board primitives on piece codes, JIT-compiled when Numba is installed.
+
+    QUARTO_KERNELS=python python client_modular.py ...   # force the pure-Python kernels
+    python bench_kernels.py                              # compare the two backends
+
+A board is a tuple of 16 codes (codec.py: 4-bit piece codes, EMPTY for
+an empty square, see board_codes); sets of squares and of pieces are
+16-bit masks. The kernels only use ints, tuples and loops, so the same
+source runs as plain Python or compiled by numba.njit.
+
+The backend is chosen once, at import: 'numba' if numba can be imported
+(unless QUARTO_KERNELS=python), 'python' otherwise. Compiled kernels are
+cached on disk by Numba, so only the first run of a machine pays the
+compilation.
+"""
+
+import os
+
+import codec
+import tables
+
+BACKEND_ENV = 'QUARTO_KERNELS'
+
+numba = None
+if os.environ.get(BACKEND_ENV, 'auto') != 'python':
+    try:
+        import numba
+    except ImportError:
+        if os.environ.get(BACKEND_ENV) == 'numba':
+            print("[KERNELS] numba n'est pas installé, noyaux en Python pur")
+
+BACKEND = 'numba' if numba is not None else 'python'
+
+def jit(func):
+    """numba.njit(func) with the numba backend, func itself otherwise."""
+    if numba is None:
+        return func
+    return numba.njit(cache=True)(func)
+
+EMPTY = codec.EMPTY
+# Squares of the 10 lines; Numba freezes global tuples into constants
+LINES = tuple(tables.LINES)
+POPCOUNT = tables.POPCOUNT
+COMPLETING = tables.COMPLETING
+
+_CODES = {**codec.PIECE_CODES, None: EMPTY}
+
+def board_codes(board):
+    """Tuple of codes of a board of piece strings."""
+    return tuple([_CODES[p] for p in board])
+
+@jit
+def popcount16(mask):
+    return POPCOUNT[mask & 15] + POPCOUNT[mask >> 4 & 15] + POPCOUNT[mask >> 8 & 15] + POPCOUNT[mask >> 12 & 15]
+
+@jit
+def is_win(codes):
+    """True if a full line shares an attribute."""
+    for line in LINES:
+        ones = zeros = 15
+        full = True
+        for i in line:
+            c = codes[i]
+            if c == EMPTY:
+                full = False
+                break
+            ones &= c
+            zeros &= ~c
+        if full and (ones or zeros & 15):
+            return True
+    return False
+
+@jit
+def scan(codes):
+    """
+    One pass over the lines for the evaluation: (winning, shared1, shared2,
+    shared3, threats, dangerous, empties) as strategy_ultimate.scan_lines
+    defines them.
+    """
+    winning = False
+    shared1 = shared2 = shared3 = 0
+    threats = 0
+    completing = 0
+    for line in LINES:
+        empty = 0
+        ones = zeros = 15
+        for i in line:
+            c = codes[i]
+            if c == EMPTY:
+                empty += 1
+            else:
+                ones &= c
+                zeros &= ~c
+        if empty == 4:
+            continue
+        shared = POPCOUNT[ones] + POPCOUNT[zeros & 15]
+        if empty == 0:
+            winning = winning or shared > 0
+        elif empty == 1:
+            shared1 += shared
+            if shared:
+                threats += 1
+                completing |= COMPLETING[ones] | COMPLETING[16 + (zeros & 15)]
+        elif empty == 2:
+            shared2 += shared
+        else:
+            shared3 += shared
+    empties = 0
+    for c in codes:
+        if c == EMPTY:
+            empties += 1
+        else:
+            completing &= ~(1 << c)
+    return winning, shared1, shared2, shared3, threats, popcount16(completing), empties
+
+@jit
+def winning_squares(codes, squares, pieces):
+    """
+    Squares of the mask `squares` where one of the pieces of the mask
+    `pieces` completes a line (the other squares staying empty).
+    """
+    found = 0
+    for line in LINES:
+        empty = -1
+        ones = zeros = 15
+        for i in line:
+            c = codes[i]
+            if c == EMPTY:
+                if empty >= 0:
+                    empty = -2
+                    break
+                empty = i
+            else:
+                ones &= c
+                zeros &= ~c
+        if empty >= 0 and squares >> empty & 1 and pieces & (COMPLETING[ones] | COMPLETING[16 + (zeros & 15)]):
+            found |= 1 << empty
+    return found
+
+@jit
+def losing_pieces(codes, squares, pieces):
+    """Pieces of the mask `pieces` completing a line on one of the squares of the mask `squares`."""
+    losing = 0
+    for line in LINES:
+        empty = -1
+        ones = zeros = 15
+        for i in line:
+            c = codes[i]
+            if c == EMPTY:
+                if empty >= 0:
+                    empty = -2
+                    break
+                empty = i
+            else:
+                ones &= c
+                zeros &= ~c
+        if empty >= 0 and squares >> empty & 1:
+            losing |= pieces & (COMPLETING[ones] | COMPLETING[16 + (zeros & 15)])
+    return losing
+
+@jit
+def line_states(codes):
+    """(ones, zeros, pieces) of every line: attributes set (cleared) in all its pieces, and their number."""
+    states = []
+    for line in LINES:
+        ones = zeros = 15
+        count = 0
+        for i in line:
+            c = codes[i]
+            if c != EMPTY:
+                ones &= c
+                zeros &= ~c
+                count += 1
+        states.append((ones, zeros & 15, count))
+    return states
+
+def squares_mask(squares):
+    """16-bit mask of a list of squares."""
+    mask = 0
+    for i in squares:
+        mask |= 1 << i
+    return mask
+
+def pieces_mask(pieces):
+    """16-bit mask of a list of piece strings."""
+    mask = 0
+    for p in pieces:
+        mask |= 1 << codec.PIECE_CODES[p]
+    return mask
@@ -0,0 +1,177 @@
+"""Load generator for a running client, on loopback only.
+
+    python client_modular.py ... --port-client 4100 &
+    python loadgen.py --port 4100 --connections 16 --rate 50 --requests 2000
+
+Plays the server's role: opens up to --connections concurrent connections
+to the client and sends one play request per connection, as the server
+does, with states replayed from a corpus (a game log written with
+--game-log, or JSON lines of states as analyze.py reads them; by default
+the positions of a few strategy_strong self-play games).
+
+Requests are started at --rate per second whether or not earlier ones
+have been answered (an open loop; --rate 0 sends back to back on every
+connection instead), and latency is counted from the scheduled start, so
+time spent waiting for a free connection shows up in the percentiles.
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import itertools
+import json
+import time
+
+LOOPBACK = '127.0.0.1'
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an ascending list, None if empty."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))
+    return sorted_values[int(rank) - 1]
+
+def check_loopback(host):
+    """Refuse to send load anywhere but to this machine."""
+    try:
+        loopback = ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = host == 'localhost'
+    if not loopback:
+        raise ValueError(f"{host} is not a loopback address")
+
+def self_play_states(games=20, seed=0):
+    """Positions to answer in strategy_strong self-play games."""
+    import selfplay
+    from game_log import record_state
+    states = []
+    for game in range(games):
+        for codes, pending, _, _ in selfplay.play_game(('strategy_strong', 'strategy_strong'), game, seed, 2):
+            states.append(record_state(codes, pending))
+    return states
+
+def load_corpus(path=None, limit=None):
+    """States of a game log or JSON lines file, or of self-play games if path is None."""
+    if path is None:
+        return self_play_states()
+    from analyze import iter_states
+    return list(itertools.islice(iter_states(path), limit))
+
+class LoadReport:
+    """Outcome counts and latencies of a load run."""
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = {}
+        self.timeouts = 0
+        self.sent = 0
+        self.seconds = 0.0
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        return {
+            'sent': self.sent,
+            'ok': len(latencies),
+            'errors': sum(self.errors.values()),
+            'error_kinds': dict(self.errors),
+            'timeouts': self.timeouts,
+            'seconds': self.seconds,
+            'throughput': len(latencies) / self.seconds if self.seconds else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+        }
+
+async def play_request(host, port, state):
+    """Send one play request as the server does; returns the response object."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(json.dumps({'request': 'play', 'state': state}).encode('utf8'))
+        await writer.drain()
+        return json.loads(await reader.read())
+    finally:
+        writer.close()
+
+async def timed_request(report, slots, host, port, state, scheduled, timeout, acquired=False):
+    """One request holding a connection slot (acquired by the caller if acquired)."""
+    if not acquired:
+        await slots.acquire()
+    try:
+        response = await asyncio.wait_for(play_request(host, port, state), timeout)
+    except asyncio.TimeoutError:
+        report.timeouts += 1
+        return
+    except (OSError, ValueError) as e:
+        report.error(type(e).__name__)
+        return
+    finally:
+        slots.release()
+    if not isinstance(response, dict) or response.get('response') != 'move':
+        report.error(response.get('response', 'invalid') if isinstance(response, dict) else 'invalid')
+        return
+    report.latencies.append(time.perf_counter() - scheduled)
+
+async def run_load(port, states, connections=8, rate=0.0, requests=1000, timeout=5.0, host=LOOPBACK):
+    """
+    Send `requests` play requests cycling over states, with at most
+    `connections` at once and `rate` starts per second (0 = as fast as
+    the connections allow); returns the LoadReport.
+    """
+    check_loopback(host)
+    report = LoadReport()
+    slots = asyncio.Semaphore(connections)
+    corpus = itertools.cycle(states)
+    tasks = []
+    start = time.perf_counter()
+    for i in range(requests):
+        if rate > 0:
+            scheduled = start + i / rate
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+        else:
+            # Closed loop: start the next request when a connection frees up
+            await slots.acquire()
+            scheduled = time.perf_counter()
+        report.sent += 1
+        tasks.append(asyncio.create_task(
+            timed_request(report, slots, host, port, next(corpus), scheduled, timeout, acquired=rate <= 0)
+        ))
+    await asyncio.gather(*tasks)
+    report.seconds = time.perf_counter() - start
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description='Send concurrent play requests to a client on loopback')
+    parser.add_argument('--port', type=int, required=True, help='port_client of the client under test')
+    parser.add_argument('--host', default=LOOPBACK, help='Loopback address of the client')
+    parser.add_argument('--connections', type=int, default=8, help='Concurrent connections')
+    parser.add_argument('--rate', type=float, default=0.0, help='Requests started per second (0 = closed loop)')
+    parser.add_argument('--requests', type=int, default=1000, help='Number of requests')
+    parser.add_argument('--timeout', type=float, default=5.0, help='Seconds before a request counts as timed out')
+    parser.add_argument('--corpus', help='Game log or JSON lines file of states (default: self-play positions)')
+    args = parser.parse_args()
+
+    try:
+        check_loopback(args.host)
+    except ValueError as e:
+        parser.error(str(e))
+    states = load_corpus(args.corpus)
+    if not states:
+        parser.error("the corpus holds no state")
+    print(f"[LOAD] {len(states)} états, {args.requests} requêtes, {args.connections} connexions, "
+          f"{'boucle fermée' if args.rate <= 0 else f'{args.rate:g} req/s'}")
+    report = asyncio.run(run_load(args.port, states, args.connections, args.rate, args.requests,
+                                  args.timeout, args.host))
+    s = report.summary()
+    print(f"[LOAD] {s['ok']}/{s['sent']} réponses en {s['seconds']:.1f}s, {s['throughput']:.1f} coups/s")
+    if s['ok']:
+        print(f"[LOAD] latence p50 {s['p50'] * 1000:.1f} ms, p95 {s['p95'] * 1000:.1f} ms, "
+              f"p99 {s['p99'] * 1000:.1f} ms, max {s['max'] * 1000:.1f} ms")
+    kinds = f" {s['error_kinds']}" if s['error_kinds'] else ''
+    print(f"[LOAD] {s['errors']} erreurs{kinds}, {s['timeouts']} délais dépassés")
+
+if __name__ == '__main__':
+    main()
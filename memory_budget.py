@@ -0,0 +1,113 @@
+"""Process-wide memory budget of a client, split among its caches.
+
+    python client_modular.py ... --memory-mb 256
+    players_ultimate.json: {"name": "...", ..., "memory_mb": 256}
+
+The budget is split (SHARES) between the strategy's transposition table,
+the move cache and the endgame database. Each cache measures its own
+footprint and evicts to stay under its share:
+
+- the transposition table drops its oldest, then shallowest entries;
+- the move cache drops its least recently used moves;
+- the endgame database is memory-mapped and read-only, so it is either
+  kept whole or closed; the part of its share it does not use (all of it
+  when the database is closed) goes to the transposition table.
+
+Footprints are measured with sys.getsizeof over the containers of a
+sample of entries (piece strings, None and small ints are shared by
+every entry and not counted), so they are estimates of the Python heap
+used, not of the process RSS.
+"""
+
+import itertools
+import sys
+
+MB = 2**20
+
+# Share of the budget of each cache
+SHARES = {'tt': 0.80, 'move_cache': 0.05, 'endgame': 0.15}
+# Entries measured to estimate the size of a large table
+SAMPLE_ENTRIES = 64
+# Average bytes of hash table per entry of a dict, slack for growth included
+DICT_SLOT_BYTES = sys.getsizeof(dict.fromkeys(range(4096))) / 4096
+
+def split_budget(total_mb, shares=SHARES):
+    """Bytes allowed to each cache for a budget of total_mb megabytes."""
+    total = int(total_mb * MB)
+    return {name: int(total * share) for name, share in shares.items()}
+
+def object_bytes(obj):
+    """Size of obj and of the containers it holds, shared immutables excepted."""
+    if obj is None or isinstance(obj, (str, bool)) or (type(obj) is int and -5 <= obj <= 256):
+        return 0
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(object_bytes(item) for item in obj)
+    return size
+
+def dict_footprint(table, sample=SAMPLE_ENTRIES):
+    """Estimated bytes of a dict: its hash table plus its entries, measured on a sample."""
+    count = len(table)
+    if not count:
+        return sys.getsizeof(table)
+    # list() runs in C without releasing the GIL, so concurrent inserts cannot break it
+    entries = list(itertools.islice(table.items(), sample))
+    per_entry = sum(object_bytes(key) + object_bytes(value) for key, value in entries) / len(entries)
+    return sys.getsizeof(table) + int(per_entry * count)
+
+def apply_budget(total_mb, strategy_mod=None, cache=None):
+    """
+    Split total_mb among the caches of this process and bound each of them;
+    returns the bytes given to each cache.
+    """
+    budgets = split_budget(total_mb)
+    if strategy_mod is not None and hasattr(strategy_mod, 'set_memory_budget'):
+        endgame = strategy_mod.memory_usage().get('endgame')
+        if endgame is not None:
+            # A database over its share is closed by set_memory_budget
+            kept = endgame if endgame <= budgets['endgame'] else 0
+            budgets['tt'] += budgets['endgame'] - kept
+            budgets['endgame'] = kept
+        strategy_mod.set_memory_budget(budgets['tt'], budgets['endgame'])
+    else:
+        # Nothing to bound but the move cache
+        del budgets['tt'], budgets['endgame']
+    if cache is not None:
+        cache.max_bytes = budgets['move_cache']
+        cache.evict()
+    return budgets
+
+def memory_usage(strategy_mod=None, cache=None):
+    """Measured bytes of every cache of this process."""
+    usage = {}
+    if strategy_mod is not None and hasattr(strategy_mod, 'memory_usage'):
+        usage.update(strategy_mod.memory_usage())
+    if cache is not None:
+        usage['move_cache'] = cache.nbytes
+    return usage
+
+def format_usage(usage, budgets=None):
+    """'tt 12.3/204.8 Mo, ...' for the log."""
+    parts = []
+    for name, used in usage.items():
+        limit = (budgets or {}).get(name)
+        parts.append(f"{name} {used / MB:.1f}" + (f"/{limit / MB:.1f}" if limit is not None else '') + " Mo")
+    return ', '.join(parts)
+
+def add_memory_arguments(parser):
+    """The --memory-mb option shared by the clients."""
+    parser.add_argument('--memory-mb', type=float, help='Memory budget of the caches of this client, in MB')
+
+def budget_from_args(args, strategy_mod=None, cache=None):
+    """Apply --memory-mb to the caches; returns the budgets, or None when unbounded."""
+    if not args.memory_mb:
+        return None
+    budgets = apply_budget(args.memory_mb, strategy_mod, cache)
+    print(f"[MEM] Budget de {args.memory_mb:g} Mo: {format_usage(budgets)}")
+    return budgets
+
+def report_memory(strategy_mod=None, cache=None, budgets=None):
+    """Print the measured usage of every cache against its budget."""
+    usage = memory_usage(strategy_mod, cache)
+    if usage:
+        print(f"[MEM] {format_usage(usage, budgets)}")
@@ -0,0 +1,194 @@
+"""Prometheus-style metrics of a client, served over HTTP.
+
+    python client_modular.py ... --metrics-port 9100
+    curl http://127.0.0.1:9100/metrics
+
+Everything is plain counters and fixed-bucket histograms updated from the
+event loop, so recording costs a few integer additions per request. The
+text exposition format is only built when /metrics is scraped.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+
+from memory_budget import memory_usage
+
+# Upper bounds of the move latency buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)
+# Upper bounds of the search depth buckets, in full moves
+DEPTH_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 16)
+# Upper bounds of the event loop lag buckets, in seconds
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Histogram:
+    """Cumulative-on-render histogram with fixed bucket upper bounds."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels=''):
+        lines = []
+        cumulative = 0
+        sep = ',' if labels else ''
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f'{{{labels}}}' if labels else ''
+        lines.append(f'{name}_sum{suffix} {self.sum:.6f}')
+        lines.append(f'{name}_count{suffix} {self.count}')
+        return lines
+
+class ClientMetrics:
+    """Counters and histograms of one client process."""
+
+    def __init__(self, cache=None, strategy_mod=None):
+        self.cache = cache
+        self.strategy_mod = strategy_mod
+        self.memory_budgets = None
+        self.started = time.time()
+        self.requests = {}
+        self.errors = {}
+        self.move_seconds = {'search': Histogram(LATENCY_BUCKETS), 'cache': Histogram(LATENCY_BUCKETS)}
+        self.search_depth = Histogram(DEPTH_BUCKETS)
+        self.search_nodes = 0
+        self.loop_lag = Histogram(LAG_BUCKETS)
+        self.last_loop_lag = 0.0
+        self.lag_task = None
+        self.startup_seconds = None
+
+    def request(self, kind):
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def error(self, kind):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def move(self, source, seconds, strategy_mod=None):
+        """Record a move answered from 'search' or 'cache', with the strategy's search statistics if any."""
+        self.move_seconds[source].observe(seconds)
+        info = getattr(strategy_mod, 'last_search', None)
+        if source == 'search' and info:
+            self.search_depth.observe(info['depth'])
+            self.search_nodes += info['nodes']
+
+    def render(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = [
+            '# HELP quarto_requests_total Requests received, by type.',
+            '# TYPE quarto_requests_total counter',
+        ]
+        lines += [f'quarto_requests_total{{type="{kind}"}} {n}' for kind, n in sorted(self.requests.items())]
+        lines += [
+            '# HELP quarto_errors_total Requests answered with an error, by cause.',
+            '# TYPE quarto_errors_total counter',
+        ]
+        lines += [f'quarto_errors_total{{cause="{kind}"}} {n}' for kind, n in sorted(self.errors.items())]
+        lines += [
+            '# HELP quarto_move_seconds Time to answer a play request, by source of the move.',
+            '# TYPE quarto_move_seconds histogram',
+        ]
+        for source, histogram in self.move_seconds.items():
+            lines += histogram.render('quarto_move_seconds', f'source="{source}"')
+        lines += [
+            '# HELP quarto_search_depth Depth reached by the searches, in full moves.',
+            '# TYPE quarto_search_depth histogram',
+        ]
+        lines += self.search_depth.render('quarto_search_depth')
+        lines += [
+            '# HELP quarto_search_nodes_total Nodes visited by the searches.',
+            '# TYPE quarto_search_nodes_total counter',
+            f'quarto_search_nodes_total {self.search_nodes}',
+        ]
+        if self.cache is not None:
+            stats = self.cache.stats()
+            lines += [
+                '# HELP quarto_move_cache_lookups_total Move cache lookups, by result.',
+                '# TYPE quarto_move_cache_lookups_total counter',
+                f'quarto_move_cache_lookups_total{{result="hit"}} {stats["hits"]}',
+                f'quarto_move_cache_lookups_total{{result="miss"}} {stats["misses"]}',
+                '# HELP quarto_move_cache_hit_ratio Share of move cache lookups that hit.',
+                '# TYPE quarto_move_cache_hit_ratio gauge',
+                f'quarto_move_cache_hit_ratio {stats["hit_ratio"]:.6f}',
+                '# HELP quarto_move_cache_entries Moves held by the move cache.',
+                '# TYPE quarto_move_cache_entries gauge',
+                f'quarto_move_cache_entries {stats["entries"]}',
+            ]
+        usage = memory_usage(self.strategy_mod, self.cache)
+        if usage:
+            lines += [
+                '# HELP quarto_memory_bytes Measured footprint of each cache.',
+                '# TYPE quarto_memory_bytes gauge',
+            ]
+            lines += [f'quarto_memory_bytes{{cache="{name}"}} {used}' for name, used in usage.items()]
+        if self.memory_budgets:
+            lines += [
+                '# HELP quarto_memory_budget_bytes Share of the memory budget given to each cache.',
+                '# TYPE quarto_memory_budget_bytes gauge',
+            ]
+            lines += [f'quarto_memory_budget_bytes{{cache="{name}"}} {limit}'
+                      for name, limit in self.memory_budgets.items()]
+        lines += [
+            '# HELP quarto_event_loop_lag_seconds Delay of the event loop waking up a periodic task.',
+            '# TYPE quarto_event_loop_lag_seconds histogram',
+        ]
+        lines += self.loop_lag.render('quarto_event_loop_lag_seconds')
+        lines += [
+            '# HELP quarto_event_loop_last_lag_seconds Last measured event loop lag.',
+            '# TYPE quarto_event_loop_last_lag_seconds gauge',
+            f'quarto_event_loop_last_lag_seconds {self.last_loop_lag:.6f}',
+        ]
+        if self.startup_seconds is not None:
+            lines += [
+                '# HELP quarto_startup_seconds Time from process start to listening for requests.',
+                '# TYPE quarto_startup_seconds gauge',
+                f'quarto_startup_seconds {self.startup_seconds:.6f}',
+            ]
+        lines += [
+            '# HELP quarto_uptime_seconds Time since the client started.',
+            '# TYPE quarto_uptime_seconds gauge',
+            f'quarto_uptime_seconds {time.time() - self.started:.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+async def monitor_event_loop(metrics, interval=0.5):
+    """Measure how late the loop wakes up a task sleeping for interval seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - start - interval)
+        metrics.last_loop_lag = lag
+        metrics.loop_lag.observe(lag)
+
+async def _serve_request(metrics, reader, writer):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), 5)
+        while (await asyncio.wait_for(reader.readline(), 5)) not in (b'\r\n', b'\n', b''):
+            pass
+        parts = request_line.decode('latin1').split()
+        if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+            status, body = '200 OK', metrics.render().encode('utf8')
+        else:
+            status, body = '404 Not Found', b'not found\n'
+        writer.write(f'HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode('latin1') + body)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+async def start_metrics_server(metrics, port, host='0.0.0.0', lag_interval=0.5):
+    """Serve GET /metrics on port and start measuring the event loop lag; returns the server."""
+    server = await asyncio.start_server(lambda r, w: _serve_request(metrics, r, w), host, port)
+    metrics.lag_task = asyncio.create_task(monitor_event_loop(metrics, lag_interval))
+    return server
@@ -0,0 +1,120 @@
+"""Bounded LRU cache of gen_move answers, shared by symmetric states.
+
+States are keyed by their canonical form (see symmetry.py); the cached
+move is stored in canonical coordinates and mapped back through the
+symmetry of the state being asked about.
+"""
+
+import json
+import os
+import sys
+from collections import OrderedDict
+
+from codec import PIECES, encode_board, piece_to_code
+from memory_budget import object_bytes
+from symmetry import canonical_form, to_canonical, to_original
+
+class MoveCache:
+    """LRU cache of moves keyed by canonical state, with hit/miss counters."""
+
+    def __init__(self, max_entries=1024, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._entry_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        """Measured footprint of the cache: its ordered dict and its entries."""
+        return sys.getsizeof(self._entries) + self._entry_bytes
+
+    def _add(self, key, entry):
+        old = self._entries.get(key)
+        if old is not None:
+            self._entry_bytes -= object_bytes(key) + object_bytes(old)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._entry_bytes += object_bytes(key) + object_bytes(entry)
+
+    def evict(self):
+        """Drop the least recently used moves until the cache fits its limits."""
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+            key, entry = self._entries.popitem(last=False)
+            self._entry_bytes -= object_bytes(key) + object_bytes(entry)
+
+    def _canonical(self, state):
+        """(key, perm, mask) of a state, or None if it cannot be encoded."""
+        try:
+            board = state['board']
+            if len(board) != 16:
+                return None
+            return canonical_form(encode_board(board), piece_to_code(state.get('piece')))
+        except (KeyError, TypeError):
+            return None
+
+    def lookup(self, state):
+        """Cached move for this state (remapped to its symmetry), or None."""
+        canonical = self._canonical(state)
+        if canonical is None:
+            return None
+        key, perm, mask = canonical
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        pos, piece = to_original(perm, mask, *entry)
+        return {'pos': pos, 'piece': None if piece is None else PIECES[piece]}
+
+    def store(self, state, move):
+        """Remember the move played in this state."""
+        if self.max_entries <= 0:
+            return
+        canonical = self._canonical(state)
+        if canonical is None:
+            return
+        key, perm, mask = canonical
+        piece = move.get('piece')
+        entry = to_canonical(perm, mask, move.get('pos'), None if piece is None else piece_to_code(piece))
+        self._add(key, entry)
+        self.evict()
+
+    def stats(self):
+        """Hit/miss metrics."""
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / total if total else 0.0,
+        }
+
+    def save(self, path):
+        """Write the cache to a JSON file, oldest entries first."""
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf8') as f:
+            json.dump([[key, pos, piece] for key, (pos, piece) in self._entries.items()], f)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Load entries saved by save(); returns how many were loaded."""
+        try:
+            with open(path, encoding='utf8') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"[CACHE] Ignoring unreadable cache file '{path}': {e}")
+            return 0
+        for key, pos, piece in entries[-self.max_entries:] if self.max_entries > 0 else []:
+            self._add(key, (pos, piece))
+        self.evict()
+        return len(self._entries)
@@ -0,0 +1,148 @@
+"""Single-process host for every player of a configuration file.
+
+Instead of one client interpreter per player, one asyncio loop listens on
+every port_client, subscribes all players concurrently and sends their
+play requests to one process pool shared by all of them. Strategies are
+imported once per worker and move caches are shared per strategy, so
+memory grows with the number of workers rather than with the number of
+players.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from client_modular import readJSON, subscribe, writeJSON
+from move_cache import MoveCache
+
+def engine_move(strategy_name, state):
+    """Run a strategy's gen_move; executed in the worker processes."""
+    return importlib.import_module(strategy_name).gen_move(state)
+
+def warm_up(strategy_names):
+    """Worker initializer: import every strategy before the first request."""
+    for name in strategy_names:
+        importlib.import_module(name)
+
+def load_players(path):
+    """Players of a JSON configuration file; the strategy defaults to 'strategy'."""
+    with open(path, encoding='utf8') as f:
+        players = json.load(f)
+    for p in players:
+        p.setdefault('strategy', 'strategy')
+    return players
+
+class PlayerHost:
+    """Serves every player from one event loop and one shared worker pool."""
+
+    def __init__(self, players, workers=None, cache_size=1024):
+        self.players = players
+        strategies = sorted(set(p['strategy'] for p in players))
+        self.pool = None
+        if workers != 0:
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=warm_up, initargs=(strategies,))
+        self.caches = {name: MoveCache(cache_size) for name in strategies} if cache_size > 0 else {}
+        self.servers = []
+
+    async def gen_move(self, strategy_name, state):
+        if self.pool is None:
+            return engine_move(strategy_name, state)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, engine_move, strategy_name, state)
+
+    async def handle_connection(self, reader, writer, player):
+        name = player['name']
+        request = await readJSON(reader)
+        req_type = request.get('request')
+        if req_type == 'ping':
+            print(f"[{name}] [PING]")
+            await writeJSON(writer, {'response': 'pong'})
+        elif req_type == 'play':
+            state = request.get('state')
+            print(f"[{name}] [PLAY] Etat reçu: {state}")
+            cache = self.caches.get(player['strategy'])
+            try:
+                move = cache.lookup(state) if cache is not None else None
+                if move is None:
+                    move = await self.gen_move(player['strategy'], state)
+                    if cache is not None:
+                        cache.store(state, move)
+                print(f"[{name}] [MOVE] Coup proposé: {move}")
+                await writeJSON(writer, {'response': 'move', 'move': move})
+            except Exception as e:
+                print(f"[{name}] [ERROR] Erreur lors de la génération du coup: {e}")
+                await writeJSON(writer, {'response': 'error', 'error': str(e)})
+        else:
+            print(f"[{name}] [ERROR] Requête inconnue: {req_type}")
+            await writeJSON(writer, {'response': 'error', 'error': f"Unknown request '{req_type}'"})
+        writer.close()
+        await writer.wait_closed()
+
+    async def start_player(self, player):
+        """Listen on the player's port, then subscribe it. Returns True on success."""
+        async def handler(reader, writer):
+            await self.handle_connection(reader, writer, player)
+        try:
+            server = await asyncio.start_server(handler, '0.0.0.0', player['port_client'])
+        except OSError as e:
+            print(f"⚠️  ERROR: {player['name']} cannot listen on port {player['port_client']}: {e}")
+            return False
+        if not await subscribe(player['host'], player['port_server'], player['port_client'],
+                               player['name'], player['matricules']):
+            server.close()
+            return False
+        self.servers.append(server)
+        return True
+
+    async def run(self):
+        start = time.perf_counter()
+        results = await asyncio.gather(*(self.start_player(p) for p in self.players))
+        print(f"{sum(results)}/{len(self.players)} players ready in {time.perf_counter() - start:.2f}s")
+        if not self.servers:
+            return
+        try:
+            await asyncio.gather(*(server.serve_forever() for server in self.servers))
+        finally:
+            for server in self.servers:
+                server.close()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        for name, cache in self.caches.items():
+            stats = cache.stats()
+            print(f"[CACHE] {name}: hits={stats['hits']} misses={stats['misses']} ratio={stats['hit_ratio']:.1%}")
+
+def run_host(players, workers=None, cache_size=1024):
+    host = PlayerHost(players, workers, cache_size)
+    try:
+        asyncio.run(host.run())
+    except KeyboardInterrupt:
+        print("\nHost stopped by user.")
+    finally:
+        host.close()
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Serve every Quarto player from one process')
+    parser.add_argument('--config', default=os.path.join(here, 'players_ultimate.json'), help='Players configuration file')
+    parser.add_argument('--workers', type=int, default=None, help='Search worker processes (0 searches in the event loop)')
+    parser.add_argument('--move-cache', type=int, default=1024, help='Cached moves per strategy (0 disables the cache)')
+    args = parser.parse_args()
+    try:
+        players = load_players(args.config)
+    except FileNotFoundError:
+        print(f"Error: Configuration file '{args.config}' not found.")
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print(f"Error: Configuration file '{args.config}' contains invalid JSON.")
+        sys.exit(1)
+    run_host(players, args.workers, args.move_cache)
+
+if __name__ == '__main__':
+    main()
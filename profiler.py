@@ -0,0 +1,167 @@
+"""Opt-in profiling of the gen_move calls of a client.
+
+    python client_modular.py ... --profile sampling --profile-every 10
+    python client.py ... --profile cprofile --profile-first 20 --profile-out moves.pstats
+
+Two modes, aggregated over the whole session:
+
+- cprofile: deterministic profile of every selected call, written as a
+  pstats file (python -m pstats, snakeviz, gprof2dot, flameprof);
+- sampling: a thread records the stack of the thread running gen_move
+  every --profile-interval milliseconds, written as collapsed stacks
+  ("a;b;c count" lines, for flamegraph.pl or speedscope). Much cheaper,
+  but a sample can only be taken when the sampler gets the GIL.
+
+Only the selected moves are profiled: the first K (--profile-first) and/or
+every Nth one (--profile-every); the others cost one counter increment.
+Without --profile the clients do not create a profiler at all.
+"""
+
+import os
+import sys
+import threading
+import time
+
+MODES = ('cprofile', 'sampling')
+# Profiled moves between two writes of the output file
+SAVE_EVERY = 10
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}"
+
+class StackSampler:
+    """Counts the stacks of one thread, sampled from a background thread."""
+
+    def __init__(self, interval, counts):
+        self.interval = interval
+        self.counts = counts
+        self.samples = 0
+
+    def run(self, func, *args):
+        """Call func(*args) in this thread while sampling it; stacks start at func."""
+        target = threading.get_ident()
+        root = func.__code__ if hasattr(func, '__code__') else None
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.interval):
+                frame = sys._current_frames().get(target)
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame))
+                    if frame.f_code is root:
+                        break
+                    frame = frame.f_back
+                # Skip samples taken outside func, just before or after the call
+                if stack and (root is None or frame is not None):
+                    key = ';'.join(reversed(stack))
+                    self.counts[key] = self.counts.get(key, 0) + 1
+                    self.samples += 1
+
+        thread = threading.Thread(target=sample, name='move-profiler', daemon=True)
+        thread.start()
+        try:
+            return func(*args)
+        finally:
+            stop.set()
+            thread.join()
+
+class MoveProfiler:
+    """Profiles the selected gen_move calls and aggregates them into one output file."""
+
+    def __init__(self, mode, path=None, first=None, every=None, interval=0.001):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r}")
+        self.mode = mode
+        self.path = path or f"profile-{os.getpid()}.{'pstats' if mode == 'cprofile' else 'collapsed'}"
+        self.first = first
+        self.every = every
+        self.interval = interval
+        self.moves = 0
+        self.profiled = 0
+        self.seconds = 0.0
+        self.stats = None  # pstats.Stats of the cprofile mode
+        self.stacks = {}  # collapsed stack -> samples, in the sampling mode
+        self.sampler = StackSampler(interval, self.stacks) if mode == 'sampling' else None
+
+    def selected(self, index):
+        """True if the move with this 0-based index gets profiled."""
+        if self.first is None and self.every is None:
+            return True
+        if self.first is not None and index < self.first:
+            return True
+        return self.every is not None and index % self.every == 0
+
+    def call(self, func, *args):
+        """func(*args), profiled if the move is selected."""
+        index = self.moves
+        self.moves += 1
+        if not self.selected(index):
+            return func(*args)
+        start = time.perf_counter()
+        try:
+            if self.mode == 'cprofile':
+                return self._run_cprofile(func, *args)
+            return self.sampler.run(func, *args)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.profiled += 1
+            if self.profiled % SAVE_EVERY == 0:
+                self.save()
+
+    def _run_cprofile(self, func, *args):
+        import cProfile
+        import pstats
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def save(self):
+        """Write the aggregated profile; returns its path, or None if nothing was profiled."""
+        if self.mode == 'cprofile':
+            if self.stats is None:
+                return None
+            self.stats.dump_stats(self.path)
+        else:
+            if not self.stacks:
+                return None
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf8') as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            os.replace(tmp, self.path)
+        return self.path
+
+    def summary(self):
+        return (f"{self.profiled}/{self.moves} coups profilés ({self.mode}), "
+                f"{self.seconds:.2f}s dans gen_move")
+
+def add_profile_arguments(parser):
+    """The --profile options shared by the clients."""
+    parser.add_argument('--profile', choices=MODES, help='Profile gen_move calls (deterministic or sampling)')
+    parser.add_argument('--profile-out', help='Aggregated profile file (default: profile-PID.pstats/.collapsed)')
+    parser.add_argument('--profile-first', type=int, help='Profile the first K moves')
+    parser.add_argument('--profile-every', type=int, help='Profile every Nth move')
+    parser.add_argument('--profile-interval', type=float, default=1.0, help='Sampling interval, in milliseconds')
+
+def profiler_from_args(args):
+    """A MoveProfiler for the parsed --profile options, or None when profiling is off."""
+    if not args.profile:
+        return None
+    profiler = MoveProfiler(args.profile, args.profile_out, args.profile_first, args.profile_every,
+                            args.profile_interval / 1000)
+    print(f"[PROFILE] Profilage {args.profile} des coups, sortie {profiler.path}")
+    return profiler
+
+def close_profiler(profiler):
+    """Write the profile of the session and report it."""
+    if profiler is None:
+        return
+    path = profiler.save()
+    print(f"[PROFILE] {profiler.summary()}" + (f", écrit dans {path}" if path else ""))
@@ -0,0 +1,390 @@
+"""Search workers on other machines, fed root subtrees over TCP.
+
+    python remote_search.py --port 5100 --processes 8 --memory-mb 256   # on each spare machine
+    python client_modular.py ... --strategy strategy_ultimate \\
+        --search-workers 192.168.1.20:5100,192.168.1.21:5100
+
+The worker daemon searches root subtrees with strategy_ultimate in a pool
+of --processes processes, each keeping its own transposition table, aged
+at every job and bounded by --memory-mb.
+
+The coordinator (Coordinator, used by strategy_ultimate when
+QUARTO_SEARCH_WORKERS lists workers) splits every iteration of
+iterative_deepening_search at the root: one job per square the pending
+piece can be placed on, searched by the worker with a full window for
+the remaining time. Jobs go to the workers with free slots, preferring
+the one that searched the same square at the previous depth (its table
+is warm). When the queue is empty, idle slots take a copy of the jobs
+running for more than STRAGGLER_FACTOR times the median answer time of
+the iteration, so that one slow or stuck worker (a straggler) does not
+hold the iteration; the first answer wins. Answers arriving after the
+deadline, or for another iteration, are dropped.
+
+A worker that does not answer the handshake, or whose connection breaks,
+is skipped and retried after RETRY_DELAY; its jobs go back to the queue.
+With no worker left the coordinator returns None and the iteration is
+searched locally.
+
+Protocol: one JSON object per line, in both directions.
+    {"request": "hello"}                  -> {"response": "hello", "slots": N}
+    {"request": "ping"}                   -> {"response": "pong"}
+    {"request": "search", "id": ..., "board": [...], "piece": "BDEC",
+     "pos": 5, "depth": 4, "budget": 0.8} -> {"response": "result", "id": ...,
+                                              "piece": ..., "score": ..., "nodes": ..., "complete": true}
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import selectors
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import codec
+
+DEFAULT_PORT = 5100
+# Seconds allowed to connect to a worker and get its handshake
+CONNECT_TIMEOUT = 0.5
+# Seconds before a failed worker is tried again
+RETRY_DELAY = 5.0
+# Seconds kept between a worker's budget and the coordinator's deadline, for the answer to travel
+NETWORK_MARGIN = 0.05
+# A job is copied to an idle slot once it has run STRAGGLER_FACTOR times the
+# median time of the answered jobs of the iteration, or STRAGGLER_WAIT
+# seconds if none was answered yet
+STRAGGLER_FACTOR = 2.0
+STRAGGLER_WAIT = 0.25
+# Longest wait for answers before checking for stragglers again
+STRAGGLER_POLL = 0.05
+
+def encode_message(message):
+    return json.dumps(message).encode('utf8') + b'\n'
+
+def parse_address(address):
+    """(host, port) of 'host:port' (or 'host', on DEFAULT_PORT)."""
+    host, _, port = address.strip().rpartition(':')
+    if not host:
+        return address.strip(), DEFAULT_PORT
+    return host, int(port)
+
+def parse_addresses(addresses):
+    return [parse_address(a) for a in addresses.split(',') if a.strip()]
+
+# -------------- WORKER --------------
+
+def search_subtree(board, pending, pos, depth, budget):
+    """
+    Search the subtree of placing pending on pos, depth full moves deep,
+    for at most budget seconds; returns (piece, score, nodes, complete).
+    """
+    import strategy_ultimate
+    codes, pending_code, available_mask = codec.decode_state({'board': board, 'piece': pending})
+    if pending_code == codec.EMPTY or codes[pos] != codec.EMPTY:
+        raise ValueError(f"cannot place {pending} on square {pos}")
+    new_board = board[:]
+    new_board[pos] = pending
+    if strategy_ultimate.scan_lines(new_board)[0]:
+        return None, 1000, 1, True
+    # Aged and bounded like the table of a client, as the daemon runs for many games
+    strategy_ultimate.begin_search()
+    start = time.time()
+    strategy_ultimate.last_search['nodes'] = 0
+    piece, score = strategy_ultimate.search_give(
+        new_board, codec.mask_pieces(available_mask), depth,
+        float('-inf'), float('inf'), True, start, budget
+    )
+    complete = time.time() - start <= budget and score not in (float('-inf'), float('inf'))
+    return piece, score if complete else None, strategy_ultimate.last_search['nodes'], complete
+
+async def _serve_connection(executor, slots, reader, writer):
+    loop = asyncio.get_running_loop()
+    lock = asyncio.Lock()
+
+    async def reply(message):
+        async with lock:
+            writer.write(encode_message(message))
+            await writer.drain()
+
+    async def run_search(request):
+        try:
+            piece, score, nodes, complete = await loop.run_in_executor(
+                executor, search_subtree, request['board'], request['piece'],
+                int(request['pos']), int(request['depth']), float(request['budget'])
+            )
+            message = {'response': 'result', 'id': request.get('id'), 'piece': piece,
+                       'score': score, 'nodes': nodes, 'complete': complete}
+        except Exception as e:
+            message = {'response': 'error', 'id': request.get('id'), 'error': f"{type(e).__name__}: {e}"}
+        try:
+            await reply(message)
+        except ConnectionError:
+            pass
+
+    tasks = set()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError:
+                await reply({'response': 'error', 'error': 'invalid JSON'})
+                continue
+            kind = request.get('request') if isinstance(request, dict) else None
+            if kind == 'hello':
+                await reply({'response': 'hello', 'slots': slots})
+            elif kind == 'ping':
+                await reply({'response': 'pong'})
+            elif kind == 'search':
+                task = asyncio.create_task(run_search(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            else:
+                await reply({'response': 'error', 'error': f"Unknown request '{kind}'"})
+    except ConnectionError:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+def _init_search_process(memory_mb):
+    """Bound the caches of a search process to memory_mb megabytes."""
+    import memory_budget
+    import strategy_ultimate
+    memory_budget.apply_budget(memory_mb, strategy_ultimate)
+
+async def serve_worker(host='0.0.0.0', port=DEFAULT_PORT, processes=None, ready=None, memory_mb=None):
+    """
+    Serve search jobs forever. processes=0 searches in threads of this
+    process (for tests); ready, an optional threading.Event, is set once
+    listening and gets the bound port as ready.port. memory_mb bounds the
+    caches of every search process.
+    """
+    if processes == 0:
+        executor, slots = ThreadPoolExecutor(max_workers=1), 1
+    else:
+        slots = processes or os.cpu_count() or 1
+        if memory_mb:
+            executor = ProcessPoolExecutor(max_workers=slots, initializer=_init_search_process,
+                                           initargs=(memory_mb,))
+        else:
+            executor = ProcessPoolExecutor(max_workers=slots)
+    server = await asyncio.start_server(lambda r, w: _serve_connection(executor, slots, r, w), host, port)
+    if ready is not None:
+        ready.port = server.sockets[0].getsockname()[1]
+        ready.set()
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# -------------- COORDINATOR --------------
+
+class WorkerLink:
+    """Connection of the coordinator to one worker daemon."""
+
+    def __init__(self, address):
+        self.address = address
+        self.sock = None
+        self.buffer = b''
+        self.slots = 0
+        self.busy = 0  # jobs sent and not answered yet, abandoned ones included
+        self.retry_at = 0.0
+        self.searched = set()  # squares it answered at the previous depth
+
+    @property
+    def connected(self):
+        return self.sock is not None
+
+    def connect(self):
+        """Connect and handshake; False (and retry later) if the worker does not answer."""
+        try:
+            self.sock = socket.create_connection(self.address, CONNECT_TIMEOUT)
+            self.sock.settimeout(CONNECT_TIMEOUT)
+            self.sock.sendall(encode_message({'request': 'hello'}))
+            while b'\n' not in self.buffer:
+                data = self.sock.recv(4096)
+                if not data:
+                    raise ConnectionError("closed during the handshake")
+                self.buffer += data
+            line, _, self.buffer = self.buffer.partition(b'\n')
+            hello = json.loads(line)
+            self.slots = max(1, int(hello['slots']))
+            self.busy = 0
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.fail(e)
+            return False
+
+    def fail(self, error=None):
+        if error is not None:
+            print(f"[REMOTE] Worker {self.address[0]}:{self.address[1]} indisponible: {error}")
+        if self.sock is not None:
+            self.sock.close()
+        self.sock = None
+        self.buffer = b''
+        self.searched = set()
+        self.retry_at = time.time() + RETRY_DELAY
+
+    def send(self, message):
+        self.sock.sendall(encode_message(message))
+
+    def receive(self):
+        """Messages available on the socket (call when it is readable)."""
+        data = self.sock.recv(65536)
+        if not data:
+            raise ConnectionError("connection closed by the worker")
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split(b'\n')
+        return [json.loads(line) for line in lines if line.strip()]
+
+class Coordinator:
+    """Farms the root subtrees of a search out to worker daemons."""
+
+    def __init__(self, addresses):
+        self.links = [WorkerLink(address) for address in addresses]
+        self.job_ids = itertools.count()
+
+    def ready_links(self):
+        """Connected workers, after (re)connecting those due for a retry."""
+        now = time.time()
+        for link in self.links:
+            if not link.connected and now >= link.retry_at:
+                link.connect()
+        return [link for link in self.links if link.connected]
+
+    def search_root(self, board, pending, positions, depth, deadline):
+        """
+        Search placing pending on each of positions, depth full moves deep,
+        until deadline (a time.time()). Returns ({pos: (piece, score)} of the
+        subtrees answered in time, nodes searched), or None if no worker
+        could take the jobs.
+        """
+        links = self.ready_links()
+        if not links:
+            return None
+        queue = list(positions)
+        results = {}
+        nodes = 0
+        jobs = {}  # job id -> (link, pos)
+        copies = {pos: [] for pos in positions}  # links searching each square
+        sent = {}  # pos -> time its first copy was sent
+        durations = []  # of the answered jobs
+        answered = {link: set() for link in links}
+        selector = selectors.DefaultSelector()
+        for link in links:
+            selector.register(link.sock, selectors.EVENT_READ, link)
+        try:
+            while len(results) < len(positions):
+                now = time.time()
+                budget = deadline - now - NETWORK_MARGIN
+                if budget <= 0:
+                    break
+                straggling = now - (STRAGGLER_FACTOR * sorted(durations)[len(durations) // 2]
+                                    if durations else STRAGGLER_WAIT)
+                for link in links:
+                    while link.connected and link.busy < link.slots:
+                        pos = self._next_job(link, queue, copies, results, sent, straggling)
+                        if pos is None:
+                            break
+                        job_id = next(self.job_ids)
+                        try:
+                            link.send({'request': 'search', 'id': job_id, 'board': board, 'piece': pending,
+                                       'pos': pos, 'depth': depth, 'budget': budget})
+                        except OSError as e:
+                            self._drop(link, e, selector, jobs, copies, queue, results)
+                            break
+                        jobs[job_id] = (link, pos)
+                        copies[pos].append(link)
+                        sent.setdefault(pos, now)
+                        link.busy += 1
+                if not any(link.connected for link in links):
+                    return None
+                for key, _ in selector.select(max(0.0, min(deadline - time.time(), STRAGGLER_POLL))):
+                    link = key.data
+                    try:
+                        messages = link.receive()
+                    except (OSError, ValueError) as e:
+                        self._drop(link, e, selector, jobs, copies, queue, results)
+                        continue
+                    for message in messages:
+                        link.busy = max(0, link.busy - 1)
+                        job = jobs.pop(message.get('id'), None)
+                        if job is None:
+                            continue  # answer to an abandoned job
+                        pos = job[1]
+                        copies[pos].remove(link)
+                        if message.get('response') != 'result':
+                            print(f"[REMOTE] Erreur du worker {link.address[0]}:{link.address[1]}: "
+                                  f"{message.get('error')}")
+                            continue
+                        nodes += message.get('nodes', 0)
+                        if message.get('complete') and pos not in results:
+                            results[pos] = (message['piece'], message['score'])
+                            durations.append(time.time() - sent[pos])
+                            answered[link].add(pos)
+        finally:
+            selector.close()
+        for link in links:
+            link.searched = answered[link]
+        return results, nodes
+
+    def _next_job(self, link, queue, copies, results, sent, straggling):
+        """
+        Square for a free slot of link: a queued one (preferably one it
+        searched at the previous depth), else a copy of a square first sent
+        before straggling and not answered yet.
+        """
+        if queue:
+            pos = next((p for p in queue if p in link.searched), queue[0])
+            queue.remove(pos)
+            return pos
+        waiting = [p for p in copies if p not in results and copies[p] and link not in copies[p]
+                   and sent[p] <= straggling]
+        if not waiting:
+            return None
+        # The square with the fewest copies in flight, then the one sent first
+        return min(waiting, key=lambda p: (len(copies[p]), sent[p]))
+
+    def _drop(self, link, error, selector, jobs, copies, queue, results):
+        """Forget a broken worker and queue its unanswered squares again."""
+        try:
+            selector.unregister(link.sock)
+        except (KeyError, ValueError):
+            pass
+        link.fail(error)
+        for job_id, (owner, pos) in list(jobs.items()):
+            if owner is link:
+                del jobs[job_id]
+                copies[pos].remove(link)
+                if pos not in results and not copies[pos] and pos not in queue:
+                    queue.append(pos)
+
+    def close(self):
+        for link in self.links:
+            if link.connected:
+                link.sock.close()
+                link.sock = None
+
+def main():
+    parser = argparse.ArgumentParser(description='Search worker daemon for strategy_ultimate')
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--processes', type=int, default=None, help='Search processes (default: one per CPU)')
+    parser.add_argument('--memory-mb', type=float, default=None, help='Memory budget of the caches of each search process, in MB')
+    args = parser.parse_args()
+    print(f"[REMOTE] Worker à l'écoute sur {args.host}:{args.port}, "
+          f"{args.processes or os.cpu_count()} processus de recherche")
+    try:
+        asyncio.run(serve_worker(args.host, args.port, args.processes, memory_mb=args.memory_mb))
+    except KeyboardInterrupt:
+        print("\n[REMOTE] Worker arrêté")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Replay recorded positions through a strategy and compare its moves.
+
+    python replay.py games.qlog --strategy strategy_ultimate
+    python replay.py games.qlog --count
+
+Records are streamed from the log, so arbitrarily large logs can be
+processed without loading them in memory. For every position the chosen
+strategy's move is compared with the recorded one, and recorded moves
+that handed over a winning piece while a safe one existed are counted
+as blunders.
+"""
+
+import argparse
+import importlib
+import sys
+import time
+
+from codec import EMPTY, piece_to_code
+from endgame_db import wins_with
+from game_log import iter_records, record_state
+
+def gives_winning_piece(codes, pending, pos, piece):
+    """True if the move lets the receiver win, and a safe piece existed."""
+    if pos is None or piece == EMPTY:
+        return False
+    board = codes[:]
+    board[pos] = pending
+    empties = [i for i in range(16) if board[i] == EMPTY]
+    def losing(p):
+        return any(wins_with(board, square, p) for square in empties)
+    if not losing(piece):
+        return False
+    used = set(board)
+    used.add(piece)
+    return any(not losing(p) for p in range(16) if p not in used)
+
+def replay(path, strategy_mod=None, limit=None, verbose=False):
+    """Stream a log and return summary statistics."""
+    stats = {'positions': 0, 'games': 0, 'blunders': 0, 'agree': 0, 'errors': 0, 'seconds': 0.0}
+    last_game = None
+    for game, codes, pending, pos, piece in iter_records(path):
+        if limit is not None and stats['positions'] >= limit:
+            break
+        stats['positions'] += 1
+        if game != last_game:
+            stats['games'] += 1
+            last_game = game
+        if gives_winning_piece(codes, pending, pos, piece):
+            stats['blunders'] += 1
+        if strategy_mod is None:
+            continue
+        state = record_state(codes, pending)
+        start = time.perf_counter()
+        try:
+            move = strategy_mod.gen_move(state)
+        except Exception as e:
+            stats['errors'] += 1
+            if verbose:
+                print(f"[REPLAY] game {game}: error {e}")
+            continue
+        stats['seconds'] += time.perf_counter() - start
+        recorded = (pos, None if piece == EMPTY else piece)
+        replayed = (move.get('pos'), None if move.get('piece') is None else piece_to_code(move['piece']))
+        if recorded == replayed:
+            stats['agree'] += 1
+        elif verbose:
+            print(f"[REPLAY] game {game}: recorded {recorded}, {strategy_mod.__name__} plays {replayed}")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a Quarto game log through a strategy')
+    parser.add_argument('log', help='Game log written with --game-log')
+    parser.add_argument('--strategy', default='strategy_ultimate', help='Strategy module to re-run')
+    parser.add_argument('--count', action='store_true', help='Only count games, positions and blunders')
+    parser.add_argument('--limit', type=int, default=None, help='Stop after this many positions')
+    parser.add_argument('--verbose', action='store_true', help='Print every disagreement')
+    args = parser.parse_args()
+
+    strategy_mod = None if args.count else importlib.import_module(args.strategy)
+    start = time.perf_counter()
+    try:
+        stats = replay(args.log, strategy_mod, args.limit, args.verbose)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    print(f"{stats['positions']} positions in {stats['games']} games, "
+          f"{stats['blunders']} recorded blunders ({elapsed:.2f}s, {stats['positions'] / max(elapsed, 1e-9):.0f} positions/s)")
+    if strategy_mod is not None and stats['positions']:
+        replayed = stats['positions'] - stats['errors']
+        print(f"{args.strategy}: agrees on {stats['agree']}/{replayed} moves, "
+              f"{stats['errors']} errors, {stats['seconds'] / max(replayed, 1) * 1000:.1f} ms/move")
+
+if __name__ == '__main__':
+    main()
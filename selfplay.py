@@ -0,0 +1,284 @@
+"""Parallel self-play to build labelled training positions.
+
+Two gen_move modules play each other from randomized openings across a
+process pool. Every position a side had to answer is stored with the
+final outcome seen from the side to move (+1 win, 0 draw, -1 loss) and
+the search score of the engine when it reports one (strategy_ultimate's
+last_search), NO_SCORE otherwise.
+
+Dataset layout in the output directory:
+
+    shard-00000.bin     fixed 20-byte records (RECORD, or DTYPE with NumPy)
+    shard-00000.keys    the 11-byte canonical key of each record
+    manifest.json       format version, records per shard, games played
+
+Positions are deduplicated by canonical form (symmetry.py) across the
+whole dataset. Games are committed in order, a chunk at a time, and the
+manifest is rewritten after each chunk: an interrupted run resumes from
+the last committed game and drops anything written after it.
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import random
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from codec import POSITION_KEY_BYTES, decode_board, encode_board, piece_to_code
+from endgame_db import wins_with
+from symmetry import canonical_key
+
+FORMAT = 1
+RECORD = struct.Struct('<16sBbh')
+NO_SCORE = -32768
+MANIFEST = 'manifest.json'
+
+try:
+    import numpy as np
+    DTYPE = np.dtype([('board', 'u1', 16), ('pending', 'u1'), ('outcome', 'i1'), ('score', '<i2')])
+except ImportError:
+    np = None
+    DTYPE = None
+
+def shard_name(index):
+    return f'shard-{index:05d}'
+
+def random_move(state, rng):
+    """Uniformly random legal answer to a state."""
+    board = state['board']
+    used = set(p for p in board if p is not None)
+    if state['piece'] is not None:
+        used.add(state['piece'])
+    pos = None
+    if state['piece'] is not None:
+        pos = rng.choice([i for i, p in enumerate(board) if p is None])
+    available = [p for p in decode_board(range(16)) if p not in used]
+    return {'pos': pos, 'piece': rng.choice(available) if available else None}
+
+def engine_score(module):
+    """Score of the module's last search as an int16, NO_SCORE if it has none."""
+    info = getattr(module, 'last_search', None)
+    if not info or info.get('score') is None:
+        return NO_SCORE
+    return max(-32767, min(32767, int(info['score'])))
+
+def _play_plies(strategies, game_index, random_plies, rng):
+    """Moves of one game: (positions, ply of the winning move or None)."""
+    modules = [importlib.import_module(name) for name in strategies]
+    if game_index % 2:
+        modules.reverse()
+    state = {'board': [None]*16, 'piece': None}
+    positions = []
+    winner = None
+    for ply in range(33):
+        if ply < random_plies:
+            move, score = random_move(state, rng), NO_SCORE
+        else:
+            module = modules[ply % 2]
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                move = module.gen_move(state)
+            score = engine_score(module)
+        if state['piece'] is not None:
+            positions.append((encode_board(state['board']), piece_to_code(state['piece']), ply, score))
+        board = state['board'][:]
+        if move['pos'] is not None:
+            codes = encode_board(board)
+            if wins_with(codes, move['pos'], piece_to_code(state['piece'])):
+                winner = ply
+                break
+            board[move['pos']] = state['piece']
+        if move['piece'] is None or None not in board:
+            break
+        state = {'board': board, 'piece': move['piece']}
+    return positions, winner
+
+def play_game(strategies, game_index, seed, random_plies):
+    """Play one game; returns a list of (codes, pending, outcome, score).
+
+    strategies are the module names of the first and second player,
+    swapped on odd games so both engines start equally often. The
+    engines' global random module is seeded from the game for the
+    length of the game, then restored for the caller.
+    """
+    rng = random.Random(seed * 1_000_003 + game_index)
+    saved_random = random.getstate()
+    random.seed(rng.random())
+    try:
+        positions, winner = _play_plies(strategies, game_index, random_plies, rng)
+    finally:
+        random.setstate(saved_random)
+    records = []
+    for codes, pending, ply, score in positions:
+        if winner is None:
+            outcome = 0
+        else:
+            outcome = 1 if (winner - ply) % 2 == 0 else -1
+        records.append((codes, pending, outcome, score))
+    return records
+
+def set_move_time(strategies, move_time):
+    """Worker initializer: shorten the thinking time of engines that expose one."""
+    for name in strategies:
+        module = importlib.import_module(name)
+        if move_time is not None and hasattr(module, 'MOVE_TIME_LIMIT'):
+            module.MOVE_TIME_LIMIT = move_time
+            module.ENDGAME_TIME_LIMIT = 2 * move_time
+
+class DatasetWriter:
+    """Appends deduplicated records to the shards of a dataset directory."""
+
+    def __init__(self, directory, shard_size=1 << 20):
+        self.directory = directory
+        self.shard_size = shard_size
+        os.makedirs(directory, exist_ok=True)
+        self.manifest = {'format': FORMAT, 'shards': [], 'games': 0, 'duplicates': 0}
+        path = os.path.join(directory, MANIFEST)
+        if os.path.exists(path):
+            with open(path, encoding='utf8') as f:
+                self.manifest = json.load(f)
+            if self.manifest.get('format') != FORMAT:
+                raise ValueError(f"{path}: unsupported dataset format {self.manifest.get('format')}")
+        self.seen = set()
+        for shard in self.manifest['shards']:
+            self._truncate(shard)
+            with open(self._path(shard['name'], '.keys'), 'rb') as f:
+                keys = f.read()
+            for i in range(0, len(keys), POSITION_KEY_BYTES):
+                self.seen.add(keys[i:i + POSITION_KEY_BYTES])
+        self.buffer = []
+
+    def _path(self, name, suffix):
+        return os.path.join(self.directory, name + suffix)
+
+    def _truncate(self, shard):
+        """Drop records written after the last committed chunk."""
+        for suffix, size in (('.bin', RECORD.size), ('.keys', POSITION_KEY_BYTES)):
+            with open(self._path(shard['name'], suffix), 'ab') as f:
+                f.truncate(shard['records'] * size)
+
+    @property
+    def games(self):
+        return self.manifest['games']
+
+    @property
+    def records(self):
+        return sum(shard['records'] for shard in self.manifest['shards'])
+
+    def add_game(self, records):
+        for codes, pending, outcome, score in records:
+            key = canonical_key(codes, pending).to_bytes(POSITION_KEY_BYTES, 'big')
+            if key in self.seen:
+                self.manifest['duplicates'] += 1
+                continue
+            self.seen.add(key)
+            self.buffer.append((key, RECORD.pack(bytes(codes), pending, outcome, score)))
+        self.manifest['games'] += 1
+
+    def flush(self):
+        """Write buffered records, then commit them in the manifest."""
+        shards = self.manifest['shards']
+        while self.buffer:
+            if not shards or shards[-1]['records'] >= self.shard_size:
+                shards.append({'name': shard_name(len(shards)), 'records': 0})
+                self._truncate(shards[-1])
+            shard = shards[-1]
+            take = self.buffer[:self.shard_size - shard['records']]
+            del self.buffer[:len(take)]
+            with open(self._path(shard['name'], '.bin'), 'ab') as f:
+                f.write(b''.join(record for _, record in take))
+            with open(self._path(shard['name'], '.keys'), 'ab') as f:
+                f.write(b''.join(key for key, _ in take))
+            shard['records'] += len(take)
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + '.tmp', 'w', encoding='utf8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+def generate(directory, games, strategies=('strategy_ultimate', 'strategy_ultimate'), workers=None,
+             random_plies=4, shard_size=1 << 20, chunk_games=16, seed=0, move_time=None, verbose=False):
+    """Play games until the dataset in directory holds `games` games; returns the writer.
+
+    workers=0 plays every game in this process.
+    """
+    writer = DatasetWriter(directory, shard_size)
+    start = time.time()
+    first = writer.games
+    if workers == 0:
+        set_move_time(strategies, move_time)
+        results = (play_game(strategies, i, seed, random_plies) for i in range(first, games))
+        pool = None
+    else:
+        workers = workers or os.cpu_count() or 1
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=set_move_time,
+                                   initargs=(strategies, move_time))
+        results = ordered_results(pool, workers, strategies, first, games, seed, random_plies)
+    try:
+        for records in results:
+            writer.add_game(records)
+            if (writer.games - first) % chunk_games == 0:
+                writer.flush()
+                if verbose:
+                    print(f"[SELFPLAY] {writer.games}/{games} parties, {writer.records} positions, "
+                          f"{writer.manifest['duplicates']} doublons, {time.time() - start:.0f}s")
+    finally:
+        writer.flush()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return writer
+
+def ordered_results(pool, workers, strategies, first, last, seed, random_plies):
+    """Game results in game order, with 4 games per worker of the pool in flight at most."""
+    in_flight = {}
+    limit = 4 * workers
+    next_game = first
+    for index in range(first, last):
+        while next_game < last and len(in_flight) < limit:
+            in_flight[next_game] = pool.submit(play_game, strategies, next_game, seed, random_plies)
+            next_game += 1
+        yield in_flight.pop(index).result()
+
+def iter_dataset(directory):
+    """Stream (codes, pending, outcome, score) from every committed record of a dataset."""
+    with open(os.path.join(directory, MANIFEST), encoding='utf8') as f:
+        manifest = json.load(f)
+    for shard in manifest['shards']:
+        with open(os.path.join(directory, shard['name'] + '.bin'), 'rb') as f:
+            data = f.read(shard['records'] * RECORD.size)
+        for board, pending, outcome, score in RECORD.iter_unpack(data):
+            yield list(board), pending, outcome, score
+
+def load_dataset(directory):
+    """Every committed record of a dataset as one NumPy structured array (DTYPE)."""
+    if np is None:
+        raise RuntimeError("load_dataset needs numpy")
+    with open(os.path.join(directory, MANIFEST), encoding='utf8') as f:
+        manifest = json.load(f)
+    parts = [np.fromfile(os.path.join(directory, shard['name'] + '.bin'), dtype=DTYPE, count=shard['records'])
+             for shard in manifest['shards']]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=DTYPE)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate Quarto self-play training data')
+    parser.add_argument('--out', default='selfplay-data', help='Dataset directory (resumed if it exists)')
+    parser.add_argument('--games', type=int, default=1000, help='Total number of games in the dataset')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (0 = no pool)')
+    parser.add_argument('--strategy', default='strategy_ultimate', help='Module of the first player')
+    parser.add_argument('--opponent', default=None, help='Module of the second player (default: --strategy)')
+    parser.add_argument('--random-plies', type=int, default=4, help='Random moves at the start of each game')
+    parser.add_argument('--move-time', type=float, default=None, help='Thinking time per move for engines that support it')
+    parser.add_argument('--shard-size', type=int, default=1 << 20, help='Records per shard')
+    parser.add_argument('--chunk-games', type=int, default=16, help='Games per committed chunk')
+    parser.add_argument('--seed', type=int, default=0, help='Base seed of the openings')
+    args = parser.parse_args()
+
+    strategies = (args.strategy, args.opponent or args.strategy)
+    writer = generate(args.out, args.games, strategies, args.workers, args.random_plies,
+                      args.shard_size, args.chunk_games, args.seed, args.move_time, verbose=True)
+    print(f"[SELFPLAY] {writer.games} parties, {writer.records} positions dans {args.out}")
+
+if __name__ == '__main__':
+    main()
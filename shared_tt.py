@@ -0,0 +1,196 @@
+"""Transposition table shared by every process on a host.
+
+The table lives in a named multiprocessing.shared_memory segment of fixed
+size, so memory use does not grow with the number of workers. Each slot
+holds three 64-bit words: key_lo ^ data, key_hi ^ data and data. Writers
+store all three without locking; a reader recovers the key by XORing with
+data and treats any mismatch (an empty slot, another position or a torn
+concurrent write) as a miss. Slots come in buckets of two: the first
+keeps the deepest entry stored in the bucket, the second always takes the
+entries too shallow for the first. Replacement looks at depths only:
+every process counts its own generations, so their ages cannot be
+compared across processes.
+
+The segment outlives the processes using it; whoever owns the host (for
+instance start_players_ultimate.py) removes it with unlink_shared_table.
+"""
+
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from tt_store import decode_key, decode_move, encode_key, encode_move
+
+MAGIC = b'QSTT'
+VERSION = 1
+HEADER = struct.Struct('<4sIQ')
+HEADER_SIZE = 64
+SLOT = struct.Struct('<QQQ')
+BUCKET_SLOTS = 2
+DEFAULT_SIZE_MB = 64
+
+MASK64 = (1 << 64) - 1
+USED = 1 << 63
+
+def pack_entry(entry):
+    """Pack (depth, value, flag, best, generation) into one 64-bit word."""
+    depth, value, flag, best, generation = entry
+    return (USED | min(depth, 255) | (int(value) + 32768) << 8 | flag << 24
+            | encode_move(best) << 26 | generation << 34)
+
+def unpack_entry(data, ply):
+    """Inverse of pack_entry."""
+    return (
+        data & 0xFF,
+        ((data >> 8) & 0xFFFF) - 32768,
+        (data >> 24) & 0x3,
+        decode_move((data >> 26) & 0xFF, ply),
+        (data >> 34) & 0xFFFF,
+    )
+
+# Python 3.13 added SharedMemory(track=False); before it every process
+# registers the segments it opens with the resource tracker, which unlinks
+# them when that process exits
+TRACK_PARAMETER = sys.version_info >= (3, 13)
+
+def _tracker_name(shm):
+    """Name the resource tracker knows a segment by: its POSIX name, with the leading slash."""
+    return '/' + shm.name
+
+def _attach(name, size, create):
+    """SharedMemory segment that is not unlinked when this process exits."""
+    if TRACK_PARAMETER:
+        return shared_memory.SharedMemory(name=name, create=create, size=size, track=False)
+    shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+    resource_tracker.unregister(_tracker_name(shm), 'shared_memory')
+    return shm
+
+class SharedTranspositionTable:
+    """Dict-like transposition table over a named shared memory segment."""
+
+    def __init__(self, name, size_mb=DEFAULT_SIZE_MB):
+        self.name = name
+        try:
+            self._shm = _attach(name, 0, False)
+        except FileNotFoundError:
+            try:
+                slots = max(BUCKET_SLOTS, (int(size_mb * 2**20) - HEADER_SIZE) // SLOT.size // BUCKET_SLOTS * BUCKET_SLOTS)
+                self._shm = _attach(name, HEADER_SIZE + slots * SLOT.size, True)
+                HEADER.pack_into(self._shm.buf, 0, MAGIC, VERSION, slots)
+            except FileExistsError:
+                # Another process created it first
+                self._shm = _attach(name, 0, False)
+        self._buf = self._shm.buf
+        self.slots = self._read_header()
+        self.buckets = self.slots // BUCKET_SLOTS
+
+    def _read_header(self):
+        deadline = time.time() + 1.0
+        while True:
+            magic, version, slots = HEADER.unpack_from(self._buf, 0)
+            if magic == MAGIC and version == VERSION:
+                return slots
+            if time.time() > deadline:
+                raise ValueError(f"Shared memory '{self.name}' is not a transposition table")
+            # The creator has not written the header yet
+            time.sleep(0.001)
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def _bucket(self, packed):
+        lo, hi = packed & MASK64, packed >> 64
+        h = ((lo * 0x9E3779B97F4A7C15) ^ (hi * 0xC2B2AE3D27D4EB4F)) & MASK64
+        first = (h >> 17) % self.buckets * BUCKET_SLOTS
+        return lo, hi, range(first, first + BUCKET_SLOTS)
+
+    def _read(self, slot):
+        w0, w1, data = SLOT.unpack_from(self._buf, HEADER_SIZE + slot * SLOT.size)
+        return w0 ^ data, w1 ^ data, data
+
+    def get(self, key, default=None):
+        lo, hi, slots = self._bucket(encode_key(key))
+        for slot in slots:
+            key_lo, key_hi, data = self._read(slot)
+            if data & USED and key_lo == lo and key_hi == hi:
+                return unpack_entry(data, key[2])
+        return default
+
+    def __getitem__(self, key):
+        entry = self.get(key)
+        if entry is None:
+            raise KeyError(key)
+        return entry
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def __setitem__(self, key, entry):
+        if not -32768 <= entry[1] <= 32767:
+            return
+        lo, hi, slots = self._bucket(encode_key(key))
+        deep, always = slots
+        victim = None
+        for slot in slots:
+            key_lo, key_hi, data = self._read(slot)
+            if data & USED and key_lo == lo and key_hi == hi:
+                victim = slot
+                break
+        if victim is None:
+            # Depth-preferred slot if the entry is at least as deep as its occupant
+            data = self._read(deep)[2]
+            victim = deep if not data & USED or entry[0] >= data & 0xFF else always
+        data = pack_entry(entry)
+        SLOT.pack_into(self._buf, HEADER_SIZE + victim * SLOT.size, lo ^ data, hi ^ data, data)
+
+    def setdefault(self, key, entry):
+        existing = self.get(key)
+        if existing is not None:
+            return existing
+        self[key] = entry
+        return entry
+
+    def items(self):
+        """Decode every occupied slot; slow, meant for snapshots and reports."""
+        for slot in range(self.slots):
+            key_lo, key_hi, data = self._read(slot)
+            if not data & USED:
+                continue
+            try:
+                key = decode_key(key_hi << 64 | key_lo)
+            except (IndexError, KeyError):
+                # torn write
+                continue
+            yield key, unpack_entry(data, key[2])
+
+    def keys(self):
+        return (key for key, _ in self.items())
+
+    __iter__ = keys
+
+    def __len__(self):
+        """Number of occupied slots; scans the whole table, keep it out of the search."""
+        return sum(1 for slot in range(self.slots) if self._read(slot)[2] & USED)
+
+    def clear(self):
+        """Empty the table for every process using it."""
+        self._buf[HEADER_SIZE:HEADER_SIZE + self.slots * SLOT.size] = bytes(self.slots * SLOT.size)
+
+    def close(self):
+        self._buf = None
+        self._shm.close()
+
+def unlink_shared_table(name):
+    """Remove the shared segment; processes still attached keep their mapping."""
+    try:
+        shm = _attach(name, 0, False)
+    except FileNotFoundError:
+        return False
+    shm.close()
+    if not TRACK_PARAMETER:
+        # unlink() unregisters from the resource tracker before Python 3.13
+        resource_tracker.register(_tracker_name(shm), 'shared_memory')
+    shm.unlink()
+    return True
@@ -1,3 +1,4 @@
+import argparse
 import json
 import subprocess
 import os
@@ -6,6 +7,9 @@ import sys
 import socket
 import time
 
+from player_host import run_host
+from supervisor import SupervisedClient, cpu_sets, supervise
+
 def check_server_availability(host, port, timeout=2):
     """Check if a server is available before starting clients."""
     try:
@@ -17,7 +21,28 @@ def check_server_availability(host, port, timeout=2):
     except Exception:
         return False
 
+def build_command(p):
+    """Command line starting the client of one player."""
+    return [
+        'python', 'client.py',
+        '--host',        p['host'],
+        '--port-server', str(p['port_server']),
+        '--port-client', str(p['port_client']),
+        '--name',        p['name'],
+        '--matricules',
+    ] + list(map(str, p['matricules']))
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Start every player of players.json')
+    parser.add_argument('--single-process', action='store_true', help='Serve all players from one process (see player_host.py)')
+    parser.add_argument('--workers', type=int, default=None, help='Search worker processes with --single-process')
+    parser.add_argument('--supervise', action='store_true', help='Ping clients, record latency and restart crashed ones')
+    parser.add_argument('--ping-interval', type=float, default=5.0, help='Seconds between health checks with --supervise')
+    parser.add_argument('--pin-cpus', type=int, default=0, help='Pin each client to its own set of N CPUs with --supervise')
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     # load clients configuration
     here = os.path.dirname(__file__)
     cfg = os.path.join(here, 'players.json')
@@ -45,17 +70,21 @@ def main():
                 sys.exit(1)
             break  # Only check the first server configuration
 
+    if args.single_process:
+        # players.json players all use strategy.py, like client.py
+        run_host([dict(p, strategy=p.get('strategy', 'strategy')) for p in players], args.workers)
+        return
+
+    if args.supervise:
+        cpus = cpu_sets(len(players), args.pin_cpus)
+        clients = [SupervisedClient(p['name'], build_command(p), p['port_client'], c) for p, c in zip(players, cpus)]
+        supervise(clients, cwd=here, ping_interval=args.ping_interval)
+        return
+
     procs = []
     try:
         for p in players:
-            cmd = [
-                'python', 'client.py',
-                '--host',        p['host'],
-                '--port-server', str(p['port_server']),
-                '--port-client', str(p['port_client']),
-                '--name',        p['name'],
-                '--matricules',
-            ] + list(map(str, p['matricules']))
+            cmd = build_command(p)
             # start client in quarto folder
             proc = subprocess.Popen(cmd, cwd=here)
             procs.append(proc)
@@ -1,3 +1,4 @@
+import argparse
 import json
 import subprocess
 import os
@@ -6,6 +7,10 @@ import sys
 import socket
 import time
 
+from player_host import run_host
+from supervisor import SupervisedClient, cpu_sets, supervise
+from shared_tt import SharedTranspositionTable, unlink_shared_table
+
 def check_server_availability(host, port, timeout=2):
     """Check if a server is available before starting clients."""
     try:
@@ -17,7 +22,33 @@ def check_server_availability(host, port, timeout=2):
     except Exception:
         return False
 
+def build_command(p, extra_args=(), memory_mb=None):
+    """Command line starting the client of one player; its "memory_mb" overrides the default memory_mb."""
+    memory_mb = p.get('memory_mb', memory_mb)
+    memory_args = ['--memory-mb', str(memory_mb)] if memory_mb else []
+    return [
+        'python', 'client_modular.py',
+        '--host',        p['host'],
+        '--port-server', str(p['port_server']),
+        '--port-client', str(p['port_client']),
+        '--name',        p['name'],
+        '--matricules',
+    ] + list(map(str, p['matricules'])) + ['--strategy', p['strategy']] + memory_args + list(extra_args)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Start every player of players_ultimate.json')
+    parser.add_argument('--shared-tt', help='Name of a shared memory transposition table used by all players')
+    parser.add_argument('--shared-tt-mb', type=float, default=64, help='Size of the shared transposition table in MB')
+    parser.add_argument('--single-process', action='store_true', help='Serve all players from one process (see player_host.py)')
+    parser.add_argument('--workers', type=int, default=None, help='Search worker processes with --single-process')
+    parser.add_argument('--supervise', action='store_true', help='Ping clients, record latency and restart crashed ones')
+    parser.add_argument('--ping-interval', type=float, default=5.0, help='Seconds between health checks with --supervise')
+    parser.add_argument('--memory-mb', type=float, help='Memory budget of each client, unless its "memory_mb" sets one')
+    parser.add_argument('--pin-cpus', type=int, default=0, help='Pin each client to its own set of N CPUs with --supervise')
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     # load clients configuration
     here = os.path.dirname(__file__)
     cfg = os.path.join(here, 'players_ultimate.json')
@@ -45,17 +76,42 @@ def main():
                 sys.exit(1)
             break  # Only check the first server configuration
 
+    extra_args = []
+    if args.shared_tt:
+        # Created once here so its size does not depend on which client starts first
+        SharedTranspositionTable(args.shared_tt, args.shared_tt_mb).close()
+        extra_args = ['--shared-tt', args.shared_tt, '--shared-tt-mb', str(args.shared_tt_mb)]
+        print(f"Shared transposition table '{args.shared_tt}' ({args.shared_tt_mb:g} MB)")
+
+    if args.single_process:
+        if args.memory_mb or any('memory_mb' in p for p in players):
+            print("Warning: memory budgets only apply to separate client processes, ignored with --single-process")
+        if args.shared_tt:
+            # Inherited by the search workers
+            os.environ['QUARTO_SHARED_TT'] = args.shared_tt
+            os.environ['QUARTO_SHARED_TT_MB'] = str(args.shared_tt_mb)
+        try:
+            run_host(players, args.workers)
+        finally:
+            if args.shared_tt:
+                unlink_shared_table(args.shared_tt)
+        return
+
+    if args.supervise:
+        cpus = cpu_sets(len(players), args.pin_cpus)
+        clients = [SupervisedClient(p['name'], build_command(p, extra_args, args.memory_mb), p['port_client'], c)
+                   for p, c in zip(players, cpus)]
+        try:
+            supervise(clients, cwd=here, ping_interval=args.ping_interval)
+        finally:
+            if args.shared_tt:
+                unlink_shared_table(args.shared_tt)
+        return
+
     procs = []
     try:
         for p in players:
-            cmd = [
-                'python', 'client_modular.py',
-                '--host',        p['host'],
-                '--port-server', str(p['port_server']),
-                '--port-client', str(p['port_client']),
-                '--name',        p['name'],
-                '--matricules',
-            ] + list(map(str, p['matricules'])) + ['--strategy', p['strategy']]
+            cmd = build_command(p, extra_args, args.memory_mb)
             # start client in quarto folder
             proc = subprocess.Popen(cmd, cwd=here)
             procs.append(proc)
@@ -87,6 +143,9 @@ def main():
                 proc.wait(timeout=5)
             except subprocess.TimeoutExpired:
                 proc.kill()
+    finally:
+        if args.shared_tt:
+            unlink_shared_table(args.shared_tt)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,22 @@
+"""Time elapsed since the current process was started.
+
+On Linux the process start time comes from /proc/self/stat (in clock
+ticks since boot), so the interpreter's own startup and every import are
+included; elsewhere it falls back to the time this module was imported.
+"""
+
+import os
+import time
+
+_IMPORTED_AT = time.monotonic()
+
+def seconds_since_start():
+    """Seconds since this process started (to the clock tick on Linux)."""
+    try:
+        with open('/proc/self/stat', 'rb') as f:
+            # Fields after the command name, which may contain spaces
+            fields = f.read().rsplit(b')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return max(0.0, time.clock_gettime(time.CLOCK_BOOTTIME) - started)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic() - _IMPORTED_AT
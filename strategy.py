@@ -1,5 +1,6 @@
 import random
-import re
+
+import codec
 
 # Helper functions for Quarto board evaluation
 
@@ -45,58 +46,25 @@ def is_winning(board):
 
 def get_all_pieces():
     """Get all possible Quarto pieces as strings."""
-    pieces = set()
-    for size in ["B", "S"]:
-        for color in ["D", "L"]:
-            for weight in ["E", "F"]:
-                for shape in ["C", "P"]:
-                    pieces.add(size + color + weight + shape)
-    return pieces
+    return set(codec.PIECES)
 
 
 def extract_available_pieces(state):
     """Get available pieces from the game state by checking what's not on the board."""
-    board = state['board']
-    pending = state.get('piece')
-    
-    # Get pieces that are already on the board or pending
-    used_pieces = set()
-    for piece in board:
-        if piece is not None:
-            used_pieces.add(piece)
-    
-    if pending:
-        used_pieces.add(pending)
-    
-    # All possible pieces
-    all_pieces = get_all_pieces()
-    
-    # Filter out used pieces
-    available_pieces = list(all_pieces - used_pieces)
-    
-    # Debug output
-    print(f"[DEBUG] Board has {len([p for p in board if p is not None])}/{len(board)} pieces placed")
-    print(f"[DEBUG] Found {len(available_pieces)} available pieces")
-    print(f"[DEBUG] Available pieces: {', '.join(sorted(available_pieces)[:5])}{'...' if len(available_pieces) > 5 else ''}")
-    
-    return available_pieces
-
-
-# only match strings of the form [B|S][D|L][E|F][C|P]
-VALID_PIECE = re.compile(r'^[BS][DL][EF][CP]$')
+    return codec.mask_pieces(codec.decode_state(state)[2])
+
 
 def gen_move(state):
-    board   = state['board']
+    # validate the state and decode it in one pass
+    codes, pending_code, available_mask = codec.decode_state(state)
     pending = state.get('piece')
 
     # valid empty slots
-    empties = [i for i, v in enumerate(board) if v is None]
+    empties = [i for i, c in enumerate(codes) if c == codec.EMPTY]
     if pending is not None and not empties:
         raise Exception("No empty squares left")
 
-    # compute and filter available pieces
-    available = extract_available_pieces(state)
-    available = [p for p in available if VALID_PIECE.match(p)]
+    available = codec.mask_pieces(available_mask)
     if not available and pending is None:
         raise Exception("No pieces to give on first move")
 
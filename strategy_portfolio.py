@@ -0,0 +1,189 @@
+"""Portfolio strategy: a fast guaranteed answer, replaced by a deeper one in time.
+
+    python client_modular.py ... --strategy strategy_portfolio
+
+Every move starts with strategy_strong, which answers in milliseconds.
+Meanwhile strategy_ultimate searches the same state in a worker process
+(which keeps its transposition table and game session between moves).
+At the deadline the deep move is played only if it is verified: legal,
+winning when an immediate win exists, and not handing the opponent a
+winning piece when a safe one exists. Otherwise, or if the search came
+back without a real result, the strategy_strong move is played, so the
+move is never worse than strategy_strong's on these tactical checks.
+
+The engines consulted depend on the game phase (PHASES): the opening is
+left to strategy_strong, where the capped search sees nothing more, and
+the endgame gets a longer budget for the solver.
+"""
+
+import atexit
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import codec
+import strategy_strong
+
+# Phase name, largest number of empty squares, deep search budget in seconds (None = heuristic only)
+PHASES = (
+    ('endgame', 6, 1.0),
+    ('middlegame', 12, 0.5),
+    ('opening', 16, None),
+)
+# Extra wait for the worker's answer beyond its search budget
+RESULT_MARGIN = 0.2
+
+# Statistics of the last move, read by the client metrics like strategy_ultimate's
+last_search = {'score': None, 'depth': 0, 'nodes': 0, 'seconds': 0.0}
+last_choice = {'phase': None, 'engine': None, 'reason': None}
+
+_pool = None
+# Future of the last deep search, which may still run after its deadline
+_outstanding = None
+# (tt_bytes, endgame_bytes) memory budget of the worker, see set_memory_budget
+_budget = None
+# Cache footprints the worker measured after its last search
+_worker_memory = {}
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=1, initializer=_warm_up, initargs=(_budget,))
+        atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+def _reset_pool():
+    global _pool, _outstanding
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+    _outstanding = None
+
+def _warm_up(budget=None):
+    import strategy_ultimate
+    if budget is not None:
+        strategy_ultimate.set_memory_budget(*budget)
+
+def _deep_move(state, budget):
+    """Run strategy_ultimate in the worker; returns its move and search statistics."""
+    import strategy_ultimate
+    move = strategy_ultimate.gen_move(state, time_limit=budget)
+    return move, dict(strategy_ultimate.last_search, memory=strategy_ultimate.memory_usage())
+
+def _new_game():
+    import strategy_ultimate
+    strategy_ultimate.new_game()
+
+def new_game():
+    """Forward the start of a new game to the deep search worker."""
+    if _pool is not None:
+        _pool.submit(_new_game)
+
+def set_memory_budget(tt_bytes=None, endgame_bytes=None):
+    """Bound the caches of the deep search worker, which holds all of this strategy's memory."""
+    global _budget
+    _budget = (tt_bytes, endgame_bytes)
+    if _pool is not None:
+        _pool.submit(_warm_up, _budget)
+
+def memory_usage():
+    """Caches of the worker as measured after its last search, empty before the first one."""
+    return dict(_worker_memory)
+
+def game_phase(empties):
+    """(name, deep search budget) of a position with this many empty squares."""
+    for name, max_empties, budget in PHASES:
+        if empties <= max_empties:
+            return name, budget
+    return PHASES[-1][0], PHASES[-1][2]
+
+def verify_move(state, move):
+    """None if move is a sound answer to state, else the reason it is not."""
+    board = state['board']
+    pending = state.get('piece')
+    empties = [i for i, p in enumerate(board) if p is None]
+    used = set(p for p in board if p is not None) | {pending}
+    available = [p for p in codec.PIECES if p not in used]
+    pos, piece = move.get('pos'), move.get('piece')
+
+    if pending is not None:
+        if pos not in empties:
+            return f"case {pos} invalide"
+        win_pos = strategy_strong.find_winning_move(board, empties, pending)
+        if win_pos is not None:
+            board = board[:]
+            board[pos] = pending
+            return None if strategy_strong.is_winning(board) else "victoire immédiate manquée"
+        board = board[:]
+        board[pos] = pending
+        empties = [i for i in empties if i != pos]
+    if not available or not empties:
+        return None
+    if piece not in available:
+        return f"pièce {piece} invalide"
+    losing = strategy_strong.find_losing_pieces(board, empties, available)
+    if piece in losing and len(losing) < len(available):
+        return f"pièce {piece} gagnante pour l'adversaire"
+    return None
+
+def gen_move(state, time_limit=None):
+    """
+    Best verified move of the engines suited to the game phase.
+    time_limit overrides the deep search budget of the phase.
+    """
+    start = time.time()
+    empties = sum(p is None for p in state['board'])
+    phase, budget = game_phase(empties)
+    if time_limit is not None and budget is not None:
+        budget = time_limit
+    global _outstanding
+    future = None
+    if budget is not None and state.get('piece') is not None:
+        if _outstanding is not None and not _outstanding.done():
+            # A search that missed its deadline still holds the worker: start a
+            # fresh one rather than waiting behind it
+            print("[PORTFOLIO] Recherche précédente toujours en cours, nouveau processus")
+            _reset_pool()
+        try:
+            future = _outstanding = _get_pool().submit(_deep_move, state, budget)
+        except BrokenProcessPool:
+            _reset_pool()
+
+    # Guaranteed answer, computed while the deep search runs
+    try:
+        move, strong_error = strategy_strong.gen_move(state), None
+    except Exception as e:
+        if future is None:
+            raise
+        move, strong_error = None, e
+    engine, reason = 'strategy_strong', None
+    last_search.update(score=None, depth=0, nodes=0)
+
+    if future is not None:
+        deadline = start + budget + RESULT_MARGIN
+        try:
+            deep, stats = future.result(timeout=max(0.0, deadline - time.time()))
+        except FutureTimeout:
+            reason = "recherche hors délai"
+        except BrokenProcessPool:
+            _reset_pool()
+            reason = "processus de recherche perdu"
+        except Exception as e:
+            reason = f"erreur de recherche: {e}"
+        else:
+            _worker_memory.update(stats.get('memory', {}))
+            if stats['score'] is None:
+                reason = "recherche sans résultat"
+            else:
+                reason = verify_move(state, deep)
+            if reason is None:
+                move, engine = deep, 'strategy_ultimate'
+                last_search.update(score=stats['score'], depth=stats['depth'], nodes=stats['nodes'])
+        if reason is not None and move is None:
+            raise strong_error
+        if reason is not None:
+            print(f"[PORTFOLIO] Coup de strategy_strong joué ({reason})")
+
+    last_search['seconds'] = time.time() - start
+    last_choice.update(phase=phase, engine=engine, reason=reason)
+    return move
@@ -1,5 +1,8 @@
 import random
-import re
+
+import codec
+import kernels
+from tables import COMPLETING, LINES
 
 def same(L):
     if None in L or len(L) < 4:
@@ -31,47 +34,23 @@ def is_winning(board):
     return False
 
 def get_all_pieces():
-    pieces = set()
-    for size in ["B", "S"]:
-        for color in ["D", "L"]:
-            for weight in ["E", "F"]:
-                for shape in ["C", "P"]:
-                    pieces.add(size + color + weight + shape)
-    return pieces
+    return set(codec.PIECES)
 
 def extract_available_pieces(state):
-    board = state['board']
-    pending = state.get('piece')
-    used_pieces = set()
-    for piece in board:
-        if piece is not None:
-            used_pieces.add(piece)
-    if pending:
-        used_pieces.add(pending)
-    all_pieces = get_all_pieces()
-    available_pieces = list(all_pieces - used_pieces)
-    return available_pieces
-
-VALID_PIECE = re.compile(r'^[BS][DL][EF][CP]$')
+    return codec.mask_pieces(codec.decode_state(state)[2])
 
 def find_winning_move(board, empties, piece):
+    wins = kernels.winning_squares(kernels.board_codes(board), kernels.squares_mask(empties),
+                                   1 << codec.PIECE_CODES[piece])
     for pos in empties:
-        new_board = board[:]
-        new_board[pos] = piece
-        if is_winning(new_board):
+        if wins >> pos & 1:
             return pos
     return None
 
 def find_losing_pieces(board, empties, available):
-    losing = set()
-    for piece in available:
-        for pos in empties:
-            new_board = board[:]
-            new_board[pos] = piece
-            if is_winning(new_board):
-                losing.add(piece)
-                break
-    return losing
+    losing = kernels.losing_pieces(kernels.board_codes(board), kernels.squares_mask(empties),
+                                   kernels.pieces_mask(available))
+    return set(p for p in available if losing >> codec.PIECE_CODES[p] & 1)
 
 def find_safe_pieces(board, empties, available):
     losing = find_losing_pieces(board, empties, available)
@@ -79,13 +58,12 @@ def find_safe_pieces(board, empties, available):
     return safe if safe else available
 
 def block_opponent_win(board, empties, available):
-    # Simule chaque pièce possible pour l'adversaire, bloque si possible
+    # Case où l'une des pièces disponibles gagnerait, à bloquer
+    wins = kernels.winning_squares(kernels.board_codes(board), kernels.squares_mask(empties),
+                                   kernels.pieces_mask(available))
     for pos in empties:
-        for piece in available:
-            new_board = board[:]
-            new_board[pos] = piece
-            if is_winning(new_board):
-                return pos
+        if wins >> pos & 1:
+            return pos
     return None
 
 def count_potential(board, empties, piece):
@@ -117,30 +95,119 @@ def select_best_pos(board, empties, piece):
     best = max(empties, key=lambda pos: count_potential(board, [pos], piece))
     return best
 
+# --- Anticipation sur masques de bits ---
+# Une ligne est résumée par (ones, zeros, pièces) : les attributs à 1
+# (à 0) dans toutes ses pièces et leur nombre. Les pièces qui complètent
+# une ligne à 3 pièces forment un masque de 16 bits indexé par leur code.
+
+SQUARE_LINES = [tuple(k for k, line in enumerate(LINES) if pos in line) for pos in range(16)]
+
+# Classement d'une pièce donnée, du pire au meilleur
+GIVE_LOSES, GIVE_TRAPPED, GIVE_SAFE, GIVE_WINS = 0, 1, 2, 3
+
+def line_states(codes):
+    return kernels.line_states(tuple(codes))
+
+def line_danger(state):
+    # Pièces qui complètent la ligne, si elle a 3 pièces
+    ones, zeros, count = state
+    return COMPLETING[ones] | COMPLETING[16 + zeros] if count == 3 else 0
+
+def place_code(states, pos, code):
+    new_states = states[:]
+    for k in SQUARE_LINES[pos]:
+        ones, zeros, count = states[k]
+        new_states[k] = (ones & code, zeros & ~code & 15, count + 1)
+    return new_states
+
+def square_dangers(states, empties):
+    """
+    Pour chaque case vide : (pièces gagnantes des lignes qui n'y passent
+    pas, lignes à 2 pièces qui y passent) ; poser une pièce sur la case
+    ajoute les pièces qui complètent ces lignes.
+    """
+    threats = [(k, line_danger(st)) for k, st in enumerate(states) if st[2] == 3]
+    result = []
+    for pos in empties:
+        through = SQUARE_LINES[pos]
+        danger = 0
+        for k, d in threats:
+            if k not in through:
+                danger |= d
+        result.append((danger, [states[k][:2] for k in through if states[k][2] == 2]))
+    return result
+
+def danger_with(square, code):
+    # Masque des pièces gagnantes une fois code posé sur la case
+    danger, pairs = square
+    for ones, zeros in pairs:
+        danger |= COMPLETING[ones & code] | COMPLETING[16 + (zeros & ~code & 15)]
+    return danger
+
+def classify_gives(codes, empties, available_mask):
+    """
+    Classement de chaque pièce de available_mask donnée à l'adversaire sur
+    le plateau codes (liste de codes), en regardant sa pose puis la pièce
+    qu'il nous rend. Renvoie {code: classement}.
+    """
+    states = line_states(codes)
+    danger = 0
+    for st in states:
+        danger |= line_danger(st)
+    squares = square_dangers(states, empties)
+    ranks = {}
+    for code in range(16):
+        if available_mask >> code & 1:
+            ranks[code] = classify_give(states, danger, squares, empties, code, available_mask)
+    return ranks
+
+def classify_give(states, danger, squares, empties, code, available_mask):
+    if danger >> code & 1:
+        return GIVE_LOSES
+    remaining = available_mask & ~(1 << code)
+    if not remaining or len(empties) < 2:
+        return GIVE_SAFE
+    forced_everywhere = True
+    for square, pos in zip(squares, empties):
+        replies = remaining & ~danger_with(square, code)
+        if not replies:
+            continue  # il doit nous donner une pièce gagnante
+        forced_everywhere = False
+        # Peut-il nous rendre une pièce qui ne nous laisse aucun don sûr ?
+        next_squares = None
+        while replies:
+            reply = (replies & -replies).bit_length() - 1
+            replies &= replies - 1
+            left = remaining & ~(1 << reply)
+            if not left:
+                continue
+            if next_squares is None:
+                next_squares = square_dangers(place_code(states, pos, code), [i for i in empties if i != pos])
+            for next_square in next_squares:
+                if left & ~danger_with(next_square, reply):
+                    break
+            else:
+                return GIVE_TRAPPED
+    return GIVE_WINS if forced_everywhere else GIVE_SAFE
+
 def select_best_piece(board, empties, available):
-    # Ne jamais donner une pièce qui fait gagner l'adversaire
-    safe = find_safe_pieces(board, empties, available)
-    # Privilégie la pièce qui laisse le moins de possibilités de victoire à l'adversaire
-    min_risk = None
-    min_count = float('inf')
-    for piece in safe:
-        risk = 0
-        for pos in empties:
-            new_board = board[:]
-            new_board[pos] = piece
-            if is_winning(new_board):
-                risk += 1
-        if risk < min_count:
-            min_count = risk
-            min_risk = piece
-    return min_risk if min_risk else random.choice(safe)
+    if not available:
+        return None
+    # Ne jamais donner une pièce qui fait gagner l'adversaire, ni une pièce
+    # qui lui permet de nous rendre une pièce sans réponse sûre
+    available_mask = 0
+    for piece in available:
+        available_mask |= 1 << codec.PIECE_CODES[piece]
+    ranks = classify_gives(codec.encode_board(board), empties, available_mask)
+    best = max(ranks.values())
+    return random.choice([piece for piece in available if ranks[codec.PIECE_CODES[piece]] == best])
 
 def gen_move(state):
+    codes, _, available_mask = codec.decode_state(state)
     board = state['board']
     pending = state.get('piece')
-    empties = [i for i, v in enumerate(board) if v is None]
-    available = extract_available_pieces(state)
-    available = [p for p in available if VALID_PIECE.match(p)]
+    empties = [i for i, c in enumerate(codes) if c == codec.EMPTY]
+    available = codec.mask_pieces(available_mask)
     if pending is not None and not empties:
         raise Exception("No empty squares left")
     if not available and pending is None:
@@ -155,16 +222,19 @@ def gen_move(state):
     win_pos = find_winning_move(board, empties, pending)
     if win_pos is not None:
         safe = find_safe_pieces(board, [i for i in empties if i != win_pos], available)
-        return {'pos': win_pos, 'piece': random.choice(safe)}
+        return {'pos': win_pos, 'piece': random.choice(safe) if safe else None}
 
     # 2. Bloquer la victoire adverse
     block_pos = block_opponent_win(board, empties, available)
     if block_pos is not None:
-        safe = find_safe_pieces(board, [i for i in empties if i != block_pos], available)
-        return {'pos': block_pos, 'piece': random.choice(safe)}
+        next_board = board[:]
+        next_board[block_pos] = pending
+        piece = select_best_piece(next_board, [i for i in empties if i != block_pos], available)
+        return {'pos': block_pos, 'piece': piece}
 
     # 3. Coup stratégique (centre, coin, max potentiel)
     pos = select_best_pos(board, empties, pending)
-    next_empties = [i for i in empties if i != pos]
-    piece = select_best_piece(board, next_empties, available)
+    next_board = board[:]
+    next_board[pos] = pending
+    piece = select_best_piece(next_board, [i for i in empties if i != pos], available)
     return {'pos': pos, 'piece': piece}
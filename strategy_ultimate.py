@@ -1,7 +1,17 @@
+import itertools
+import json
+import math
+import os
 import random
-import re
 import time
-from collections import defaultdict
+from collections import Counter, defaultdict
+
+import codec
+import endgame_db
+import kernels
+import memory_budget
+import tables
+import tt_store
 
 # -------------- CORE GAME FUNCTIONS --------------
 
@@ -42,69 +52,126 @@ def is_winning(board):
 
 def get_all_pieces():
     """Get all possible Quarto pieces as strings."""
-    pieces = set()
-    for size in ["B", "S"]:
-        for color in ["D", "L"]:
-            for weight in ["E", "F"]:
-                for shape in ["C", "P"]:
-                    pieces.add(size + color + weight + shape)
-    return pieces
+    return set(codec.PIECES)
 
 def extract_available_pieces(state):
     """Get available pieces from the game state."""
-    board = state['board']
-    pending = state.get('piece')
-    
-    used_pieces = set()
-    for piece in board:
-        if piece is not None:
-            used_pieces.add(piece)
-    if pending:
-        used_pieces.add(pending)
-    
-    all_pieces = get_all_pieces()
-    available_pieces = list(all_pieces - used_pieces)
-    
-    return available_pieces
+    return codec.mask_pieces(codec.decode_state(state)[2])
+
+POPCOUNT = tables.POPCOUNT
 
-VALID_PIECE = re.compile(r'^[BS][DL][EF][CP]$')
+# COMPLETING[m] (COMPLETING[16 + m]): 16-bit set of the piece codes having
+# one of the attribute bits of m set (cleared)
+COMPLETING = tables.COMPLETING
+
+# Index tuples of the 10 winning lines (rows, columns, diagonals)
+LINES = tables.LINES
+
+def threat_lines(board):
+    """Return (empty_pos, shared_attributes) for every line with 3 pieces sharing an attribute."""
+    threats = []
+    for line in LINES:
+        empty = None
+        shared = None
+        for i in line:
+            p = board[i]
+            if p is None:
+                if empty is not None:
+                    break
+                empty = i
+            elif shared is None:
+                shared = set(p)
+            else:
+                shared &= set(p)
+        else:
+            if empty is not None and shared:
+                threats.append((empty, shared))
+    return threats
+
+def completing_position(threats, piece):
+    """Return a position where piece completes one of the threats, or None."""
+    for pos, shared in threats:
+        if not shared.isdisjoint(piece):
+            return pos
+    return None
 
 # -------------- ADVANCED EVALUATION FUNCTIONS --------------
 
+# Features of a position, combined linearly by evaluate_board:
+#   shared1, shared2, shared3  attributes shared by the pieces of lines with 1, 2, 3 empty squares
+#   threats                    lines with 1 empty square whose pieces share an attribute
+#   dangerous                  pieces not on the board that complete one of those lines
+#   parity                     +1 with an even number of empty squares, -1 with an odd one
+#   threat_parity              threats * parity
+EVAL_FEATURES = ('shared1', 'shared2', 'shared3', 'threats', 'dangerous', 'parity', 'threat_parity')
+
+# Hand-set weights; only 3-piece lines count, as in the original evaluation
+DEFAULT_EVAL_WEIGHTS = {'shared1': 3, 'shared2': 0, 'shared3': 0, 'threats': 0,
+                        'dangerous': 0, 'parity': 0, 'threat_parity': 0}
+
+# Written by `python tune_eval.py`; the defaults are used if it is missing
+EVAL_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eval_weights.json')
+
+# Heuristic scores stay strictly below a win
+MAX_EVAL = 999
+
+def load_eval_weights(path):
+    """Evaluation weights of a JSON file merged over the defaults (the defaults alone if it is missing)."""
+    weights = dict(DEFAULT_EVAL_WEIGHTS)
+    try:
+        with open(path, encoding='utf8') as f:
+            tuned = json.load(f)
+    except FileNotFoundError:
+        return weights
+    except (OSError, ValueError) as e:
+        print(f"[EVAL] Poids ignorés ({path}): {e}")
+        return weights
+    if isinstance(tuned, dict):
+        tuned = tuned.get('weights', tuned)
+    invalid = eval_weights_error(tuned)
+    if invalid is not None:
+        print(f"[EVAL] Poids ignorés ({path}): {invalid}")
+        return weights
+    for name in EVAL_FEATURES:
+        if name in tuned:
+            weights[name] = int(round(tuned[name]))
+    return weights
+
+def eval_weights_error(tuned):
+    """None if tuned is a mapping of features to finite numbers, else what is wrong with it."""
+    if not isinstance(tuned, dict):
+        return f"objet JSON attendu, {type(tuned).__name__} trouvé"
+    for name in EVAL_FEATURES:
+        value = tuned.get(name, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            return f"poids {name} invalide: {value!r}"
+    return None
+
+eval_weights = load_eval_weights(EVAL_WEIGHTS_PATH)
+
+def scan_lines(board):
+    """One pass over the lines: returns (winning, values of EVAL_FEATURES in that order)."""
+    winning, shared1, shared2, shared3, threats, dangerous, empties = kernels.scan(kernels.board_codes(board))
+    parity = 1 if empties % 2 == 0 else -1
+    return winning, [shared1, shared2, shared3, threats, dangerous, parity, threats * parity]
+
+def eval_features(board):
+    """Values of EVAL_FEATURES for a board, in that order."""
+    return scan_lines(board)[1]
+
+def weighted_score(features):
+    """Weighted sum of feature values, below MAX_EVAL in absolute value."""
+    score = 0
+    for name, value in zip(EVAL_FEATURES, features):
+        score += eval_weights[name] * value
+    return max(-MAX_EVAL, min(MAX_EVAL, score))
+
 def count_potential_lines(board, empties):
     """
-    Evaluate the board by counting potential winning lines.
-    Returns a score based on how many attributes are common in 3-piece lines.
+    Evaluate the board from its potential winning lines.
+    Returns the weighted sum of the evaluation features.
     """
-    score = 0
-    lines = get_lines(board)
-    
-    for line in lines:
-        # Skip lines that are already full
-        if None not in line:
-            continue
-        
-        # Count None values
-        none_count = line.count(None)
-        
-        # Only consider lines with 1 empty space
-        if none_count != 1:
-            continue
-        
-        # Get non-None pieces in this line
-        pieces = [p for p in line if p is not None]
-        
-        # Check if these pieces share any attribute
-        if pieces:
-            # Find attributes shared by all pieces in this line
-            shared = set(pieces[0])
-            for p in pieces[1:]:
-                shared &= set(p)
-            
-            # The more pieces share attributes, the higher the score
-            score += len(shared) * (4 - none_count)
-    
-    return score
+    return weighted_score(eval_features(board))
 
 def evaluate_board(board, player_turn):
     """
@@ -112,174 +179,426 @@ def evaluate_board(board, player_turn):
     Returns a score from the perspective of the current player.
     Higher is better for the player.
     """
-    if is_winning(board):
+    winning, features = scan_lines(board)
+    if winning:
         return 1000 if player_turn else -1000
     
-    empties = [i for i, p in enumerate(board) if p is None]
-    potential_score = count_potential_lines(board, empties)
+    potential_score = weighted_score(features)
     
     # Return positive score if player's turn, negative if opponent's
     return potential_score if player_turn else -potential_score
 
+# -------------- ENDGAME DATABASE --------------
+
+# Built offline with `python endgame_db.py`; searched without it if missing
+ENDGAME_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'endgame.db')
+endgame = endgame_db.open_endgame_db(ENDGAME_DB_PATH)
+
+def probe_endgame(board, pending, empties, player_turn):
+    """Exact score of a position from the endgame database, or None."""
+    if endgame is None or pending is None or len(empties) > endgame.max_empties:
+        return None
+    entry = endgame.probe(board, pending)
+    if entry is None:
+        return None
+    result = entry[0]
+    if result == endgame_db.DRAW:
+        return 0
+    side_to_move_wins = result == endgame_db.WIN
+    return 1000 if side_to_move_wins == player_turn else -1000
+
 # -------------- TRANSPOSITION TABLE --------------
 
 # Global transposition table to cache results
 transposition_table = {}
 
-def board_to_key(board, piece):
+# Incremented at every gen_move; entries remember the generation that stored them
+tt_generation = 0
+
+# Entries older than this many generations are dropped from snapshots
+TT_MAX_AGE = 256
+
+# Bytes the process-local table may use (None = unbounded), set by set_memory_budget
+tt_max_bytes = None
+
+# Entries fitting in tt_max_bytes, recalibrated on the measured entries at every move
+tt_max_entries = None
+
+# Share of tt_max_entries kept when a full table is trimmed between moves;
+# the rest is room for the entries of the next search
+TT_TRIM_KEEP = 0.75
+
+# Kinds of search plies: placing the pending piece, then choosing the piece to give
+PLACE, GIVE = 0, 1
+
+# Bound stored with a value: exact, lower bound (fail high), upper bound (fail low)
+EXACT, LOWER, UPPER = 0, 1, 2
+
+def board_to_key(board, piece, ply=PLACE, player_turn=True):
     """Convert board to a hashable key for transposition table."""
-    return (tuple(board), piece)
+    return (tuple(board), piece, ply, player_turn)
 
-def lookup_position(board, piece, depth):
-    """Lookup a position in the transposition table."""
-    key = board_to_key(board, piece)
-    if key in transposition_table and transposition_table[key][0] >= depth:
-        return transposition_table[key][1]
-    return None
+def lookup_position(board, piece, depth, alpha, beta, ply=PLACE, player_turn=True):
+    """
+    Lookup a position in the transposition table.
+    Returns (value, best_move); value is None unless the stored bound settles the node.
+    """
+    entry = transposition_table.get(board_to_key(board, piece, ply, player_turn))
+    if entry is None:
+        return None, None
+    entry_depth, value, flag, best, _ = entry
+    if entry_depth >= depth:
+        if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+            return value, best
+    return None, best
+
+def store_position(board, piece, depth, value, flag, best, ply=PLACE, player_turn=True):
+    """
+    Store a position in the transposition table. A full table (see
+    fit_tt_budget) only updates the positions it holds: it is trimmed
+    between moves, never in the middle of a search.
+    """
+    key = board_to_key(board, piece, ply, player_turn)
+    if tt_max_entries is not None and len(transposition_table) >= tt_max_entries and key not in transposition_table:
+        return
+    transposition_table[key] = (depth, value, flag, best, tt_generation)
+
+def trim_transposition_table(keep):
+    """
+    Keep the `keep` most useful entries of the local table: the most
+    recent, then the deepest. Entries are counted per rank rather than
+    sorted, so a trim is linear in the size of the table.
+
+    The trim works on a snapshot of the table, which a snapshot restore
+    (load_transposition_table) may be filling from its thread meanwhile.
+    """
+    # list() runs in C without releasing the GIL, so concurrent inserts cannot break it
+    entries = list(transposition_table.items())
+    excess = len(entries) - keep
+    if excess <= 0:
+        return 0
+    generation, generations = tt_generation, tt_store.GENERATIONS
+    # Rank of an entry, lower is more useful: its age, then its depth (below 256)
+    ranks = [(generation - entry[4]) % generations * 256 - entry[0] for _, entry in entries]
+    counts = Counter(ranks)
+    # Every entry ranked above cut is dropped, and `partial` of those ranked cut
+    for cut in sorted(counts, reverse=True):
+        if counts[cut] >= excess:
+            partial = excess
+            break
+        excess -= counts[cut]
+    victims = []
+    for (key, _), rank in zip(entries, ranks):
+        if rank > cut:
+            victims.append(key)
+        elif rank == cut and partial:
+            partial -= 1
+            victims.append(key)
+    for key in victims:
+        transposition_table.pop(key, None)
+    return len(victims)
+
+def bound_flag(value, alpha, beta):
+    """Bound type of a value found with the (alpha, beta) window."""
+    if value <= alpha:
+        return UPPER
+    if value >= beta:
+        return LOWER
+    return EXACT
 
-def store_position(board, piece, depth, value):
-    """Store a position in the transposition table."""
-    key = board_to_key(board, piece)
-    transposition_table[key] = (depth, value)
+# Name of a shared memory table used by every process of the host, if any
+SHARED_TT_ENV = 'QUARTO_SHARED_TT'
+SHARED_TT_MB_ENV = 'QUARTO_SHARED_TT_MB'
+
+def use_shared_transposition_table(name, size_mb=None):
+    """Replace the process-local table by the host-wide shared memory table."""
+    global transposition_table
+    # Imported on first use: multiprocessing.shared_memory is slow to import
+    import shared_tt
+    transposition_table = shared_tt.SharedTranspositionTable(name, size_mb or shared_tt.DEFAULT_SIZE_MB)
+    return transposition_table
+
+if os.environ.get(SHARED_TT_ENV):
+    use_shared_transposition_table(
+        os.environ[SHARED_TT_ENV],
+        float(os.environ.get(SHARED_TT_MB_ENV, 0))
+    )
+
+def save_transposition_table(path):
+    """Snapshot the transposition table to a binary file; returns the number of entries saved."""
+    return tt_store.save_table(transposition_table, path, tt_generation, TT_MAX_AGE)
+
+def load_transposition_table(path, background=True):
+    """
+    Warm-load a snapshot written by save_transposition_table.
+    With background=True the entries are restored from a daemon thread and
+    the thread is returned; otherwise the number of restored entries is.
+    """
+    global tt_generation
+    generation = tt_store.read_generation(path)
+    if generation is None:
+        return None
+    tt_generation = max(tt_generation, generation)
+    if not background:
+        return tt_store.load_table(path, transposition_table, TT_MAX_AGE, tt_max_entries)
+    return tt_store.load_table_in_background(
+        path, transposition_table, TT_MAX_AGE,
+        on_done=lambda restored: print(f"[TT] {restored} entrées restaurées depuis {path}"),
+        max_entries=tt_max_entries,
+    )
+
+# -------------- MEMORY BUDGET --------------
+
+def tt_entry_bytes():
+    """Bytes of one entry of the local table: its key and value tuples and its hash table slot."""
+    sample = list(itertools.islice(transposition_table.items(), memory_budget.SAMPLE_ENTRIES))
+    if not sample:
+        sample = [(board_to_key([None] * 16, None), (1, 0.5, EXACT, None, 0))]
+    measured = sum(memory_budget.object_bytes(key) + memory_budget.object_bytes(value) for key, value in sample)
+    return measured / len(sample) + memory_budget.DICT_SLOT_BYTES
+
+def fit_tt_budget():
+    """
+    Recompute tt_max_entries from the measured entry size; a table that
+    filled up is trimmed to TT_TRIM_KEEP of it, before the next search.
+    """
+    global tt_max_entries
+    if tt_max_bytes is None:
+        tt_max_entries = None
+        return
+    tt_max_entries = max(1, int(tt_max_bytes / tt_entry_bytes()))
+    if len(transposition_table) >= tt_max_entries:
+        trim_transposition_table(int(tt_max_entries * TT_TRIM_KEEP))
+
+def set_memory_budget(tt_bytes=None, endgame_bytes=None):
+    """
+    Bound the search caches: the local transposition table to tt_bytes
+    (a shared table keeps its own fixed size), and the endgame database,
+    closed if its mapping does not fit in endgame_bytes. None = unbounded.
+    """
+    global tt_max_bytes, endgame
+    tt_max_bytes = tt_bytes if isinstance(transposition_table, dict) else None
+    fit_tt_budget()
+    if endgame_bytes is not None and endgame is not None and endgame.nbytes > endgame_bytes:
+        print(f"[MEM] Base de finales de {endgame.nbytes / memory_budget.MB:.1f} Mo hors budget, recherche sans elle")
+        endgame.close()
+        endgame = None
+
+def memory_usage():
+    """Measured bytes of the transposition table and of the endgame database mapping."""
+    if isinstance(transposition_table, dict):
+        tt = memory_budget.dict_footprint(transposition_table)
+    else:
+        tt = transposition_table.nbytes
+    return {'tt': tt, 'endgame': endgame.nbytes if endgame is not None else 0}
+
+# -------------- MOVE ORDERING --------------
+
+# History heuristic: moves that caused cutoffs, per ply kind
+history = defaultdict(int)
+
+# Center, then corners, then the rest
+POSITION_ORDER = [5, 6, 9, 10, 0, 3, 12, 15, 1, 2, 4, 7, 8, 11, 13, 14]
+POSITION_RANK = {pos: rank for rank, pos in enumerate(POSITION_ORDER)}
+
+def order_positions(empties, tt_best):
+    """Order placements: transposition-table move first, then by history and position."""
+    ordered = sorted(empties, key=lambda pos: (-history[(PLACE, pos)], POSITION_RANK[pos]))
+    if tt_best in empties:
+        ordered.remove(tt_best)
+        ordered.insert(0, tt_best)
+    return ordered
+
+def order_pieces(available, threats, tt_best):
+    """Order gives: safe pieces first, transposition-table move first, then by history."""
+    ordered = sorted(
+        available,
+        key=lambda piece: (completing_position(threats, piece) is not None, -history[(GIVE, piece)])
+    )
+    if tt_best in available:
+        ordered.remove(tt_best)
+        ordered.insert(0, tt_best)
+    return ordered
 
 # -------------- ADVANCED MINIMAX WITH ALPHA-BETA PRUNING --------------
 
+# Moves after the first are searched with a null window around the bound
+# to beat, and re-searched with the full window only if they beat it
+NULL_WINDOW_SEARCH = True
+# Late moves are also searched LMR_REDUCTION full moves shallower; a
+# fail-high is re-searched at full depth
+LATE_MOVE_REDUCTIONS = True
+LMR_MIN_MOVES = 3
+LMR_MIN_DEPTH = 2
+LMR_REDUCTION = 1
+# At the horizon, a position with a line of three pieces sharing an
+# attribute is searched one more full move, at most MAX_EXTENSIONS times per path
+THREAT_EXTENSIONS = True
+MAX_EXTENSIONS = 1
+
+def late_move_reduction(index, depth):
+    """Full moves to take off the search of the index-th move (0-based) at depth."""
+    if LATE_MOVE_REDUCTIONS and index >= LMR_MIN_MOVES and depth >= LMR_MIN_DEPTH:
+        return min(LMR_REDUCTION, depth - 1)
+    return 0
+
+def null_window(alpha, beta, player_turn):
+    """Zero-width window just above alpha (maximizing) or just below beta (minimizing)."""
+    return (alpha, alpha + 1) if player_turn else (beta - 1, beta)
+
+def needs_research(score, alpha, beta, player_turn, reduced):
+    """True if a null-window result beats the bound and must be searched again."""
+    if player_turn:
+        return score > alpha and (reduced or score < beta)
+    return score < beta and (reduced or score > alpha)
+
 def minimax_with_pruning(board, pending, available, depth, alpha, beta, player_turn, max_depth, start_time, max_time):
     """
     Minimax algorithm with alpha-beta pruning for deeper search.
-    
+
+    The tree alternates "place pending piece" and "choose piece to give"
+    plies, each with its own transposition entries and move ordering, so
+    cutoffs act between the two decisions.
+
     Args:
         board: Current board state
         pending: Currently pending piece to place
         available: List of available pieces
-        depth: Current search depth
+        depth: Current search depth, in full (place, give) moves
         alpha, beta: Alpha-beta pruning parameters
         player_turn: True if it's the AI's turn, False for opponent
         max_depth: Maximum depth to search
         start_time: Time when search started
         max_time: Maximum time allowed for search (in seconds)
+
+    Returns (pos, piece, score).
     """
+    return search_place(board, pending, available, depth, alpha, beta, player_turn,
+                        start_time, max_time, root=True)
+
+def search_place(board, pending, available, depth, alpha, beta, player_turn, start_time, max_time, root=False,
+                 extensions=0):
+    """Ply where the side to move places the pending piece. Returns (pos, piece, score)."""
+    last_search['nodes'] += 1
     # Check time limit
     if time.time() - start_time > max_time:
         # Time's up, return current best
         return None, None, 0
-    
+
     # Check transposition table
-    cached_value = lookup_position(board, pending, depth)
-    if cached_value is not None:
-        return None, None, cached_value
-    
+    cached_value, tt_best = lookup_position(board, pending, depth, alpha, beta, PLACE, player_turn)
+    if cached_value is not None and not root:
+        return tt_best, None, cached_value
+
     # Check terminal nodes
     empties = [i for i, p in enumerate(board) if p is None]
+    if depth == 0 and empties and THREAT_EXTENSIONS and extensions < MAX_EXTENSIONS and threat_lines(board):
+        # Threats decide the next exchanges: look one more full move ahead
+        depth = 1
+        extensions += 1
     if not empties or depth == 0:
-        value = evaluate_board(board, player_turn)
+        value = probe_endgame(board, pending, empties, player_turn)
+        if value is None:
+            value = evaluate_board(board, player_turn)
         return None, None, value
-    
-    if player_turn:  # Maximizing player
-        best_score = float('-inf')
-        best_pos = None
-        best_piece = None
-        
-        # First check for immediate wins
-        for pos in empties:
-            new_board = board[:]
-            new_board[pos] = pending
-            if is_winning(new_board):
-                # We found a winning move
-                store_position(board, pending, depth, 1000)
-                return pos, None, 1000
-        
-        # Otherwise, evaluate all moves
-        for pos in empties:
-            new_board = board[:]
-            new_board[pos] = pending
-            
-            # For each piece we could give
-            for piece in available:
-                if piece == pending:
-                    continue
-                
-                new_available = [p for p in available if p != pending and p != piece]
-                
-                # Recursive call with opponent's turn
-                _, _, score = minimax_with_pruning(
-                    new_board, piece, new_available, 
-                    depth-1, alpha, beta, False, 
-                    max_depth, start_time, max_time
-                )
-                
-                # Time check after recursive call
-                if time.time() - start_time > max_time:
-                    # Time's up, return current best
-                    return best_pos, best_piece, best_score
-                
-                if score > best_score:
-                    best_score = score
-                    best_pos = pos
-                    best_piece = piece
-                
-                alpha = max(alpha, best_score)
-                if alpha >= beta:
-                    break  # Beta cutoff
-            
-            if alpha >= beta:
-                break  # Beta cutoff
-        
-        store_position(board, pending, depth, best_score)
-        return best_pos, best_piece, best_score
-    
-    else:  # Minimizing player (opponent)
-        best_score = float('inf')
-        best_pos = None
-        best_piece = None
-        
-        # First check if opponent can win immediately
-        for pos in empties:
-            new_board = board[:]
-            new_board[pos] = pending
-            if is_winning(new_board):
-                # Opponent has a winning move
-                store_position(board, pending, depth, -1000)
-                return pos, None, -1000
-        
-        # Otherwise, evaluate all moves
-        for pos in empties:
-            new_board = board[:]
-            new_board[pos] = pending
-            
-            # For each piece opponent could give
-            for piece in available:
-                if piece == pending:
-                    continue
-                
-                new_available = [p for p in available if p != pending and p != piece]
-                
-                # Recursive call with our turn
-                _, _, score = minimax_with_pruning(
-                    new_board, piece, new_available, 
-                    depth-1, alpha, beta, True, 
-                    max_depth, start_time, max_time
-                )
-                
-                # Time check after recursive call
-                if time.time() - start_time > max_time:
-                    # Time's up, return current best
-                    return best_pos, best_piece, best_score
-                
-                if score < best_score:
-                    best_score = score
-                    best_pos = pos
-                    best_piece = piece
-                
-                beta = min(beta, best_score)
-                if alpha >= beta:
-                    break  # Alpha cutoff
-            
-            if alpha >= beta:
-                break  # Alpha cutoff
-        
-        store_position(board, pending, depth, best_score)
-        return best_pos, best_piece, best_score
+
+    # Immediate win for the side to move
+    win_pos = completing_position(threat_lines(board), pending)
+    if win_pos is not None:
+        value = 1000 if player_turn else -1000
+        store_position(board, pending, depth, value, EXACT, win_pos, PLACE, player_turn)
+        return win_pos, None, value
+
+    # Last square: placing the piece ends the game in a draw
+    if not available:
+        return empties[0], None, 0
+
+    alpha_orig, beta_orig = alpha, beta
+    best_score = float('-inf') if player_turn else float('inf')
+    best_pos = None
+    best_piece = None
+    for index, pos in enumerate(order_positions(empties, tt_best)):
+        new_board = board[:]
+        new_board[pos] = pending
+        if index == 0 or not NULL_WINDOW_SEARCH:
+            piece, score = search_give(new_board, available, depth, alpha, beta, player_turn,
+                                       start_time, max_time, extensions)
+        else:
+            reduction = late_move_reduction(index, depth)
+            piece, score = search_give(new_board, available, depth - reduction,
+                                       *null_window(alpha, beta, player_turn), player_turn,
+                                       start_time, max_time, extensions)
+            if needs_research(score, alpha, beta, player_turn, reduction) and time.time() - start_time <= max_time:
+                piece, score = search_give(new_board, available, depth, alpha, beta, player_turn,
+                                           start_time, max_time, extensions)
+
+        # Time check after recursive call
+        if time.time() - start_time > max_time:
+            return best_pos, best_piece, best_score
+
+        if (score > best_score) if player_turn else (score < best_score):
+            best_score = score
+            best_pos = pos
+            best_piece = piece
+        if player_turn:
+            alpha = max(alpha, best_score)
+        else:
+            beta = min(beta, best_score)
+        if alpha >= beta:
+            history[(PLACE, pos)] += depth * depth
+            break  # Cutoff
+
+    store_position(board, pending, depth, best_score, bound_flag(best_score, alpha_orig, beta_orig),
+                   best_pos, PLACE, player_turn)
+    return best_pos, best_piece, best_score
+
+def search_give(board, available, depth, alpha, beta, player_turn, start_time, max_time, extensions=0):
+    """Ply where the side to move, having placed its piece, chooses the piece to give. Returns (piece, score)."""
+    last_search['nodes'] += 1
+    cached_value, tt_best = lookup_position(board, None, depth, alpha, beta, GIVE, player_turn)
+    if cached_value is not None:
+        return tt_best, cached_value
+
+    threats = threat_lines(board)
+    alpha_orig, beta_orig = alpha, beta
+    best_score = float('-inf') if player_turn else float('inf')
+    best_piece = None
+    searched = 0
+    for piece in order_pieces(available, threats, tt_best):
+        if completing_position(threats, piece) is not None:
+            # The receiver wins by placing this piece
+            score = -1000 if player_turn else 1000
+        else:
+            new_available = [p for p in available if p != piece]
+            if searched == 0 or not NULL_WINDOW_SEARCH:
+                _, _, score = search_place(board, piece, new_available, depth - 1, alpha, beta,
+                                           not player_turn, start_time, max_time, extensions=extensions)
+            else:
+                reduction = late_move_reduction(searched, depth)
+                _, _, score = search_place(board, piece, new_available, depth - 1 - reduction,
+                                           *null_window(alpha, beta, player_turn),
+                                           not player_turn, start_time, max_time, extensions=extensions)
+                if needs_research(score, alpha, beta, player_turn, reduction) and time.time() - start_time <= max_time:
+                    _, _, score = search_place(board, piece, new_available, depth - 1, alpha, beta,
+                                               not player_turn, start_time, max_time, extensions=extensions)
+            searched += 1
+            if time.time() - start_time > max_time:
+                return best_piece, best_score
+
+        if (score > best_score) if player_turn else (score < best_score):
+            best_score = score
+            best_piece = piece
+        if player_turn:
+            alpha = max(alpha, best_score)
+        else:
+            beta = min(beta, best_score)
+        if alpha >= beta:
+            history[(GIVE, piece)] += depth * depth
+            break  # Cutoff
+
+    store_position(board, None, depth, best_score, bound_flag(best_score, alpha_orig, beta_orig),
+                   best_piece, GIVE, player_turn)
+    return best_piece, best_score
 
 # -------------- PATTERN RECOGNITION --------------
 
@@ -347,24 +666,18 @@ def find_dangerous_pieces(board, available, patterns):
 
 def find_winning_move(board, empties, piece):
     """Find a move that wins immediately."""
+    wins = kernels.winning_squares(kernels.board_codes(board), kernels.squares_mask(empties),
+                                   1 << codec.PIECE_CODES[piece])
     for pos in empties:
-        new_board = board[:]
-        new_board[pos] = piece
-        if is_winning(new_board):
+        if wins >> pos & 1:
             return pos
     return None
 
 def find_losing_piece(board, empties, available):
     """Find pieces that would allow opponent to win immediately."""
-    losing = []
-    for piece in available:
-        for pos in empties:
-            new_board = board[:]
-            new_board[pos] = piece
-            if is_winning(new_board):
-                losing.append(piece)
-                break
-    return losing
+    losing = kernels.losing_pieces(kernels.board_codes(board), kernels.squares_mask(empties),
+                                   kernels.pieces_mask(available))
+    return [p for p in available if losing >> codec.PIECE_CODES[p] & 1]
 
 def find_safe_piece(board, empties, available):
     """Find pieces that don't allow opponent to win immediately."""
@@ -372,28 +685,6 @@ def find_safe_piece(board, empties, available):
     safe = [p for p in available if p not in losing]
     return safe if safe else available
 
-def can_force_win(board, empties, available, pending):
-    """Find a move that forces opponent to give a losing piece."""
-    for pos in empties:
-        new_board = board[:]
-        new_board[pos] = pending
-        
-        # Check if all pieces are losing for opponent
-        new_empties = [i for i in empties if i != pos]
-        available_pieces = [p for p in available if p != pending]
-        
-        all_losing = True
-        for piece in available_pieces:
-            winning_pos = find_winning_move(new_board, new_empties, piece)
-            if winning_pos is None:
-                all_losing = False
-                break
-        
-        if all_losing and available_pieces:
-            return pos
-    
-    return None
-
 def select_strategic_position(board, empties):
     """Select a strategic position based on the current board state."""
     # Prefer center positions initially
@@ -411,36 +702,151 @@ def select_strategic_position(board, empties):
     # Otherwise, use any available position
     return random.choice(empties)
 
+# -------------- PROOF-NUMBER SEARCH --------------
+
+PN_INF = 10**9
+PN_NODE_BUDGET = 50000
+# Largest number of empty squares where a proof is tried before the search:
+# with more, forced wins are out of reach of the node budget
+PN_MAX_EMPTIES = 8
+
+class PNNode:
+    """Node of the proof-number search tree.
+
+    OR nodes are positions where we place `pending` then give a piece,
+    AND nodes the same for the opponent. A proved root is a forced win.
+    """
+    __slots__ = ('board', 'pending', 'available', 'is_or', 'pn', 'dn', 'children', 'move')
+
+    def __init__(self, board, pending, available, is_or, move=None, threats=None):
+        self.board = board
+        self.pending = pending
+        self.available = available
+        self.is_or = is_or
+        self.move = move
+        self.children = None
+        if threats is None:
+            threats = threat_lines(board)
+        if completing_position(threats, pending) is not None:
+            # Side to move wins by placing its piece
+            self.pn, self.dn = (0, PN_INF) if is_or else (PN_INF, 0)
+        elif not available:
+            # Last square gets filled without a win: draw, i.e. not a forced win
+            self.pn, self.dn = PN_INF, 0
+        else:
+            self.pn, self.dn = 1, 1
+
+    def expand(self):
+        """Create all (pos, piece) children and return how many were created."""
+        self.children = []
+        for pos, square in enumerate(self.board):
+            if square is not None:
+                continue
+            new_board = self.board[:]
+            new_board[pos] = self.pending
+            threats = threat_lines(new_board)
+            for piece in self.available:
+                new_available = [p for p in self.available if p != piece]
+                self.children.append(PNNode(
+                    new_board, piece, new_available, not self.is_or,
+                    move=(pos, piece), threats=threats
+                ))
+        self.update()
+        return len(self.children)
+
+    def update(self):
+        """Recompute proof and disproof numbers from the children."""
+        if self.is_or:
+            self.pn = min(c.pn for c in self.children)
+            self.dn = min(PN_INF, sum(c.dn for c in self.children))
+        else:
+            self.pn = min(PN_INF, sum(c.pn for c in self.children))
+            self.dn = min(c.dn for c in self.children)
+
+def proof_number_search(board, pending, available, node_budget=PN_NODE_BUDGET, time_limit=None):
+    """
+    Prove or disprove a forced win several give/place exchanges deep.
+
+    Returns the (pos, piece) move that forces the win, or None if the win
+    could not be proved within node_budget nodes (and time_limit seconds).
+    """
+    start_time = time.time()
+    root = PNNode(board[:], pending, list(available), True)
+    nodes = 1
+    while root.pn and root.dn and nodes < node_budget:
+        if time_limit is not None and time.time() - start_time > time_limit:
+            break
+        # Descend to the most-proving node
+        path = [root]
+        node = root
+        while node.children is not None:
+            if node.is_or:
+                node = min(node.children, key=lambda c: c.pn)
+            else:
+                node = min(node.children, key=lambda c: c.dn)
+            path.append(node)
+        nodes += node.expand()
+        for ancestor in reversed(path[:-1]):
+            ancestor.update()
+
+    if root.pn != 0:
+        return None
+    if root.children is None:
+        # Immediate win, no piece left to choose yet
+        return completing_position(threat_lines(board), pending), None
+    for child in root.children:
+        if child.pn == 0:
+            return child.move
+    return None
+
 # -------------- TIME MANAGEMENT AND ITERATIVE DEEPENING --------------
 
-def iterative_deepening_search(board, pending, available, empties, max_depth=8, time_limit=1.0):
+# Thinking time per move, in seconds
+MOVE_TIME_LIMIT = 0.5
+ENDGAME_TIME_LIMIT = 1.0
+
+# Statistics of the last search (score from the side to move), for tools and metrics
+last_search = {'score': None, 'depth': 0, 'start_depth': 0, 'nodes': 0, 'seconds': 0.0}
+
+def record_search(score, depth, start_time):
+    """Fill last_search at the end of a search."""
+    last_search['score'] = score
+    last_search['depth'] = depth
+    last_search['seconds'] = time.time() - start_time
+
+def iterative_deepening_search(board, pending, available, empties, max_depth=8, time_limit=1.0,
+                               start_depth=2, expected_score=None):
     """
     Perform iterative deepening search to find best move and piece.
     Gradually increases search depth until time limit is reached.
+    start_depth skips iterations the previous move already searched, and
+    expected_score centers an aspiration window for the first iteration.
     """
     start_time = time.time()
     best_pos = None
     best_piece = None
+    best_score = None
+    best_depth = 0
+    last_search['nodes'] = 0
+    last_search['start_depth'] = start_depth
     
     # First check for immediate wins
     if pending:
         win_pos = find_winning_move(board, empties, pending)
         if win_pos is not None:
             # If we can win immediately, do it
+            record_search(1000, 0, start_time)
             safe_pieces = find_safe_piece(board, [i for i in empties if i != win_pos], available)
             if safe_pieces:
                 return win_pos, random.choice(safe_pieces)
             return win_pos, random.choice(available) if available else None
     
-    # Then check for forced wins
-    if pending:
-        force_pos = can_force_win(board, empties, available, pending)
-        if force_pos is not None:
-            # We found a move that forces opponent into a losing position
-            safe_pieces = find_safe_piece(board, [i for i in empties if i != force_pos], available)
-            if safe_pieces:
-                return force_pos, random.choice(safe_pieces)
-            return force_pos, random.choice(available) if available else None
+    # Then look for forced wins several exchanges deep
+    if pending and len(empties) <= PN_MAX_EMPTIES:
+        forced = proof_number_search(board, pending, available, time_limit=time_limit / 2)
+        if forced is not None:
+            record_search(1000, 0, start_time)
+            return forced
     
     # Adjust max_depth based on game state
     filled_positions = 16 - len(empties)
@@ -449,16 +855,46 @@ def iterative_deepening_search(board, pending, available, empties, max_depth=8,
         max_depth = min(10, max_depth + 2)
     
     # Iterative deepening
-    for depth in range(2, max_depth + 1, 2):
+    guess = expected_score
+    remote = search_workers is not None and bool(available)
+    for depth in range(min(start_depth, max_depth), max_depth + 1, 2):
         # Skip deep search on early game
         if filled_positions < 4 and depth > 4:
             continue
-            
-        pos, piece, _ = minimax_with_pruning(
-            board, pending, available, depth, 
-            float('-inf'), float('inf'), True,
-            depth, start_time, time_limit
-        )
+
+        answered = False
+        if remote:
+            # Until an iteration completes, half the time is kept to search locally
+            # the squares the workers may not answer
+            remote_limit = time_limit if best_pos is not None else time_limit / 2
+            result = remote_root_search(board, pending, empties, depth, start_time, remote_limit)
+            if result is None:
+                # No search worker answers: search locally from now on
+                remote = False
+            elif result[0] is not None:
+                pos, piece, score = result
+                guess = score
+                answered = True
+            # Otherwise some square was not answered: this iteration is searched locally
+        if not answered and guess is not None:
+            # Aspiration window around the expected score, widened if the result falls outside
+            alpha, beta = guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW
+            pos, piece, score = minimax_with_pruning(
+                board, pending, available, depth,
+                alpha, beta, True,
+                depth, start_time, time_limit
+            )
+            if alpha < score < beta:
+                guess = score
+            else:
+                guess = None
+        if not answered and guess is None:
+            pos, piece, score = minimax_with_pruning(
+                board, pending, available, depth, 
+                float('-inf'), float('inf'), True,
+                depth, start_time, time_limit
+            )
+            guess = score
         
         # Check if we need to stop due to time limit
         if time.time() - start_time > time_limit:
@@ -468,40 +904,168 @@ def iterative_deepening_search(board, pending, available, empties, max_depth=8,
         if pos is not None:
             best_pos = pos
             best_piece = piece
+            best_score = score
+            best_depth = depth
     
-    # If minimax didn't find anything (due to time constraints or other issues)
+    record_search(best_score, best_depth, start_time)
+    
+    # If no iteration completed, play what an earlier search stored for this
+    # position (the principal variation of the previous move), else a heuristic move
     if best_pos is None and pending is not None:
-        best_pos = select_strategic_position(board, empties)
+        best_pos, best_piece = table_move(board, pending, available)
+        if best_pos is None:
+            best_pos = select_strategic_position(board, empties)
     
-    if best_piece is None and available:
+    if available:
         safe_pieces = find_safe_piece(board, [i for i in empties if i != best_pos], available)
-        best_piece = random.choice(safe_pieces) if safe_pieces else random.choice(available)
+        if best_piece is None or (best_score is None and safe_pieces and best_piece not in safe_pieces):
+            best_piece = random.choice(safe_pieces) if safe_pieces else random.choice(available)
     
     return best_pos, best_piece
 
+def table_move(board, pending, available):
+    """(pos, piece) stored in the transposition table for this position, None for what it lacks."""
+    _, pos = lookup_position(board, pending, 0, float('-inf'), float('inf'))
+    if pos is None or board[pos] is not None:
+        return None, None
+    new_board = board[:]
+    new_board[pos] = pending
+    _, piece = lookup_position(new_board, None, 0, float('-inf'), float('inf'), GIVE)
+    return pos, piece if piece in available else None
+
+# -------------- SEARCH WORKERS --------------
+
+# Addresses (host:port,...) of remote_search.py worker daemons sharing the root of the searches
+SEARCH_WORKERS_ENV = 'QUARTO_SEARCH_WORKERS'
+
+search_workers = None
+
+def use_search_workers(addresses):
+    """Split the iterations of the searches over these worker daemons ('host:port,...')."""
+    global search_workers
+    import remote_search
+    if search_workers is not None:
+        search_workers.close()
+    search_workers = remote_search.Coordinator(remote_search.parse_addresses(addresses))
+    return search_workers
+
+if os.environ.get(SEARCH_WORKERS_ENV):
+    use_search_workers(os.environ[SEARCH_WORKERS_ENV])
+
+def remote_root_search(board, pending, empties, depth, start_time, time_limit):
+    """
+    One iteration with its root squares searched by the workers: (pos,
+    piece, score), pos None if some square was not answered in time, or
+    None if no worker took the jobs.
+    """
+    _, tt_best = lookup_position(board, pending, depth, float('-inf'), float('inf'))
+    positions = order_positions(empties, tt_best)
+    answer = search_workers.search_root(board, pending, positions, depth, start_time + time_limit)
+    if answer is None:
+        return None
+    results, nodes = answer
+    last_search['nodes'] += nodes
+    if len(results) < len(positions):
+        return None, None, 0
+    best = max(positions, key=lambda pos: results[pos][1])
+    piece, score = results[best]
+    store_position(board, pending, depth, score, EXACT, best)
+    return best, piece, score
+
+# -------------- GAME SESSION --------------
+
+# Half-width of the aspiration window around an expected score
+ASPIRATION_WINDOW = 16
+
+class GameSession:
+    """What the last search of the current game leaves to the next one."""
+
+    def __init__(self):
+        self.codes = None  # board after our last move
+        self.given = codec.EMPTY  # piece we gave with it
+        self.pv = []  # continuation expected after our move
+        self.score = None
+        self.depth = 0
+
+    def continues(self, codes):
+        return self.codes is not None and codec.board_extends(self.codes, codes)
+
+    def warm_start(self, codes, pending_code):
+        """
+        (start_depth, expected_score) for a search of this position. If
+        the opponent answered as the principal variation predicted, the
+        position was already searched depth - 2 full moves deep.
+        """
+        if not self.pv or self.score is None:
+            return 2, None
+        expected = self.pv[0]
+        board = self.codes[:]
+        board[expected['pos']] = self.given
+        if board != codes or codec.piece_to_code(expected['piece']) != pending_code:
+            return 2, None
+        return max(2, self.depth - 2), self.score
+
+    def record(self, codes, pos, pending_code, piece):
+        """Remember our move and the search that chose it."""
+        self.codes = codes[:]
+        self.codes[pos] = pending_code
+        self.given = codec.piece_to_code(piece)
+        self.pv = []
+        if piece is not None:
+            self.pv = principal_variation(codec.decode_board(self.codes), piece, player_turn=False)
+        self.score = last_search['score']
+        self.depth = last_search['depth']
+
+session = GameSession()
+
+def new_game():
+    """Forget the previous game: its session and its move ordering statistics."""
+    global session
+    session = GameSession()
+    history.clear()
+
+def age_history():
+    """Halve the history scores, so the last moves of the game weigh most."""
+    for move in list(history):
+        history[move] >>= 1
+        if not history[move]:
+            del history[move]
+
 # -------------- MAIN STRATEGY FUNCTION --------------
 
-def gen_move(state):
+def begin_search():
+    """Housekeeping before every search: a new table generation, and the table fitted to its budget."""
+    global tt_generation
+    tt_generation = (tt_generation + 1) % tt_store.GENERATIONS
+    fit_tt_budget()
+
+def gen_move(state, time_limit=None):
     """
     Generate the best move for the current game state.
     This is the main function called by the game engine.
+    time_limit overrides the thinking time (seconds) chosen from the game phase.
     """
+    begin_search()
+
+    # Validate the state and decode it in one pass
+    codes, pending_code, available_mask = codec.decode_state(state)
     board = state['board']
     pending = state.get('piece')
     
     # Get empty positions
-    empties = [i for i, v in enumerate(board) if v is None]
+    empties = [i for i, c in enumerate(codes) if c == codec.EMPTY]
     if pending is not None and not empties:
         raise Exception("No empty squares left")
     
     # Get available pieces
-    available = extract_available_pieces(state)
-    available = [p for p in available if VALID_PIECE.match(p)]
+    available = codec.mask_pieces(available_mask)
     if not available and pending is None:
         raise Exception("No pieces to give on first move")
     
     # First move (just choosing a piece)
     if pending is None:
+        last_search['nodes'] = 0
+        record_search(None, 0, time.time())
         # For the first move, try to select a good piece
         patterns = get_dangerous_patterns(board)
         dangerous_pieces = find_dangerous_pieces(board, available, patterns)
@@ -513,13 +1077,115 @@ def gen_move(state):
         return {'pos': None, 'piece': random.choice(available)}
     
     # For subsequent moves
-    time_limit = 0.5  # 500ms time limit for thinking
-    if len(empties) <= 6:  # End game, we can think longer
-        time_limit = 1.0
+    if time_limit is None:
+        time_limit = MOVE_TIME_LIMIT
+        if len(empties) <= 6:  # End game, we can think longer
+            time_limit = ENDGAME_TIME_LIMIT
+    
+    # Continue from the last search of this game when the state follows it
+    if session.continues(codes):
+        age_history()
+        start_depth, expected_score = session.warm_start(codes, pending_code)
+    else:
+        new_game()
+        start_depth, expected_score = 2, None
     
     pos, next_piece = iterative_deepening_search(
         board, pending, available, empties, 
-        max_depth=8, time_limit=time_limit
+        max_depth=8, time_limit=time_limit,
+        start_depth=start_depth, expected_score=expected_score
     )
+    session.record(codes, pos, pending_code, next_piece)
     
     return {'pos': pos, 'piece': next_piece}
+
+# -------------- BATCH ANALYSIS --------------
+
+def principal_variation(board, pending, player_turn=True, max_moves=16):
+    """Best moves stored in the transposition table from a position, as a list of move dicts."""
+    board = board[:]
+    pv = []
+    while pending is not None and len(pv) < max_moves:
+        entry = transposition_table.get(board_to_key(board, pending, PLACE, player_turn))
+        if entry is None or entry[3] is None or board[entry[3]] is not None:
+            break
+        pos = entry[3]
+        won = completing_position(threat_lines(board), pending) == pos
+        board[pos] = pending
+        entry = transposition_table.get(board_to_key(board, None, GIVE, player_turn))
+        piece = None if won or entry is None else entry[3]
+        pv.append({'pos': pos, 'piece': piece})
+        pending = piece
+        player_turn = not player_turn
+    return pv
+
+def analyze_state(state, budget=1.0):
+    """
+    Search one state for budget seconds.
+    Returns a dict with the move, its score for the side to move, the
+    search depth and node count, and the principal variation.
+    """
+    move = gen_move(state, time_limit=budget)
+    pv = [move]
+    if move['pos'] is not None and move['piece'] is not None:
+        board = state['board'][:]
+        board[move['pos']] = state['piece']
+        pv += principal_variation(board, move['piece'], player_turn=False)
+    return {
+        'move': move,
+        'score': last_search['score'],
+        'depth': last_search['depth'],
+        'nodes': last_search['nodes'],
+        'pv': pv,
+    }
+
+def analyze_run(states, budget):
+    """Analyze states one after the other in this process, keeping the table warm; errors are reported per state."""
+    results = []
+    for state in states:
+        try:
+            results.append(analyze_state(state, budget))
+        except Exception as e:
+            results.append({'error': f"{type(e).__name__}: {e}"})
+    return results
+
+def _related_runs(states):
+    """Group consecutive states of a same game, so that one worker searches them with a warm table."""
+    run = []
+    previous = None
+    for state in states:
+        try:
+            codes = codec.encode_board(state['board'])
+        except (KeyError, TypeError):
+            codes = None
+        if run and (codes is None or previous is None or not codec.board_extends(previous, codes)):
+            yield run
+            run = []
+        run.append(state)
+        previous = codes
+    if run:
+        yield run
+
+def analyze_batch(states, budget=1.0, workers=None):
+    """
+    Analyze an iterable (possibly a stream) of states with budget seconds each.
+
+    Consecutive states of a same game are searched by the same worker
+    process so its transposition table carries over between them. Results
+    (see analyze_state, or {'error': ...}) are yielded in input order as
+    soon as they are ready. workers=0 analyzes in this process.
+    """
+    if workers == 0:
+        for run in _related_runs(states):
+            yield from analyze_run(run, budget)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        limit = 2 * (workers or os.cpu_count() or 1)
+        pending_runs = []
+        for run in _related_runs(states):
+            pending_runs.append(pool.submit(analyze_run, run, budget))
+            while len(pending_runs) > limit:
+                yield from pending_runs.pop(0).result()
+        for future in pending_runs:
+            yield from future.result()
@@ -0,0 +1,181 @@
+"""Supervision of client processes started by start_players*.py.
+
+The supervisor pings every client on its port_client at a fixed interval
+and records round-trip latency. A client that exits, or stops answering
+pings, is restarted with exponential backoff. Optionally every client
+(and the search workers it spawns, which inherit its affinity) is pinned
+to its own set of CPUs with os.sched_setaffinity.
+"""
+
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import time
+from collections import deque
+
+from client_modular import readJSON, writeJSON
+
+def cpu_sets(count, cpus_per_client):
+    """Split the CPUs available to this process into count disjoint sets (reused round-robin)."""
+    if not hasattr(os, 'sched_getaffinity') or cpus_per_client <= 0:
+        return [None]*count
+    cpus = sorted(os.sched_getaffinity(0))
+    chunks = [cpus[i:i + cpus_per_client] for i in range(0, len(cpus), cpus_per_client)] or [cpus]
+    return [set(chunks[i % len(chunks)]) for i in range(count)]
+
+async def ping(host, port, timeout=2):
+    """Round-trip time of a ping request in seconds, or None if the client did not answer."""
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        try:
+            await writeJSON(writer, {'request': 'ping'})
+            response = await asyncio.wait_for(readJSON(reader), timeout)
+        finally:
+            writer.close()
+    except Exception:
+        return None
+    if response.get('response') != 'pong':
+        return None
+    return time.perf_counter() - start
+
+class SupervisedClient:
+    """One client process with its restart and latency bookkeeping."""
+
+    def __init__(self, name, cmd, port, cpus=None):
+        self.name = name
+        self.cmd = cmd
+        self.port = port
+        self.cpus = cpus
+        self.proc = None
+        self.started_at = 0.0
+        self.restarts = 0
+        self.backoff = 0.0
+        self.next_start = 0.0
+        self.missed_pings = 0
+        self.latencies = deque(maxlen=100)
+
+    def stats(self):
+        """Latency summary in milliseconds."""
+        if not self.latencies:
+            return {'pings': 0, 'restarts': self.restarts}
+        ms = sorted(l * 1000 for l in self.latencies)
+        return {
+            'pings': len(ms),
+            'restarts': self.restarts,
+            'p50_ms': statistics.median(ms),
+            'max_ms': ms[-1],
+        }
+
+class Supervisor:
+    """Keeps a set of client processes alive and measures their latency."""
+
+    def __init__(self, clients, cwd=None, ping_interval=5.0, ping_timeout=2.0,
+                 max_missed_pings=3, startup_grace=10.0, max_backoff=60.0, stable_after=60.0, stop_timeout=5.0):
+        self.clients = clients
+        self.cwd = cwd
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.max_missed_pings = max_missed_pings
+        self.startup_grace = startup_grace
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.stop_timeout = stop_timeout
+
+    def start(self, client):
+        cpus = client.cpus if hasattr(os, 'sched_setaffinity') else None
+        if cpus:
+            # Pinned in the child before exec, so nothing it starts runs unpinned
+            try:
+                client.proc = subprocess.Popen(client.cmd, cwd=self.cwd,
+                                               preexec_fn=lambda: os.sched_setaffinity(0, cpus))
+            except subprocess.SubprocessError as e:
+                print(f"[SUPERVISOR] Could not pin {client.name} to CPUs {sorted(cpus)}: {e}")
+                cpus = None
+        if not cpus:
+            client.proc = subprocess.Popen(client.cmd, cwd=self.cwd)
+        client.started_at = time.monotonic()
+        client.missed_pings = 0
+        pinned = f" on CPUs {sorted(cpus)}" if cpus else ''
+        print(f"[SUPERVISOR] Started {client.name} (pid {client.proc.pid}){pinned}")
+
+    def schedule_restart(self, client, reason):
+        now = time.monotonic()
+        if now - client.started_at > self.stable_after:
+            client.backoff = 0.0
+        client.backoff = min(self.max_backoff, client.backoff * 2 if client.backoff else 1.0)
+        client.next_start = now + client.backoff
+        client.restarts += 1
+        print(f"[SUPERVISOR] {client.name} {reason}; restarting in {client.backoff:.0f}s")
+
+    def stop_process(self, client):
+        if client.proc is None or client.proc.poll() is not None:
+            return
+        client.proc.send_signal(signal.SIGINT)
+        try:
+            client.proc.wait(timeout=self.stop_timeout)
+        except subprocess.TimeoutExpired:
+            client.proc.kill()
+            client.proc.wait()
+
+    async def check(self, client):
+        """Restart the client if it died or hangs, otherwise record its latency."""
+        if client.proc is None:
+            if time.monotonic() >= client.next_start:
+                self.start(client)
+            return
+        code = client.proc.poll()
+        if code is not None:
+            client.proc = None
+            self.schedule_restart(client, f"exited with code {code}")
+            return
+        rtt = await ping('127.0.0.1', client.port, self.ping_timeout)
+        if rtt is not None:
+            client.latencies.append(rtt)
+            client.missed_pings = 0
+            return
+        if time.monotonic() - client.started_at < self.startup_grace:
+            return
+        client.missed_pings += 1
+        if client.missed_pings >= self.max_missed_pings:
+            # Waiting for the exit in a thread keeps the other clients checked meanwhile
+            await asyncio.to_thread(self.stop_process, client)
+            client.proc = None
+            self.schedule_restart(client, f"missed {client.missed_pings} pings")
+
+    def report(self):
+        for client in self.clients:
+            stats = client.stats()
+            if stats['pings']:
+                print(f"[SUPERVISOR] {client.name}: p50={stats['p50_ms']:.1f}ms max={stats['max_ms']:.1f}ms "
+                      f"pings={stats['pings']} restarts={stats['restarts']}")
+            else:
+                print(f"[SUPERVISOR] {client.name}: no answer yet, restarts={stats['restarts']}")
+
+    async def run(self, report_every=12):
+        for client in self.clients:
+            self.start(client)
+        rounds = 0
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await asyncio.gather(*(self.check(client) for client in self.clients))
+            rounds += 1
+            if rounds % report_every == 0:
+                self.report()
+
+    def stop(self):
+        for client in self.clients:
+            self.stop_process(client)
+        self.report()
+
+def supervise(clients, cwd=None, **options):
+    """Run a Supervisor until interrupted, then stop every client."""
+    supervisor = Supervisor(clients, cwd, **options)
+    try:
+        asyncio.run(supervisor.run())
+    except KeyboardInterrupt:
+        print("Stopping all clients...")
+    finally:
+        supervisor.stop()
@@ -0,0 +1,54 @@
+"""Symmetries of Quarto positions and canonical position keys.
+
+The 32 square permutations that map winning lines onto winning lines
+(rotations, reflections, the "inside-out" swap and the middle swap) are
+combined with attribute complements (XOR of all piece codes by a mask).
+Both preserve the game value, so symmetric positions share one key.
+"""
+
+from codec import EMPTY, pack_position
+from tables import LINES, PERMUTATIONS
+
+def canonical_form(codes, pending_code):
+    """
+    Canonical representative of a coded position.
+
+    Returns (key, perm, mask): the packed key of the smallest symmetric
+    position, and the transform that produced it, such that
+    canonical[i] == codes[perm[i]] ^ mask for occupied squares.
+    """
+    best = None
+    for perm in PERMUTATIONS:
+        # canonical square i of a transformed position is square perm[i] of the original
+        seq = [codes[i] for i in perm]
+        # complement attributes so the first placed piece (or pending) becomes 0
+        mask = next((c for c in seq if c != EMPTY), pending_code)
+        if mask == EMPTY:
+            mask = 0
+        seq = [c if c == EMPTY else c ^ mask for c in seq]
+        pending = pending_code if pending_code == EMPTY else pending_code ^ mask
+        candidate = (seq, pending)
+        if best is None or candidate < best[0]:
+            best = (candidate, perm, mask)
+    (seq, pending), perm, mask = best
+    return pack_position(seq, pending), perm, mask
+
+def canonical_key(codes, pending_code):
+    """Packed key of the canonical representative of a coded position."""
+    return canonical_form(codes, pending_code)[0]
+
+def to_original(perm, mask, pos, piece_code):
+    """Map a (pos, piece_code) move of the canonical position back to the original one."""
+    if pos is not None:
+        pos = perm[pos]
+    if piece_code is not None and piece_code != EMPTY:
+        piece_code ^= mask
+    return pos, piece_code
+
+def to_canonical(perm, mask, pos, piece_code):
+    """Map a (pos, piece_code) move of the original position to the canonical one."""
+    if pos is not None:
+        pos = perm.index(pos)
+    if piece_code is not None and piece_code != EMPTY:
+        piece_code ^= mask
+    return pos, piece_code
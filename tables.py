@@ -0,0 +1,143 @@
+"""Precomputed lookup tables, memory-mapped from a versioned binary cache.
+
+    python tables.py        # (re)build tables.bin next to this file
+
+File layout: a header (magic 'QTBL', format version, number of tables),
+one directory entry per table (name, struct format character, byte
+offset, item count), then the tables as packed little-endian arrays.
+The file is mapped read-only at import; if it is missing or was written
+by another VERSION, the tables are computed in Python instead.
+
+Bump VERSION whenever a table definition changes.
+"""
+
+import mmap
+import os
+import struct
+
+MAGIC = b'QTBL'
+VERSION = 1
+HEADER = struct.Struct('<4sHH')
+ENTRY = struct.Struct('<16scxxxII')
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tables.bin')
+# Struct format character and item count of every table, as compute_tables builds them
+LAYOUT = {
+    'lines': ('B', 40),
+    'line_masks': ('H', 10),
+    'permutations': ('B', 32 * 16),
+    'popcount': ('B', 16),
+    'completing': ('H', 32),
+}
+
+def _line_group(lines):
+    """All square permutations preserving the set of winning lines, sorted."""
+    def grid_permutation(f):
+        return tuple(f(i // 4, i % 4) for i in range(16))
+    swap_outer = (1, 0, 3, 2)
+    swap_middle = (0, 2, 1, 3)
+    generators = [
+        grid_permutation(lambda r, c: c*4 + (3 - r)),  # rotation
+        grid_permutation(lambda r, c: c*4 + r),  # transpose
+        grid_permutation(lambda r, c: swap_outer[r]*4 + swap_outer[c]),
+        grid_permutation(lambda r, c: swap_middle[r]*4 + swap_middle[c]),
+    ]
+    identity = tuple(range(16))
+    group = {identity}
+    frontier = [identity]
+    while frontier:
+        p = frontier.pop()
+        for g in generators:
+            q = tuple(g[p[i]] for i in range(16))
+            if q not in group:
+                group.add(q)
+                frontier.append(q)
+    line_set = set(frozenset(line) for line in lines)
+    for p in group:
+        assert set(frozenset(p[i] for i in line) for line in lines) == line_set
+    return sorted(group)
+
+def compute_tables():
+    """Every table as name -> (struct format character, flat list of items)."""
+    lines = (
+        [tuple(range(i*4, i*4 + 4)) for i in range(4)]
+        + [tuple(range(j, 16, 4)) for j in range(4)]
+        + [(0, 5, 10, 15), (3, 6, 9, 12)]
+    )
+    return {
+        # square indexes of the 10 winning lines, 4 per line
+        'lines': ('B', [i for line in lines for i in line]),
+        # 16-bit set of the squares of each line
+        'line_masks': ('H', [sum(1 << i for i in line) for line in lines]),
+        # the 32 line-preserving square permutations, 16 squares each
+        'permutations': ('B', [i for perm in _line_group(lines) for i in perm]),
+        # number of set bits of a 4-bit attribute mask
+        'popcount': ('B', [bin(m).count('1') for m in range(16)]),
+        # 16-bit set of the piece codes having one of the bits of m set (m < 16)
+        # or cleared (16 + m)
+        'completing': ('H', [sum(1 << c for c in range(16) if c & m) for m in range(16)]
+                            + [sum(1 << c for c in range(16) if ~c & m) for m in range(16)]),
+    }
+
+def write_tables(path, tables):
+    """Write tables (as returned by compute_tables) to a cache file."""
+    directory = b''
+    data = b''
+    offset = HEADER.size + ENTRY.size * len(tables)
+    for name, (fmt, items) in tables.items():
+        directory += ENTRY.pack(name.encode('ascii'), fmt.encode('ascii'), offset + len(data), len(items))
+        data += struct.pack(f'<{len(items)}{fmt}', *items)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(tables)) + directory + data)
+    os.replace(tmp, path)
+
+def load_tables(path):
+    """
+    Map a cache file; returns name -> memoryview of its items, or None if
+    missing, stale or damaged (truncated, or a table not matching LAYOUT).
+    """
+    try:
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, version, count = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            return None
+        view = memoryview(mm)
+        tables = {}
+        for i in range(count):
+            name, fmt, offset, items = ENTRY.unpack_from(mm, HEADER.size + i * ENTRY.size)
+            name = name.rstrip(b'\0').decode('ascii')
+            fmt = fmt.decode('ascii')
+            if LAYOUT.get(name, (fmt, items)) != (fmt, items):
+                return None
+            size = struct.calcsize(fmt) * items
+            if offset + size > len(mm):
+                return None
+            tables[name] = view[offset:offset + size].cast(fmt)
+    except (struct.error, TypeError, ValueError):
+        return None
+    if not LAYOUT.keys() <= tables.keys():
+        return None
+    return tables
+
+def _rows(items, width):
+    return [tuple(items[i:i + width]) for i in range(0, len(items), width)]
+
+_tables = load_tables(CACHE_PATH)
+SOURCE = 'cache' if _tables is not None else 'computed'
+if _tables is None:
+    _tables = {name: items for name, (_, items) in compute_tables().items()}
+
+# Hot tables are copied into tuples: indexing them beats indexing a memoryview
+LINES = _rows(_tables['lines'], 4)
+LINE_MASKS = tuple(_tables['line_masks'])
+PERMUTATIONS = _rows(_tables['permutations'], 16)
+POPCOUNT = tuple(_tables['popcount'])
+COMPLETING = tuple(_tables['completing'])
+
+if __name__ == '__main__':
+    write_tables(CACHE_PATH, compute_tables())
+    print(f"[TABLES] Version {VERSION} écrite dans {CACHE_PATH} ({os.path.getsize(CACHE_PATH)} octets)")
@@ -0,0 +1,83 @@
+import os
+import random
+import tempfile
+import unittest
+
+import codec
+import endgame_db
+import symmetry
+
+
+class TestSymmetry(unittest.TestCase):
+    def test_line_group(self):
+        self.assertEqual(len(symmetry.PERMUTATIONS), 32)
+
+    def test_canonical_key_invariant(self):
+        rng = random.Random(0)
+        codes, pending = endgame_db.random_seeds(1, 8, rng)[0]
+        key, perm, mask = symmetry.canonical_form(codes, pending)
+        for other_perm in symmetry.PERMUTATIONS:
+            for other_mask in (0, 5, 15):
+                moved = [codes[i] if codes[i] == codec.EMPTY else codes[i] ^ other_mask for i in other_perm]
+                self.assertEqual(symmetry.canonical_key(moved, pending ^ other_mask), key)
+
+    def test_move_roundtrip(self):
+        codes = codec.encode_board(['BDEC', None, 'SLFP'] + [None]*13)
+        _, perm, mask = symmetry.canonical_form(codes, 3)
+        move = symmetry.to_canonical(perm, mask, 7, 9)
+        self.assertEqual(symmetry.to_original(perm, mask, *move), (7, 9))
+
+
+class TestEndgameDB(unittest.TestCase):
+    def setUp(self):
+        self.seeds = endgame_db.random_seeds(10, 4, random.Random(1))
+        self.values = endgame_db.solve(self.seeds, 4)
+        fd, self.path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        endgame_db.write_database(self.path, self.values, 4)
+        self.db = endgame_db.EndgameDB(self.path)
+
+    def tearDown(self):
+        self.db.close()
+        os.remove(self.path)
+
+    def test_probe_matches_solver(self):
+        self.assertEqual(self.db.count, len(self.values))
+        for codes, pending in self.seeds:
+            value = self.values[symmetry.canonical_key(codes, pending)]
+            self.assertEqual(self.db.probe_codes(codes, pending), (value >> 6, value & 63))
+
+    def test_probe_strings(self):
+        codes, pending = self.seeds[0]
+        entry = self.db.probe(codec.decode_board(codes), codec.PIECES[pending])
+        self.assertIn(entry[0], (endgame_db.LOSS, endgame_db.DRAW, endgame_db.WIN))
+
+    def test_too_many_empties(self):
+        self.assertIsNone(self.db.probe_codes([codec.EMPTY]*16, 0))
+
+    def test_immediate_win(self):
+        codes = codec.encode_board(['BDEC', 'BLEC', 'BDFP', None] + [None]*12)
+        self.assertEqual(endgame_db.solve_position(codes, codec.piece_to_code('BLFP'), {}) >> 6, endgame_db.WIN)
+
+    def test_missing_file(self):
+        self.assertIsNone(endgame_db.open_endgame_db(self.path + '.missing'))
+
+    def test_truncated_file(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for size in (0, 5, endgame_db.HEADER.size, len(data) - 1):
+            with open(self.path, 'wb') as f:
+                f.write(data[:size])
+            with self.assertRaises(ValueError):
+                endgame_db.EndgameDB(self.path)
+            self.assertIsNone(endgame_db.open_endgame_db(self.path))
+
+    def test_corrupted_max_empties(self):
+        with open(self.path, 'r+b') as f:
+            f.seek(5)
+            f.write(bytes([200]))
+        self.assertIsNone(endgame_db.open_endgame_db(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
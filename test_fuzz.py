@@ -0,0 +1,58 @@
+import random
+import unittest
+
+import codec
+import fuzz
+import strategy
+
+
+class TestRandomStates(unittest.TestCase):
+    def test_states_are_valid_and_cover_every_filling(self):
+        rng = random.Random(0)
+        fillings = set()
+        for _ in range(500):
+            state = fuzz.random_state(rng)
+            codes, pending, _ = codec.decode_state(state)
+            self.assertFalse(strategy.is_winning(state['board']))
+            filled = sum(c != codec.EMPTY for c in codes)
+            self.assertEqual(pending == codec.EMPTY, filled == 0 and state['piece'] is None)
+            fillings.add(filled)
+        self.assertEqual(fillings, set(range(16)))
+
+    def test_fixed_filling(self):
+        state = fuzz.random_state(random.Random(1), filled=7)
+        self.assertEqual(sum(p is not None for p in state['board']), 7)
+        self.assertIsNotNone(state['piece'])
+
+
+class TestChecks(unittest.TestCase):
+    def test_engines_agree_with_reference(self):
+        report = fuzz.fuzz(list(fuzz.CHECKS), 300, workers=0, seed=3, chunk=100)
+        self.assertEqual(report, {})
+
+    def test_search_check_covers_small_endgames(self):
+        rng = random.Random(2)
+        for _ in range(20):
+            state = fuzz.random_state(rng, filled=13)
+            self.assertIsNone(fuzz.check_search(state))
+
+    def test_failures_are_reported_and_shrunk(self):
+        def check_small_pieces(state):
+            small = [p for p in state['board'] if p is not None and p[0] == 'S']
+            return f"{len(small)} small pieces" if len(small) >= 2 else None
+
+        fuzz.CHECKS['small'] = check_small_pieces
+        try:
+            report = fuzz.fuzz(['small'], 200, workers=0, seed=0, chunk=50)
+        finally:
+            del fuzz.CHECKS['small']
+        state, message = report['small']
+        self.assertEqual(message, "2 small pieces")
+        self.assertEqual(sum(p is not None for p in state['board']), 2)
+
+    def test_exceptions_are_failures(self):
+        self.assertIn('InvalidStateError', fuzz.run_check('decode', {'board': ['XXXX'] + [None]*15, 'piece': None}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import errno
+import json
+import os
+import tempfile
+import unittest
+
+import client_modular
+import codec
+import game_log
+import replay
+import strategy_strong
+
+
+def play_states(moves):
+    """States and answers of a game where both sides play strategy_strong."""
+    state = {'board': [None]*16, 'piece': None}
+    played = []
+    for _ in range(moves):
+        move = strategy_strong.gen_move(state)
+        played.append((dict(state, board=state['board'][:]), move))
+        board = state['board'][:]
+        if move['pos'] is not None:
+            board[move['pos']] = state['piece']
+        state = {'board': board, 'piece': move['piece']}
+    return played
+
+
+class TestGameLog(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.qlog')
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_roundtrip_with_game_framing(self):
+        first, second = play_states(4), play_states(3)
+        recorder = game_log.GameRecorder(self.path)
+        for state, move in first + second:
+            self.assertTrue(recorder.record(state, move))
+        recorder.close()
+        self.assertEqual((recorder.games, recorder.moves), (2, 7))
+
+        records = list(game_log.iter_records(self.path))
+        self.assertEqual(len(records), 7)
+        self.assertEqual([r[0] for r in records], [0, 0, 0, 0, 1, 1, 1])
+        for (state, move), (_, codes, pending, pos, piece) in zip(first + second, records):
+            self.assertEqual(game_log.record_state(codes, pending), state)
+            self.assertEqual(game_log.record_move(pos, piece), move)
+
+    def test_truncated_log(self):
+        recorder = game_log.GameRecorder(self.path)
+        for state, move in play_states(3):
+            recorder.record(state, move)
+        recorder.close()
+        with open(self.path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.path) - 5)
+        self.assertEqual(len(list(game_log.iter_records(self.path))), 2)
+
+    def test_not_a_log(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'nope')
+        with self.assertRaises(ValueError):
+            list(game_log.iter_records(self.path))
+
+    def test_replay(self):
+        recorder = game_log.GameRecorder(self.path)
+        for state, move in play_states(5):
+            recorder.record(state, move)
+        recorder.close()
+        stats = replay.replay(self.path, strategy_strong)
+        self.assertEqual(stats['positions'], 5)
+        self.assertEqual(stats['errors'], 0)
+
+    def test_blunder_detection(self):
+        codes = codec.encode_board(['BDEC', 'BLEC', 'BDFP', None] + [None]*12)
+        pending = codec.piece_to_code('SLFC')
+        self.assertTrue(replay.gives_winning_piece(codes, pending, 5, codec.piece_to_code('BLFP')))
+        self.assertFalse(replay.gives_winning_piece(codes, pending, 3, codec.piece_to_code('BLFP')))
+
+
+class FullDiskRecorder:
+    def record(self, state, move):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+
+
+class TestClientRecording(unittest.TestCase):
+    def test_failed_log_write_keeps_the_move(self):
+        async def handler(reader, writer):
+            await client_modular.handle_connection(reader, writer, strategy_strong, None, FullDiskRecorder())
+
+        async def scenario():
+            server = await asyncio.start_server(handler, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            state = {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'}
+            writer.write(json.dumps({'request': 'play', 'state': state}).encode('utf8'))
+            await writer.drain()
+            response = json.loads(await reader.read())
+            writer.close()
+            server.close()
+            await server.wait_closed()
+            return response
+
+        self.assertEqual(asyncio.run(scenario())['response'], 'move')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+import bench_kernels
+import codec
+import fuzz
+import kernels
+import strategy
+
+
+def placed(board, pos, piece):
+    new_board = board[:]
+    new_board[pos] = piece
+    return new_board
+
+
+class TestKernels(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(4)
+        self.states = [fuzz.random_state(rng) for _ in range(300)]
+
+    def test_match_string_reference(self):
+        for state in self.states:
+            board = state['board']
+            codes = kernels.board_codes(board)
+            empties = [i for i, p in enumerate(board) if p is None]
+            available = sorted(fuzz.reference_available(state))
+            squares = kernels.squares_mask(empties)
+            for piece in available[:3]:
+                full = placed(board, empties[0], piece)
+                self.assertEqual(kernels.is_win(kernels.board_codes(full)), strategy.is_winning(full))
+                wins = [pos for pos in empties if strategy.is_winning(placed(board, pos, piece))]
+                self.assertEqual(kernels.winning_squares(codes, squares, 1 << codec.PIECE_CODES[piece]),
+                                 kernels.squares_mask(wins))
+            losing = [p for p in available if any(strategy.is_winning(placed(board, pos, p)) for pos in empties)]
+            self.assertEqual(kernels.losing_pieces(codes, squares, kernels.pieces_mask(available)),
+                             kernels.pieces_mask(losing))
+
+    def test_excluded_squares_stay_empty(self):
+        board = ['BDEC', 'BLEC', 'BDFP', None, None, None, None, None,
+                 None, None, None, None, None, None, None, None]
+        codes = kernels.board_codes(board)
+        piece = 1 << codec.PIECE_CODES['BLFP']
+        self.assertEqual(kernels.winning_squares(codes, kernels.squares_mask(range(3, 16)), piece), 1 << 3)
+        self.assertEqual(kernels.winning_squares(codes, kernels.squares_mask(range(4, 16)), piece), 0)
+        self.assertEqual(kernels.losing_pieces(codes, kernels.squares_mask(range(4, 16)), piece), 0)
+
+    def test_scan_counts(self):
+        board = ['BDEC', 'BLEC', 'BDFP', None] + [None]*12
+        winning, shared1, _, _, threats, dangerous, empties = kernels.scan(kernels.board_codes(board))
+        self.assertFalse(winning)
+        self.assertEqual((shared1, threats, empties), (1, 1, 13))
+        # The 8 big pieces complete the row, 3 of them are on the board
+        self.assertEqual(dangerous, 5)
+
+
+class TestBackends(unittest.TestCase):
+    def test_bench_digests_are_reproducible(self):
+        first = bench_kernels.run_backend(50, 1)
+        second = bench_kernels.run_backend(50, 1)
+        self.assertEqual({name: r['digest'] for name, r in first.items()},
+                         {name: r['digest'] for name, r in second.items()})
+
+    def test_python_backend_can_be_forced(self):
+        env = dict(os.environ, QUARTO_KERNELS='python')
+        out = subprocess.run([sys.executable, '-c', 'import kernels; print(kernels.BACKEND)'],
+                             env=env, capture_output=True, text=True, check=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(out.stdout.strip(), 'python')
+
+    @unittest.skipUnless(kernels.numba, "numba is not installed")
+    def test_backends_agree(self):
+        python = bench_kernels.measure('python', 500, 2)
+        compiled = bench_kernels.measure('numba', 500, 2)
+        for name in python:
+            self.assertEqual(python[name]['digest'], compiled[name]['digest'], name)
+
+
+if __name__ == '__main__':
+    unittest.main()
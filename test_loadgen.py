@@ -0,0 +1,66 @@
+import asyncio
+import unittest
+
+import client_modular
+import loadgen
+import strategy_strong
+
+
+async def serving(handler, scenario):
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    try:
+        return await scenario(server.sockets[0].getsockname()[1])
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+class TestLoadGenerator(unittest.TestCase):
+    STATES = [
+        {'board': [None]*16, 'piece': 'BDEC'},
+        {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'},
+    ]
+
+    def test_percentiles(self):
+        values = list(range(1, 101))
+        self.assertEqual(loadgen.percentile(values, 50), 50)
+        self.assertEqual(loadgen.percentile(values, 99), 99)
+        self.assertEqual(loadgen.percentile([3], 95), 3)
+        self.assertIsNone(loadgen.percentile([], 50))
+
+    def test_client_under_load(self):
+        async def handler(reader, writer):
+            await client_modular.handle_connection(reader, writer, strategy_strong)
+
+        for rate in (0, 200):
+            report = asyncio.run(serving(handler, lambda port: loadgen.run_load(
+                port, self.STATES, connections=4, rate=rate, requests=20)))
+            summary = report.summary()
+            self.assertEqual((summary['sent'], summary['ok'], summary['errors'], summary['timeouts']), (20, 20, 0, 0))
+            self.assertLessEqual(summary['p50'], summary['p99'])
+
+    def test_errors_and_timeouts_are_counted(self):
+        async def handler(reader, writer):
+            request = await client_modular.readJSON(reader)
+            if request['state']['board'][0] is not None:
+                await asyncio.sleep(1)
+            await client_modular.writeJSON(writer, {'response': 'error', 'error': 'nope'})
+            writer.close()
+
+        report = asyncio.run(serving(handler, lambda port: loadgen.run_load(
+            port, self.STATES, connections=2, requests=4, timeout=0.2)))
+        summary = report.summary()
+        self.assertEqual((summary['ok'], summary['errors'], summary['timeouts']), (0, 2, 2))
+        self.assertEqual(summary['error_kinds'], {'error': 2})
+
+    def test_loopback_only(self):
+        loadgen.check_loopback('127.0.0.1')
+        loadgen.check_loopback('::1')
+        with self.assertRaises(ValueError):
+            loadgen.check_loopback('192.168.1.10')
+        with self.assertRaises(ValueError):
+            asyncio.run(loadgen.run_load(4100, self.STATES, host='10.0.0.1', requests=1))
+
+
+if __name__ == '__main__':
+    unittest.main()
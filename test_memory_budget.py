@@ -0,0 +1,173 @@
+import itertools
+import os
+import random
+import sys
+import tempfile
+import unittest
+
+import codec
+import endgame_db
+import memory_budget
+import strategy_ultimate
+import tt_store
+from move_cache import MoveCache
+
+MIDGAME = {
+    'board': ['BDEC', None, 'SLFP', None, None, 'BLEP', None, None,
+              None, None, 'SDFC', None, None, None, None, None],
+    'piece': 'BLFC',
+}
+
+
+class TestSplit(unittest.TestCase):
+    def test_shares_fit_in_the_budget(self):
+        budgets = memory_budget.split_budget(100)
+        self.assertEqual(set(budgets), set(memory_budget.SHARES))
+        self.assertLessEqual(sum(budgets.values()), 100 * memory_budget.MB)
+
+    def test_shared_immutables_are_not_counted(self):
+        self.assertEqual(memory_budget.object_bytes(('BDEC', None, True, 3)),
+                         memory_budget.object_bytes((None, None, None, None)))
+        self.assertGreater(memory_budget.object_bytes(((1, 2),)), memory_budget.object_bytes((1,)))
+
+    def test_strategy_without_caches_only_bounds_the_move_cache(self):
+        cache = MoveCache(1024)
+        budgets = memory_budget.apply_budget(1, random, cache)
+        self.assertEqual(list(budgets), ['move_cache'])
+        self.assertEqual(cache.max_bytes, budgets['move_cache'])
+
+
+class TestMoveCacheBudget(unittest.TestCase):
+    def test_evicts_to_its_byte_budget(self):
+        cache = MoveCache(10000, max_bytes=4096)
+        rng = random.Random(0)
+        for _ in range(200):
+            board = MIDGAME['board'][:]
+            board[rng.choice([i for i, p in enumerate(board) if p is None])] = 'SLEP'
+            cache.store({'board': board, 'piece': 'BLFC'}, {'pos': 1, 'piece': 'SDEP'})
+        self.assertLessEqual(cache.nbytes, 4096)
+        self.assertGreater(len(cache), 0)
+        self.assertEqual(cache.stats()['bytes'], cache.nbytes)
+
+    def test_byte_count_follows_replacements(self):
+        cache = MoveCache(8)
+        cache.store(MIDGAME, {'pos': 1, 'piece': 'SDEP'})
+        one = cache.nbytes
+        cache.store(MIDGAME, {'pos': 3, 'piece': 'SDEP'})
+        self.assertEqual((len(cache), cache.nbytes), (1, one))
+        cache.max_bytes = 0
+        cache.evict()
+        self.assertEqual(len(cache), 0)
+        self.assertLess(cache.nbytes, one)
+
+
+class TestSearchBudget(unittest.TestCase):
+    def setUp(self):
+        strategy_ultimate.transposition_table.clear()
+        strategy_ultimate.new_game()
+
+    def tearDown(self):
+        strategy_ultimate.set_memory_budget()
+        strategy_ultimate.transposition_table.clear()
+
+    def test_table_stays_within_its_budget(self):
+        budget = 200 * 1024
+        strategy_ultimate.set_memory_budget(budget)
+        strategy_ultimate.gen_move(MIDGAME, time_limit=0.3)
+        self.assertLessEqual(len(strategy_ultimate.transposition_table), strategy_ultimate.tt_max_entries)
+        # The dict keeps the slack of its hash table after a trim
+        self.assertLessEqual(strategy_ultimate.memory_usage()['tt'], budget * 1.5)
+
+    def test_trim_keeps_recent_then_deep_entries(self):
+        table = strategy_ultimate.transposition_table
+        generation = strategy_ultimate.tt_generation
+        table.update({
+            ('old', 9): (9, 0, 0, None, generation - 1),
+            ('new', 1): (1, 0, 0, None, generation),
+            ('new', 5): (5, 0, 0, None, generation),
+        })
+        self.assertEqual(strategy_ultimate.trim_transposition_table(2), 1)
+        self.assertEqual(set(table), {('new', 1), ('new', 5)})
+        strategy_ultimate.trim_transposition_table(1)
+        self.assertEqual(set(table), {('new', 5)})
+
+    def test_full_table_is_trimmed_between_moves(self):
+        table = strategy_ultimate.transposition_table
+        key = strategy_ultimate.board_to_key([None] * 16, 0)
+        strategy_ultimate.set_memory_budget(8 * 1024)
+        for _ in range(2):
+            # The second pass fills the limit recalibrated on the entries of the first
+            limit = strategy_ultimate.tt_max_entries
+            for i in range(limit + 10):
+                strategy_ultimate.store_position([None] * 16, i, 1, 0, strategy_ultimate.EXACT, None)
+            # A full table keeps its entries during a search and only updates them
+            self.assertEqual(len(table), limit)
+            strategy_ultimate.fit_tt_budget()
+        self.assertEqual(len(table), int(limit * strategy_ultimate.TT_TRIM_KEEP))
+        strategy_ultimate.store_position([None] * 16, 0, 3, 0, strategy_ultimate.EXACT, None)
+        self.assertEqual(table[key][0], 3)
+
+    def snapshot(self, entries):
+        """Path of a snapshot of `entries` positions: one piece on the board and another one pending."""
+        fd, path = tempfile.mkstemp(suffix='.tt')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        keys = (strategy_ultimate.board_to_key([None] * pos + [placed] + [None] * (15 - pos), pending, ply, turn)
+                for pos in range(16) for placed in codec.PIECES for pending in codec.PIECES if pending != placed
+                for ply in (strategy_ultimate.PLACE, strategy_ultimate.GIVE) for turn in (True, False))
+        table = {key: (1, 0, strategy_ultimate.EXACT, None, strategy_ultimate.tt_generation)
+                 for key in itertools.islice(keys, entries)}
+        tt_store.save_table(table, path, strategy_ultimate.tt_generation, strategy_ultimate.TT_MAX_AGE)
+        return path
+
+    def test_restore_stops_at_the_budget(self):
+        strategy_ultimate.set_memory_budget(8 * 1024)
+        path = self.snapshot(60)
+        strategy_ultimate.load_transposition_table(path, background=False)
+        self.assertEqual(len(strategy_ultimate.transposition_table), strategy_ultimate.tt_max_entries)
+
+    def test_trim_during_a_background_restore(self):
+        table = strategy_ultimate.transposition_table
+        path = self.snapshot(15360)
+        # Switch threads often, so that the trims are interrupted by inserts
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-5)
+        self.addCleanup(sys.setswitchinterval, interval)
+        for _ in range(3):
+            table.clear()
+            table.update({(i,): (1, 0, strategy_ultimate.EXACT, None, strategy_ultimate.tt_generation)
+                          for i in range(100000)})
+            thread = strategy_ultimate.load_transposition_table(path)
+            while thread.is_alive():
+                strategy_ultimate.trim_transposition_table(len(table) - 100)
+            thread.join()
+
+    def test_endgame_database_over_budget_is_closed(self):
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        saved = strategy_ultimate.endgame
+        try:
+            seeds = endgame_db.random_seeds(5, 3, random.Random(1))
+            endgame_db.write_database(path, endgame_db.solve(seeds, 3), 3)
+            strategy_ultimate.endgame = endgame_db.EndgameDB(path)
+            size = strategy_ultimate.memory_usage()['endgame']
+            self.assertEqual(size, os.path.getsize(path))
+            strategy_ultimate.set_memory_budget(endgame_bytes=size)
+            self.assertIsNotNone(strategy_ultimate.endgame)
+            budgets = memory_budget.apply_budget(size / memory_budget.SHARES['endgame'] / memory_budget.MB / 2,
+                                                 strategy_ultimate)
+            self.assertIsNone(strategy_ultimate.endgame)
+            # The share of the closed database goes to the transposition table
+            self.assertEqual(budgets['endgame'], 0)
+            self.assertEqual(budgets['tt'], strategy_ultimate.tt_max_bytes)
+            self.assertEqual(sum(budgets.values()), sum(memory_budget.split_budget(
+                size / memory_budget.SHARES['endgame'] / memory_budget.MB / 2).values()))
+        finally:
+            if strategy_ultimate.endgame is not None:
+                strategy_ultimate.endgame.close()
+            strategy_ultimate.endgame = saved
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
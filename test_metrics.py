@@ -0,0 +1,77 @@
+import asyncio
+import json
+import unittest
+
+import client_modular
+import metrics
+import strategy_strong
+from move_cache import MoveCache
+
+
+async def send(handler, obj):
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(json.dumps(obj).encode('utf8'))
+    await writer.drain()
+    response = json.loads(await reader.read())
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return response
+
+
+async def scrape(client_metrics, path='/metrics'):
+    server = await metrics.start_metrics_server(client_metrics, 0, '127.0.0.1', lag_interval=0.01)
+    port = server.sockets[0].getsockname()[1]
+    await asyncio.sleep(0.05)
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode('latin1'))
+    await writer.drain()
+    response = (await reader.read()).decode('utf8')
+    writer.close()
+    client_metrics.lag_task.cancel()
+    server.close()
+    await server.wait_closed()
+    return response
+
+
+class TestMetrics(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram((1, 2))
+        for value in (0.5, 1.5, 1.5, 3):
+            histogram.observe(value)
+        lines = histogram.render('h')
+        self.assertEqual(lines[:3], ['h_bucket{le="1"} 1', 'h_bucket{le="2"} 3', 'h_bucket{le="+Inf"} 4'])
+        self.assertEqual(lines[-1], 'h_count 4')
+
+    def test_client_requests_are_exported(self):
+        cache = MoveCache(8)
+        client_metrics = metrics.ClientMetrics(cache)
+
+        async def handler(reader, writer):
+            await client_modular.handle_connection(reader, writer, strategy_strong, cache, None, client_metrics)
+
+        async def scenario():
+            state = {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'}
+            await send(handler, {'request': 'ping'})
+            await send(handler, {'request': 'play', 'state': state})
+            await send(handler, {'request': 'play', 'state': state})
+            await send(handler, {'request': 'play', 'state': {'board': []}})
+            await send(handler, {'request': 'dance'})
+            return await scrape(client_metrics), await scrape(client_metrics, '/other')
+
+        text, missing = asyncio.run(scenario())
+        self.assertIn('HTTP/1.1 200 OK', text)
+        self.assertIn('HTTP/1.1 404', missing)
+        self.assertIn('quarto_requests_total{type="play"} 3', text)
+        self.assertIn('quarto_requests_total{type="unknown"} 1', text)
+        self.assertIn('quarto_errors_total{cause="play"} 1', text)
+        self.assertIn('quarto_move_seconds_count{source="cache"} 1', text)
+        self.assertIn('quarto_move_seconds_count{source="search"} 1', text)
+        self.assertIn('quarto_move_cache_hit_ratio', text)
+        self.assertIn('quarto_event_loop_lag_seconds_count', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+import player_host
+
+
+async def request(host, player, obj):
+    """Send one request to a PlayerHost handler on an ephemeral port."""
+    async def handler(reader, writer):
+        await host.handle_connection(reader, writer, player)
+    server = await asyncio.start_server(handler, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(json.dumps(obj).encode('utf8'))
+    await writer.drain()
+    response = json.loads(await reader.read())
+    writer.close()
+    server.close()
+    await server.wait_closed()
+    return response
+
+
+class TestPlayerHost(unittest.TestCase):
+    def setUp(self):
+        self.player = {'name': 'T', 'strategy': 'strategy_strong', 'port_client': 0}
+        self.host = player_host.PlayerHost([self.player], workers=0)
+
+    def tearDown(self):
+        self.host.close()
+
+    def test_ping(self):
+        response = asyncio.run(request(self.host, self.player, {'request': 'ping'}))
+        self.assertEqual(response, {'response': 'pong'})
+
+    def test_play_uses_shared_cache(self):
+        state = {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'}
+        first = asyncio.run(request(self.host, self.player, {'request': 'play', 'state': state}))
+        second = asyncio.run(request(self.host, self.player, {'request': 'play', 'state': state}))
+        self.assertEqual(first['response'], 'move')
+        self.assertEqual(first, second)
+        self.assertEqual(self.host.caches['strategy_strong'].stats()['hits'], 1)
+
+    def test_play_error(self):
+        state = {'board': ['BDEC']*16, 'piece': 'SDFP'}
+        response = asyncio.run(request(self.host, self.player, {'request': 'play', 'state': state}))
+        self.assertEqual(response['response'], 'error')
+
+    def test_load_players_default_strategy(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump([{'name': 'A', 'port_client': 1}], f)
+        try:
+            self.assertEqual(player_host.load_players(path)[0]['strategy'], 'strategy')
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
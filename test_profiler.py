@@ -0,0 +1,65 @@
+import os
+import pstats
+import tempfile
+import unittest
+
+import profiler
+import strategy_strong
+
+
+def busy(n):
+    total = 0
+    for _ in range(n):
+        total += sum(range(1000))
+    return total
+
+
+class TestMoveProfiler(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_selection(self):
+        selected = lambda **kw: [i for i in range(10) if profiler.MoveProfiler('cprofile', **kw).selected(i)]
+        self.assertEqual(selected(), list(range(10)))
+        self.assertEqual(selected(first=3), [0, 1, 2])
+        self.assertEqual(selected(every=4), [0, 4, 8])
+        self.assertEqual(selected(first=2, every=4), [0, 1, 4, 8])
+
+    def test_cprofile_aggregates_moves(self):
+        p = profiler.MoveProfiler('cprofile', self.path, every=2)
+        state = {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'}
+        for _ in range(4):
+            self.assertIn('pos', p.call(strategy_strong.gen_move, state))
+        self.assertEqual((p.moves, p.profiled), (4, 2))
+        self.assertEqual(p.save(), self.path)
+        stats = pstats.Stats(self.path)
+        calls = {func[2]: value[1] for func, value in stats.stats.items()}
+        self.assertEqual(calls['gen_move'], 2)
+        self.assertIn('classify_gives', calls)
+
+    def test_sampling_writes_collapsed_stacks(self):
+        p = profiler.MoveProfiler('sampling', self.path, interval=0.001)
+        self.assertIsNone(p.save())
+        self.assertEqual(p.call(busy, 3000), busy(3000))
+        p.save()
+        with open(self.path, encoding='utf8') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('test_profiler:busy'))
+            self.assertGreater(int(count), 0)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            profiler.MoveProfiler('perf')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+import unittest
+
+import codec
+import remote_search
+import strategy_ultimate
+
+ENDGAME = {
+    'board': [None, 'BLFC', 'BDEC', 'SDEP', None, 'BDFP', 'BDEP', 'BLFP',
+              'BLEP', None, None, 'SDEC', 'SLFP', 'SLFC', None, 'BDFC'],
+    'piece': 'SLEC',
+}
+MIDGAME = {
+    'board': ['BDEC', None, 'SLFP', None, None, 'BLEP', None, None,
+              None, None, 'SDFC', None, None, None, None, None],
+    'piece': 'BLFC',
+}
+
+
+def start_worker():
+    """A worker daemon searching in a thread of this process; returns its port."""
+    ready = threading.Event()
+    threading.Thread(
+        target=lambda: asyncio.run(remote_search.serve_worker('127.0.0.1', 0, processes=0, ready=ready)),
+        daemon=True,
+    ).start()
+    ready.wait(5)
+    return ready.port
+
+
+def start_fake_worker(on_search):
+    """A worker answering the handshake, then calling on_search(conn) for every search request."""
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen()
+
+    def serve(conn):
+        with conn:
+            for line in conn.makefile('rb'):
+                request = json.loads(line)
+                if request['request'] == 'hello':
+                    conn.sendall(remote_search.encode_message({'response': 'hello', 'slots': 1}))
+                elif on_search(conn):
+                    return
+
+    def accept():
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=serve, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, daemon=True).start()
+    return server.getsockname()[1]
+
+
+def closed_port():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+def empties(state):
+    return [i for i, p in enumerate(state['board']) if p is None]
+
+
+class TestWorker(unittest.TestCase):
+    def tearDown(self):
+        strategy_ultimate.set_memory_budget()
+        strategy_ultimate.transposition_table.clear()
+
+    def test_subtree_search_ages_and_bounds_the_table(self):
+        strategy_ultimate.set_memory_budget(16 * 1024)
+        generation = strategy_ultimate.tt_generation
+        strategy_ultimate.transposition_table.update(
+            {(i,): (1, 0, strategy_ultimate.EXACT, None, generation) for i in range(1000)})
+        remote_search.search_subtree(MIDGAME['board'], MIDGAME['piece'], empties(MIDGAME)[0], 2, 0.2)
+        self.assertNotEqual(strategy_ultimate.tt_generation, generation)
+        self.assertLessEqual(len(strategy_ultimate.transposition_table), strategy_ultimate.tt_max_entries)
+
+
+class TestCoordinator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.ports = [start_worker(), start_worker()]
+
+    def setUp(self):
+        self.saved_lmr = strategy_ultimate.LATE_MOVE_REDUCTIONS
+        self.coordinators = []
+
+    def tearDown(self):
+        strategy_ultimate.LATE_MOVE_REDUCTIONS = self.saved_lmr
+        strategy_ultimate.search_workers = None
+        for coordinator in self.coordinators:
+            coordinator.close()
+
+    def coordinator(self, ports):
+        coordinator = remote_search.Coordinator([('127.0.0.1', port) for port in ports])
+        self.coordinators.append(coordinator)
+        return coordinator
+
+    def test_subtrees_match_local_search(self):
+        # Deep enough to solve the position: no reduction, exact values
+        strategy_ultimate.LATE_MOVE_REDUCTIONS = False
+        results, nodes = self.coordinator(self.ports).search_root(
+            ENDGAME['board'], ENDGAME['piece'], empties(ENDGAME), 3, time.time() + 10)
+        self.assertEqual(sorted(results), empties(ENDGAME))
+        self.assertGreater(nodes, 0)
+        _, _, available = codec.decode_state(ENDGAME)
+        for pos, (_, score) in results.items():
+            board = ENDGAME['board'][:]
+            board[pos] = ENDGAME['piece']
+            strategy_ultimate.transposition_table.clear()
+            _, expected = strategy_ultimate.search_give(board, codec.mask_pieces(available), 3, float('-inf'),
+                                                        float('inf'), True, time.time(), float('inf'))
+            self.assertEqual(score, expected, pos)
+
+    def test_gen_move_searches_on_workers(self):
+        strategy_ultimate.search_workers = self.coordinator(self.ports)
+        strategy_ultimate.new_game()
+        move = strategy_ultimate.gen_move(MIDGAME, time_limit=0.6)
+        self.assertIn(move['pos'], empties(MIDGAME))
+        self.assertGreaterEqual(strategy_ultimate.last_search['depth'], 2)
+        self.assertTrue(all(link.connected for link in strategy_ultimate.search_workers.links))
+
+    def test_falls_back_to_local_search(self):
+        coordinator = self.coordinator([closed_port()])
+        self.assertIsNone(coordinator.search_root(MIDGAME['board'], MIDGAME['piece'], empties(MIDGAME), 2,
+                                                  time.time() + 1))
+        strategy_ultimate.search_workers = coordinator
+        strategy_ultimate.new_game()
+        move = strategy_ultimate.gen_move(MIDGAME, time_limit=0.3)
+        self.assertIn(move['pos'], empties(MIDGAME))
+        self.assertGreaterEqual(strategy_ultimate.last_search['depth'], 2)
+
+    def test_unanswered_iteration_is_searched_locally(self):
+        stalled = start_fake_worker(lambda conn: False)
+        strategy_ultimate.search_workers = self.coordinator([stalled])
+        strategy_ultimate.new_game()
+        move = strategy_ultimate.gen_move(MIDGAME, time_limit=0.6)
+        self.assertIn(move['pos'], empties(MIDGAME))
+        self.assertGreaterEqual(strategy_ultimate.last_search['depth'], 2)
+        self.assertIsNotNone(strategy_ultimate.last_search['score'])
+
+    def test_straggler_jobs_are_copied(self):
+        stalled = start_fake_worker(lambda conn: False)
+        start = time.time()
+        results, _ = self.coordinator([stalled] + self.ports).search_root(
+            ENDGAME['board'], ENDGAME['piece'], empties(ENDGAME), 2, start + 5)
+        self.assertEqual(sorted(results), empties(ENDGAME))
+        self.assertLess(time.time() - start, 4)
+
+    def test_jobs_of_a_broken_worker_are_queued_again(self):
+        broken = start_fake_worker(lambda conn: True)
+        coordinator = self.coordinator([broken, self.ports[0]])
+        results, _ = coordinator.search_root(ENDGAME['board'], ENDGAME['piece'], empties(ENDGAME), 2,
+                                             time.time() + 5)
+        self.assertEqual(sorted(results), empties(ENDGAME))
+        self.assertFalse(coordinator.links[0].connected)
+
+    def test_deadline_is_kept(self):
+        stalled = start_fake_worker(lambda conn: False)
+        start = time.time()
+        results, _ = self.coordinator([stalled]).search_root(
+            MIDGAME['board'], MIDGAME['piece'], empties(MIDGAME), 4, start + 0.5)
+        self.assertEqual(results, {})
+        self.assertLess(time.time() - start, 0.7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import selfplay
+from codec import EMPTY
+from symmetry import canonical_key
+
+
+class TestSelfPlay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_outcomes_alternate_from_side_to_move(self):
+        records = selfplay.play_game(('strategy_strong', 'strategy_strong'), 0, 1, 4)
+        self.assertTrue(records)
+        outcomes = [outcome for _, _, outcome, _ in records]
+        if outcomes[-1] == 0:
+            self.assertEqual(set(outcomes), {0})
+        else:
+            self.assertEqual(outcomes[-1], 1)
+            for a, b in zip(outcomes, outcomes[1:]):
+                self.assertEqual(a, -b)
+
+    def test_games_are_reproducible_and_keep_the_caller_random_state(self):
+        random.seed(7)
+        expected = random.random()
+        random.seed(7)
+        first = selfplay.play_game(('strategy_strong', 'strategy_strong'), 3, 1, 4)
+        self.assertEqual(random.random(), expected)
+        self.assertEqual(selfplay.play_game(('strategy_strong', 'strategy_strong'), 3, 1, 4), first)
+
+    def test_dataset_is_deduplicated_and_resumable(self):
+        strategies = ('strategy_strong', 'strategy_strong')
+        first = selfplay.generate(self.directory, 4, strategies, workers=0, shard_size=10, chunk_games=3)
+        self.assertEqual(first.games, 4)
+        resumed = selfplay.generate(self.directory, 7, strategies, workers=0, shard_size=10)
+        self.assertEqual(resumed.games, 7)
+        records = list(selfplay.iter_dataset(self.directory))
+        self.assertEqual(len(records), resumed.records)
+        self.assertGreater(len(resumed.manifest['shards']), 1)
+        keys = [canonical_key(codes, pending) for codes, pending, _, _ in records]
+        self.assertEqual(len(keys), len(set(keys)))
+        for codes, pending, outcome, score in records:
+            self.assertNotEqual(pending, EMPTY)
+            self.assertIn(outcome, (-1, 0, 1))
+
+    def test_uncommitted_records_are_dropped(self):
+        writer = selfplay.generate(self.directory, 2, ('strategy_strong', 'strategy_strong'), workers=0)
+        shard = os.path.join(self.directory, writer.manifest['shards'][-1]['name'] + '.bin')
+        with open(shard, 'ab') as f:
+            f.write(b'\x01' * 7)
+        resumed = selfplay.DatasetWriter(self.directory)
+        self.assertEqual(os.path.getsize(shard), resumed.records * selfplay.RECORD.size)
+
+    def test_engine_scores_are_recorded(self):
+        records = selfplay.play_game(('strategy_ultimate', 'strategy_strong'), 0, 0, 2)
+        self.assertTrue(any(score != selfplay.NO_SCORE for _, _, _, score in records))
+
+    @unittest.skipUnless(selfplay.np, "numpy is not installed")
+    def test_load_dataset(self):
+        writer = selfplay.generate(self.directory, 2, ('strategy_strong', 'strategy_strong'), workers=0)
+        data = selfplay.load_dataset(self.directory)
+        self.assertEqual(len(data), writer.records)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+import time
+import unittest
+
+import shared_tt
+import strategy_ultimate
+
+KEY = (tuple(['BDEC'] + [None]*15), 'SLFP', strategy_ultimate.PLACE, True)
+
+
+def write_entry(name):
+    table = shared_tt.SharedTranspositionTable(name)
+    table[KEY] = (4, -250, strategy_ultimate.UPPER, 9, 3)
+    table.close()
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+    def setUp(self):
+        self.name = f'quarto_test_{os.getpid()}'
+        self.table = shared_tt.SharedTranspositionTable(self.name, size_mb=1)
+
+    def tearDown(self):
+        self.table.close()
+        shared_tt.unlink_shared_table(self.name)
+
+    def test_fixed_size(self):
+        self.assertLessEqual(self.table.slots * shared_tt.SLOT.size, 2**20)
+        other = shared_tt.SharedTranspositionTable(self.name, size_mb=8)
+        self.assertEqual(other.slots, self.table.slots)
+        other.close()
+
+    def test_roundtrip(self):
+        give_key = (tuple(['BDEC'] + [None]*15), None, strategy_ultimate.GIVE, False)
+        self.table[KEY] = (3, 1000, strategy_ultimate.EXACT, 12, 65535)
+        self.table[give_key] = (2, -18, strategy_ultimate.LOWER, 'SDFP', 0)
+        self.assertEqual(self.table[KEY], (3, 1000, strategy_ultimate.EXACT, 12, 65535))
+        self.assertEqual(self.table.get(give_key), (2, -18, strategy_ultimate.LOWER, 'SDFP', 0))
+        self.assertEqual(len(self.table), 2)
+        self.table.clear()
+        self.assertIsNone(self.table.get(KEY))
+
+    def test_replacement_ignores_generations(self):
+        # A table of one bucket
+        table = shared_tt.SharedTranspositionTable(self.name + '_bucket', size_mb=0)
+        self.addCleanup(shared_tt.unlink_shared_table, self.name + '_bucket')
+        self.addCleanup(table.close)
+        self.assertEqual(table.buckets, 1)
+        deep, shallow, newer = [(tuple([piece] + [None]*15), 'SLFP', strategy_ultimate.PLACE, True)
+                                for piece in ('BDEC', 'BLEC', 'SDEC')]
+        # The deep entry of a process whose generation is behind survives newer shallow ones
+        table[deep] = (6, 0, strategy_ultimate.EXACT, 1, 10)
+        table[shallow] = (1, 0, strategy_ultimate.EXACT, 1, 500)
+        table[newer] = (2, 0, strategy_ultimate.EXACT, 1, 500)
+        self.assertEqual(table[deep][0], 6)
+        self.assertIsNone(table.get(shallow))
+        self.assertEqual(table[newer][0], 2)
+        table[shallow] = (7, 0, strategy_ultimate.EXACT, 1, 11)
+        self.assertEqual((table[shallow][0], table[newer][0]), (7, 2))
+        self.assertIsNone(table.get(deep))
+
+    def test_shared_between_processes(self):
+        proc = multiprocessing.Process(target=write_entry, args=(self.name,))
+        proc.start()
+        proc.join()
+        self.assertEqual(self.table.get(KEY), (4, -250, strategy_ultimate.UPPER, 9, 3))
+
+    def test_search_uses_shared_table(self):
+        local = strategy_ultimate.transposition_table
+        strategy_ultimate.transposition_table = self.table
+        try:
+            board = ['BDEC', None, 'SLFP', None, None, 'BLEC'] + [None]*10
+            pending = 'SDEP'
+            available = sorted(strategy_ultimate.get_all_pieces() - set(board) - {pending})
+            _, _, score = strategy_ultimate.minimax_with_pruning(
+                board, pending, available, 1, float('-inf'), float('inf'), True, 1, time.time(), 60
+            )
+            self.assertGreater(len(self.table), 0)
+        finally:
+            strategy_ultimate.transposition_table = local
+        local.clear()
+        _, _, local_score = strategy_ultimate.minimax_with_pruning(
+            board, pending, available, 1, float('-inf'), float('inf'), True, 1, time.time(), 60
+        )
+        self.assertEqual(score, local_score)
+
+
+if __name__ == '__main__':
+    unittest.main()
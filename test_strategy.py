@@ -1,4 +1,7 @@
+import re
 import unittest
+
+import codec
 import strategy
 
 class TestStrategy(unittest.TestCase):
@@ -68,10 +71,30 @@ class TestStrategy(unittest.TestCase):
         board = [None]*16
         self.assertFalse(strategy.is_winning(board))
 
-    def test_valid_piece_regex(self):
-        self.assertTrue(strategy.VALID_PIECE.match('BDEC'))
-        self.assertFalse(strategy.VALID_PIECE.match('BDEZ'))
-        self.assertFalse(strategy.VALID_PIECE.match('1234'))
+    def test_invalid_pieces_rejected(self):
+        for piece in ('BDEZ', '1234', 42):
+            with self.assertRaises(codec.InvalidStateError):
+                strategy.gen_move({'board': [piece] + [None]*15, 'piece': None})
+
+class TestDecodeState(unittest.TestCase):
+    def test_decode(self):
+        codes, pending, available = codec.decode_state({'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'})
+        self.assertEqual(codes, [codec.piece_to_code('BDEC')] + [codec.EMPTY]*15)
+        self.assertEqual(pending, codec.piece_to_code('SLFP'))
+        self.assertEqual(sorted(codec.mask_pieces(available)),
+                         sorted(set(codec.PIECES) - {'BDEC', 'SLFP'}))
+
+    def test_helpful_errors(self):
+        cases = [
+            ({'board': [None]*15}, 'got 15'),
+            ({'board': [None]*3 + ['BDEZ'] + [None]*12}, 'square 3'),
+            ({'board': ['BDEC', 'BDEC'] + [None]*14}, 'already on square 0'),
+            ({'board': ['BDEC'] + [None]*15, 'piece': 'BDEC'}, "state['piece']"),
+            ('board', 'must be an object'),
+        ]
+        for state, message in cases:
+            with self.assertRaisesRegex(codec.InvalidStateError, re.escape(message)):
+                codec.decode_state(state)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import strategy_portfolio
+
+FORCED_WIN_BOARD = [
+    'BDFC', None, 'BLFC', 'SDEP', 'BLFP', None, 'SDEC', 'BDFP',
+    None, 'BDEC', None, 'BLEC', None, 'SLEP', 'SDFP', None,
+]
+FORCED_WIN_PENDING = 'SLFC'
+
+# BDEC on square 3 completes the first row (all B)
+ROW_BOARD = ['BDEP', 'BLFC', 'BLEP', None] + [None]*12
+
+
+class TestVerifyMove(unittest.TestCase):
+    def test_illegal_moves(self):
+        state = {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'}
+        self.assertIsNotNone(strategy_portfolio.verify_move(state, {'pos': 0, 'piece': 'SLFC'}))
+        self.assertIsNotNone(strategy_portfolio.verify_move(state, {'pos': 5, 'piece': 'BDEC'}))
+        self.assertIsNotNone(strategy_portfolio.verify_move(state, {'pos': 5, 'piece': 'SLFP'}))
+        self.assertIsNone(strategy_portfolio.verify_move(state, {'pos': 5, 'piece': 'SLFC'}))
+
+    def test_missed_win(self):
+        state = {'board': ROW_BOARD, 'piece': 'BDEC'}
+        self.assertIsNotNone(strategy_portfolio.verify_move(state, {'pos': 4, 'piece': 'SLFP'}))
+        self.assertIsNone(strategy_portfolio.verify_move(state, {'pos': 3, 'piece': 'SLFP'}))
+
+    def test_gift(self):
+        state = {'board': ROW_BOARD, 'piece': 'SDEC'}
+        self.assertIsNotNone(strategy_portfolio.verify_move(state, {'pos': 15, 'piece': 'BDFC'}))
+        self.assertIsNone(strategy_portfolio.verify_move(state, {'pos': 3, 'piece': 'BDFC'}))
+
+
+class TestPortfolio(unittest.TestCase):
+    def test_phases(self):
+        self.assertEqual(strategy_portfolio.game_phase(16)[0], 'opening')
+        self.assertIsNone(strategy_portfolio.game_phase(14)[1])
+        self.assertEqual(strategy_portfolio.game_phase(10)[0], 'middlegame')
+        self.assertEqual(strategy_portfolio.game_phase(4)[0], 'endgame')
+
+    def test_opening_uses_heuristic(self):
+        move = strategy_portfolio.gen_move({'board': [None]*16, 'piece': 'BDEC'})
+        self.assertEqual(strategy_portfolio.last_choice['engine'], 'strategy_strong')
+        self.assertIsNone(strategy_portfolio.verify_move({'board': [None]*16, 'piece': 'BDEC'}, move))
+
+    def test_deep_search_plays_forced_win(self):
+        state = {'board': FORCED_WIN_BOARD, 'piece': FORCED_WIN_PENDING}
+        move = strategy_portfolio.gen_move(state, time_limit=1.0)
+        self.assertEqual(strategy_portfolio.last_choice['engine'], 'strategy_ultimate')
+        self.assertEqual(strategy_portfolio.last_search['score'], 1000)
+        self.assertIsNone(strategy_portfolio.verify_move(state, move))
+
+    def test_late_search_falls_back(self):
+        state = {'board': ROW_BOARD[:15] + ['SLFP'], 'piece': 'SDEC'}
+        margin = strategy_portfolio.RESULT_MARGIN
+        strategy_portfolio.RESULT_MARGIN = -1.0
+        try:
+            move = strategy_portfolio.gen_move(state, time_limit=0.2)
+        finally:
+            strategy_portfolio.RESULT_MARGIN = margin
+        self.assertEqual(strategy_portfolio.last_choice['engine'], 'strategy_strong')
+        self.assertEqual(strategy_portfolio.last_choice['reason'], "recherche hors délai")
+        self.assertIsNone(strategy_portfolio.verify_move(state, move))
+
+    def test_next_search_does_not_wait_behind_a_late_one(self):
+        margin = strategy_portfolio.RESULT_MARGIN
+        strategy_portfolio.RESULT_MARGIN = -1.0
+        try:
+            strategy_portfolio.gen_move({'board': ROW_BOARD[:15] + ['SLFP'], 'piece': 'SDEC'}, time_limit=2.0)
+        finally:
+            strategy_portfolio.RESULT_MARGIN = margin
+        stale = strategy_portfolio._pool
+        self.assertFalse(strategy_portfolio._outstanding.done())
+        strategy_portfolio.gen_move({'board': FORCED_WIN_BOARD, 'piece': FORCED_WIN_PENDING}, time_limit=1.0)
+        self.assertIsNot(strategy_portfolio._pool, stale)
+        self.assertEqual(strategy_portfolio.last_choice['engine'], 'strategy_ultimate')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import random
+import unittest
+
+import codec
+import strategy_strong
+
+
+def reference_rank(board, empties, piece, available):
+    """classify_gives computed with full is_winning scans over every continuation."""
+    def wins_with(board, pos, piece):
+        new_board = board[:]
+        new_board[pos] = piece
+        return strategy_strong.is_winning(new_board)
+
+    def losing(board, empties, piece):
+        return any(wins_with(board, pos, piece) for pos in empties)
+
+    if losing(board, empties, piece):
+        return strategy_strong.GIVE_LOSES
+    remaining = [p for p in available if p != piece]
+    if not remaining or len(empties) < 2:
+        return strategy_strong.GIVE_SAFE
+    forced_everywhere = True
+    for pos in empties:
+        after = board[:]
+        after[pos] = piece
+        next_empties = [i for i in empties if i != pos]
+        replies = [q for q in remaining if not losing(after, next_empties, q)]
+        if replies:
+            forced_everywhere = False
+        for reply in replies:
+            left = [r for r in remaining if r != reply]
+            if left and all(
+                all(losing(after[:t] + [reply] + after[t + 1:], [i for i in next_empties if i != t], r) for r in left)
+                for t in next_empties
+            ):
+                return strategy_strong.GIVE_TRAPPED
+    return strategy_strong.GIVE_WINS if forced_everywhere else strategy_strong.GIVE_SAFE
+
+
+def random_position(rng, filled):
+    """A board with filled pieces and no completed line, and the pieces left."""
+    while True:
+        pieces = rng.sample(codec.PIECES, filled)
+        board = [None] * 16
+        for pos, piece in zip(rng.sample(range(16), filled), pieces):
+            board[pos] = piece
+        if not strategy_strong.is_winning(board):
+            return board, [p for p in codec.PIECES if p not in pieces]
+
+
+class TestGiveClassification(unittest.TestCase):
+    def test_matches_full_scans(self):
+        rng = random.Random(5)
+        seen = set()
+        for filled in (10, 11, 11, 12, 12, 12) * 4:
+            board, available = random_position(rng, filled)
+            empties = [i for i, p in enumerate(board) if p is None]
+            mask = sum(1 << codec.PIECE_CODES[p] for p in available)
+            ranks = strategy_strong.classify_gives(codec.encode_board(board), empties, mask)
+            for piece in available:
+                expected = reference_rank(board, empties, piece, available)
+                self.assertEqual(ranks[codec.PIECE_CODES[piece]], expected, (board, piece))
+                seen.add(expected)
+        self.assertEqual(len(seen), 4)
+
+    def test_never_gives_a_winning_piece_when_avoidable(self):
+        # Every big piece completes the top row
+        board = ['BDEC', 'BLEC', 'BDFP', None] + [None]*12
+        available = [p for p in codec.PIECES if p not in board]
+        empties = [i for i, p in enumerate(board) if p is None]
+        for _ in range(10):
+            self.assertEqual(strategy_strong.select_best_piece(board, empties, available)[0], 'S')
+
+    def test_last_move_gives_nothing(self):
+        board = codec.PIECES[:15] + [None]
+        move = strategy_strong.gen_move({'board': board, 'piece': codec.PIECES[15]})
+        self.assertEqual(move['pos'], 15)
+        self.assertIsNone(move['piece'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,330 @@
+import os
+import tempfile
+import time
+import unittest
+import codec
+import strategy_ultimate
+import tt_store
+import tune_eval
+
+
+FORCED_WIN_BOARD = [
+    'BDFC', None, 'BLFC', 'SDEP', 'BLFP', None, 'SDEC', 'BDFP',
+    None, 'BDEC', None, 'BLEC', None, 'SLEP', 'SDFP', None,
+]
+FORCED_WIN_PENDING = 'SLFC'
+
+
+def available_for(board, pending):
+    used = set(p for p in board if p is not None) | {pending}
+    return sorted(strategy_ultimate.get_all_pieces() - used)
+
+
+class TestProofNumberSearch(unittest.TestCase):
+    def test_immediate_win(self):
+        board = ['BDEC', 'BLEC', 'BDFP', None] + [None]*12
+        move = strategy_ultimate.proof_number_search(board, 'BLFP', available_for(board, 'BLFP'))
+        self.assertEqual(move, (3, None))
+
+    def test_forced_win_is_proved(self):
+        available = available_for(FORCED_WIN_BOARD, FORCED_WIN_PENDING)
+        move = strategy_ultimate.proof_number_search(FORCED_WIN_BOARD, FORCED_WIN_PENDING, available)
+        self.assertIsNotNone(move)
+        pos, piece = move
+        self.assertIsNone(FORCED_WIN_BOARD[pos])
+        self.assertIn(piece, available)
+        # The given piece must not let the opponent win right away
+        new_board = FORCED_WIN_BOARD[:]
+        new_board[pos] = FORCED_WIN_PENDING
+        threats = strategy_ultimate.threat_lines(new_board)
+        self.assertIsNone(strategy_ultimate.completing_position(threats, piece))
+
+    def test_budget_exhausted_returns_none(self):
+        board = [None]*16
+        move = strategy_ultimate.proof_number_search(
+            board, 'BDEC', available_for(board, 'BDEC'), node_budget=100
+        )
+        self.assertIsNone(move)
+
+    def test_gen_move_plays_forced_win(self):
+        state = {'board': FORCED_WIN_BOARD[:], 'piece': FORCED_WIN_PENDING}
+        move = strategy_ultimate.gen_move(state)
+        self.assertIn(move['pos'], range(16))
+        self.assertIsNone(FORCED_WIN_BOARD[move['pos']])
+
+    def test_proof_only_tried_near_the_end(self):
+        state = {'board': FORCED_WIN_BOARD[:], 'piece': FORCED_WIN_PENDING}
+        strategy_ultimate.gen_move(state, time_limit=0.3)
+        # Proved before the search: depth 0
+        self.assertEqual((strategy_ultimate.last_search['score'], strategy_ultimate.last_search['depth']), (1000, 0))
+        saved = strategy_ultimate.PN_MAX_EMPTIES
+        strategy_ultimate.PN_MAX_EMPTIES = FORCED_WIN_BOARD.count(None) - 1
+        try:
+            strategy_ultimate.gen_move(state, time_limit=0.3)
+        finally:
+            strategy_ultimate.PN_MAX_EMPTIES = saved
+        self.assertGreater(strategy_ultimate.last_search['depth'], 0)
+
+
+class TestSplitPlySearch(unittest.TestCase):
+    def setUp(self):
+        strategy_ultimate.transposition_table.clear()
+
+    def search(self, board, pending, depth):
+        return strategy_ultimate.minimax_with_pruning(
+            board, pending, available_for(board, pending), depth,
+            float('-inf'), float('inf'), True, depth, time.time(), 60
+        )
+
+    def test_immediate_win(self):
+        board = ['BDEC', 'BLEC', 'BDFP', None] + [None]*12
+        pos, piece, score = self.search(board, 'BLFP', 2)
+        self.assertEqual((pos, score), (3, 1000))
+
+    def test_gives_safe_piece(self):
+        # Unless the top row gets blocked, any big piece lets the opponent win
+        board = ['BDEC', 'BLEC', 'BDFP', None, None, 'SLEC'] + [None]*10
+        pos, piece, _ = self.search(board, 'SDFC', 1)
+        new_board = board[:]
+        new_board[pos] = 'SDFC'
+        threats = strategy_ultimate.threat_lines(new_board)
+        self.assertIsNone(strategy_ultimate.completing_position(threats, piece))
+
+    def test_place_and_give_entries(self):
+        board = FORCED_WIN_BOARD[:]
+        self.search(board, FORCED_WIN_PENDING, 2)
+        plies = set(key[2] for key in strategy_ultimate.transposition_table)
+        self.assertEqual(plies, {strategy_ultimate.PLACE, strategy_ultimate.GIVE})
+
+
+class TestSearchReductions(unittest.TestCase):
+    # Every placement of BLEP leaves only pieces completing a line
+    LOST_BOARD = [
+        None, 'SLEC', 'BLFP', None, 'SLEP', 'SLFC', None, 'BDEC',
+        'BDFC', 'SDEC', 'SDFC', None, 'SDFP', None, None, 'BDEP',
+    ]
+    FLAGS = ('NULL_WINDOW_SEARCH', 'LATE_MOVE_REDUCTIONS', 'THREAT_EXTENSIONS')
+
+    def setUp(self):
+        self.saved = {flag: getattr(strategy_ultimate, flag) for flag in self.FLAGS}
+        strategy_ultimate.transposition_table.clear()
+
+    def tearDown(self):
+        for flag, value in self.saved.items():
+            setattr(strategy_ultimate, flag, value)
+
+    def search(self, board, pending, depth, **flags):
+        for flag in self.FLAGS:
+            setattr(strategy_ultimate, flag, flags.get(flag, False))
+        strategy_ultimate.transposition_table.clear()
+        return strategy_ultimate.search_place(
+            board, pending, available_for(board, pending), depth,
+            float('-inf'), float('inf'), True, time.time(), 60
+        )[2]
+
+    def test_null_window_search_keeps_score(self):
+        board = [None, 'SLEC', 'BLFP', None, 'SLEP', None, None, 'BDEC',
+                 None, 'SDEC', 'SDFC', None, None, None, None, 'BDEP']
+        for depth in (1, 2, 3):
+            self.assertEqual(self.search(board, 'BLEP', depth),
+                             self.search(board, 'BLEP', depth, NULL_WINDOW_SEARCH=True))
+
+    def test_late_move_reductions_keep_forced_win(self):
+        score = self.search(FORCED_WIN_BOARD[:], FORCED_WIN_PENDING, 3,
+                            NULL_WINDOW_SEARCH=True, LATE_MOVE_REDUCTIONS=True)
+        self.assertEqual(score, 1000)
+
+    def test_threat_extension_sees_past_horizon(self):
+        self.assertLess(abs(self.search(self.LOST_BOARD, 'BLEP', 0)), 1000)
+        self.assertEqual(self.search(self.LOST_BOARD, 'BLEP', 0, THREAT_EXTENSIONS=True), -1000)
+
+    def test_reductions(self):
+        self.assertEqual(strategy_ultimate.late_move_reduction(0, 4), 0)
+        self.assertEqual(strategy_ultimate.late_move_reduction(strategy_ultimate.LMR_MIN_MOVES, 1), 0)
+        self.assertEqual(strategy_ultimate.late_move_reduction(strategy_ultimate.LMR_MIN_MOVES, 4),
+                         strategy_ultimate.LMR_REDUCTION)
+
+
+class TestTranspositionSnapshot(unittest.TestCase):
+    def setUp(self):
+        strategy_ultimate.transposition_table.clear()
+        fd, self.path = tempfile.mkstemp(suffix='.tt')
+        os.close(fd)
+
+    def tearDown(self):
+        strategy_ultimate.transposition_table.clear()
+        os.remove(self.path)
+
+    def test_roundtrip(self):
+        strategy_ultimate.gen_move({'board': FORCED_WIN_BOARD[:], 'piece': 'SLFC'})
+        strategy_ultimate.minimax_with_pruning(
+            FORCED_WIN_BOARD, FORCED_WIN_PENDING, available_for(FORCED_WIN_BOARD, FORCED_WIN_PENDING), 2,
+            float('-inf'), float('inf'), True, 2, time.time(), 60
+        )
+        saved = dict(strategy_ultimate.transposition_table)
+        self.assertEqual(strategy_ultimate.save_transposition_table(self.path), len(saved))
+        strategy_ultimate.transposition_table.clear()
+        restored = strategy_ultimate.load_transposition_table(self.path, background=False)
+        self.assertEqual(restored, len(saved))
+        self.assertEqual(strategy_ultimate.transposition_table, saved)
+
+    def test_background_load(self):
+        key = (tuple(FORCED_WIN_BOARD), None, strategy_ultimate.GIVE, False)
+        table = {key: (3, -12, strategy_ultimate.LOWER, 'SLFP', 7)}
+        tt_store.save_table(table, self.path, 7, 10)
+        thread = strategy_ultimate.load_transposition_table(self.path)
+        thread.join()
+        self.assertEqual(strategy_ultimate.transposition_table[key], table[key])
+
+    def test_stale_entries_dropped(self):
+        old_key = (tuple([None]*16), 'BDEC', strategy_ultimate.PLACE, True)
+        new_key = (tuple([None]*16), 'SDEC', strategy_ultimate.PLACE, True)
+        table = {old_key: (2, 5, strategy_ultimate.EXACT, 6, 1), new_key: (2, 5, strategy_ultimate.EXACT, 6, 95)}
+        self.assertEqual(tt_store.save_table(table, self.path, 100, 10), 1)
+        restored = {}
+        tt_store.load_table(self.path, restored, 10)
+        self.assertEqual(list(restored), [new_key])
+
+    def test_missing_snapshot(self):
+        self.assertIsNone(strategy_ultimate.load_transposition_table(self.path + '.missing'))
+
+
+class TestEvaluation(unittest.TestCase):
+    BOARD = ['BDEC', 'BLEC', 'BDFC', None] + [None]*12
+
+    def test_features(self):
+        features = dict(zip(strategy_ultimate.EVAL_FEATURES, strategy_ultimate.eval_features(self.BOARD)))
+        self.assertEqual(features, {'shared1': 2, 'shared2': 0, 'shared3': 16, 'threats': 1,
+                                    'dangerous': 9, 'parity': -1, 'threat_parity': -1})
+
+    def test_default_weights_match_original_evaluation(self):
+        self.assertEqual(strategy_ultimate.weighted_score(strategy_ultimate.eval_features(self.BOARD)), 6)
+        winning = ['BDEC', 'BLEC', 'BDFC', 'SLFC'] + [None]*12
+        self.assertEqual(strategy_ultimate.evaluate_board(winning, False), -1000)
+
+    def test_load_weights(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            f.write('{"weights": {"threats": 4.4, "unknown": 1}}')
+        try:
+            weights = strategy_ultimate.load_eval_weights(path)
+        finally:
+            os.remove(path)
+        self.assertEqual(weights['threats'], 4)
+        self.assertEqual(weights['shared1'], strategy_ultimate.DEFAULT_EVAL_WEIGHTS['shared1'])
+        self.assertNotIn('unknown', weights)
+        self.assertEqual(strategy_ultimate.load_eval_weights(path), strategy_ultimate.DEFAULT_EVAL_WEIGHTS)
+
+    def test_malformed_weights_fall_back_to_defaults(self):
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            for content in ('[1, 2]', '"weights"', '{"weights": [3]}', '{"threats": "4"}',
+                            '{"threats": true}', '{"weights": {"parity": Infinity}}', '{"shared1": null}'):
+                with open(path, 'w') as f:
+                    f.write(content)
+                self.assertEqual(strategy_ultimate.load_eval_weights(path),
+                                 strategy_ultimate.DEFAULT_EVAL_WEIGHTS, content)
+        finally:
+            os.remove(path)
+
+    @unittest.skipUnless(tune_eval.np, "numpy is not installed")
+    def test_vectorized_features_match(self):
+        import random
+        rng = random.Random(5)
+        boards = []
+        for _ in range(200):
+            codes = [codec.EMPTY]*16
+            for pos, code in zip(rng.sample(range(16), rng.randint(0, 15)), rng.sample(range(16), 16)):
+                codes[pos] = code
+            boards.append(codes)
+        matrix = tune_eval.feature_matrix(boards)
+        for codes, row in zip(boards, matrix):
+            self.assertEqual(list(row), strategy_ultimate.eval_features(codec.decode_board(codes)))
+
+    @unittest.skipUnless(tune_eval.np, "numpy is not installed")
+    def test_tuning_lowers_loss(self):
+        np = tune_eval.np
+        rng = np.random.default_rng(0)
+        features = rng.integers(0, 5, size=(500, len(strategy_ultimate.EVAL_FEATURES))).astype(float)
+        targets = (features[:, 3] > 2).astype(float)
+        initial = np.ones(features.shape[1])
+        scale = tune_eval.fit_scale(features, targets, initial)
+        tuned = tune_eval.tune(features, targets, initial, scale, iterations=300)
+        self.assertLess(tune_eval.loss(features, targets, tuned, scale),
+                        tune_eval.loss(features, targets, initial, scale))
+
+
+class TestBatchAnalysis(unittest.TestCase):
+    def test_results_in_order_with_pv(self):
+        board = FORCED_WIN_BOARD[:]
+        states = [
+            {'board': [None]*16, 'piece': 'BDEC'},
+            {'board': board, 'piece': FORCED_WIN_PENDING},
+            {'board': ['BDEC']*16, 'piece': 'SLFP'},
+        ]
+        results = list(strategy_ultimate.analyze_batch(states, budget=0.1, workers=0))
+        self.assertEqual(len(results), 3)
+        self.assertIn('error', results[2])
+        for state, result in zip(states, results[:2]):
+            self.assertEqual(result['pv'][0], result['move'])
+            board = state['board'][:]
+            pending = state['piece']
+            for move in result['pv']:
+                self.assertIsNone(board[move['pos']])
+                board[move['pos']] = pending
+                pending = move['piece']
+        self.assertEqual(results[1]['score'], 1000)
+
+    def test_states_of_a_game_share_a_run(self):
+        first = {'board': [None]*16, 'piece': 'BDEC'}
+        second = {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'}
+        runs = list(strategy_ultimate._related_runs([first, second, first]))
+        self.assertEqual(runs, [[first, second], [first]])
+
+
+class TestGameSession(unittest.TestCase):
+    STATE = {
+        'board': [None, None, 'SDEP', None, None, 'SDEC', 'BLEC', None,
+                  'BDEC', 'SDFP', None, None, 'BDFP', 'SLEP', 'SLEC', 'BDEP'],
+        'piece': 'BLFP',
+    }
+
+    def setUp(self):
+        strategy_ultimate.new_game()
+        strategy_ultimate.transposition_table.clear()
+
+    def play_expected_reply(self):
+        move = strategy_ultimate.gen_move(self.STATE, time_limit=2.0)
+        reply = strategy_ultimate.session.pv[0]
+        board = self.STATE['board'][:]
+        board[move['pos']] = self.STATE['piece']
+        board[reply['pos']] = move['piece']
+        return {'board': board, 'piece': reply['piece']}
+
+    def test_expected_reply_starts_deeper(self):
+        state = self.play_expected_reply()
+        depth = strategy_ultimate.last_search['depth']
+        self.assertGreaterEqual(depth, 6)
+        move = strategy_ultimate.gen_move(state, time_limit=2.0)
+        self.assertEqual(strategy_ultimate.last_search['start_depth'], depth - 2)
+        self.assertIsNone(state['board'][move['pos']])
+
+    def test_unfinished_warm_start_plays_the_principal_variation(self):
+        state = self.play_expected_reply()
+        expected = strategy_ultimate.session.pv[1]
+        move = strategy_ultimate.gen_move(state, time_limit=1e-4)
+        self.assertIsNone(strategy_ultimate.last_search['score'])
+        self.assertEqual(move, expected)
+
+    def test_other_game_starts_cold(self):
+        self.play_expected_reply()
+        strategy_ultimate.history[(strategy_ultimate.PLACE, 0)] = 7
+        other = {'board': ['SLFP'] + [None]*15, 'piece': 'BDEC'}
+        strategy_ultimate.gen_move(other, time_limit=0.05)
+        self.assertEqual(strategy_ultimate.last_search['start_depth'], 2)
+        self.assertNotIn((strategy_ultimate.PLACE, 0), strategy_ultimate.history)
+
+
+if __name__ == '__main__':
+    unittest.main()
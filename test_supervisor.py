@@ -0,0 +1,101 @@
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import client_modular
+import supervisor
+
+
+class TestSupervisor(unittest.TestCase):
+    def test_cpu_sets(self):
+        sets = supervisor.cpu_sets(3, 1)
+        self.assertEqual(len(sets), 3)
+        if hasattr(os, 'sched_getaffinity'):
+            for cpus in sets:
+                self.assertEqual(len(cpus), 1)
+        self.assertEqual(supervisor.cpu_sets(2, 0), [None, None])
+
+    def test_ping_latency(self):
+        async def scenario():
+            async def pong(reader, writer):
+                await client_modular.readJSON(reader)
+                await client_modular.writeJSON(writer, {'response': 'pong'})
+                writer.close()
+            server = await asyncio.start_server(pong, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            rtt = await supervisor.ping('127.0.0.1', port)
+            server.close()
+            await server.wait_closed()
+            missing = await supervisor.ping('127.0.0.1', port, timeout=0.5)
+            return rtt, missing
+        rtt, missing = asyncio.run(scenario())
+        self.assertGreater(rtt, 0)
+        self.assertIsNone(missing)
+
+    @unittest.skipUnless(hasattr(os, 'sched_setaffinity'), "CPU affinity is not supported")
+    def test_client_is_pinned_from_its_start(self):
+        cpu = min(os.sched_getaffinity(0))
+        # Exits with 0 only if it runs on this CPU alone
+        check = [sys.executable, '-c', f'import os; raise SystemExit(os.sched_getaffinity(0) != {{{cpu}}})']
+        client = supervisor.SupervisedClient('pinned', check, 9, {cpu})
+        supervisor.Supervisor([client]).start(client)
+        self.assertEqual(client.proc.wait(), 0)
+        # CPUs that do not exist: the client is started unpinned
+        client = supervisor.SupervisedClient('unpinned', check, 9, {cpu, 100000})
+        supervisor.Supervisor([client]).start(client)
+        self.assertIsNotNone(client.proc.wait())
+
+    def test_crashed_client_is_restarted(self):
+        client = supervisor.SupervisedClient('crash', [sys.executable, '-c', 'raise SystemExit(3)'], 9)
+        sup = supervisor.Supervisor([client], max_backoff=0.1)
+        sup.start(client)
+        client.proc.wait()
+        asyncio.run(sup.check(client))
+        self.assertIsNone(client.proc)
+        self.assertEqual(client.restarts, 1)
+        time.sleep(0.2)
+        asyncio.run(sup.check(client))
+        self.assertIsNotNone(client.proc)
+        client.proc.wait()
+
+    def test_stopping_a_hung_client_does_not_block_the_loop(self):
+        # Ignores SIGINT, says so by creating `ready`, and never answers pings
+        ready = os.path.join(tempfile.mkdtemp(), 'ready')
+        self.addCleanup(shutil.rmtree, os.path.dirname(ready))
+        hung = [sys.executable, '-c', 'import signal, sys, time; signal.signal(signal.SIGINT, signal.SIG_IGN); '
+                                      'open(sys.argv[1], "w").close(); time.sleep(30)', ready]
+        client = supervisor.SupervisedClient('hung', hung, 9)
+        sup = supervisor.Supervisor([client], ping_timeout=0.1, max_missed_pings=1, startup_grace=0,
+                                    stop_timeout=0.5)
+        sup.start(client)
+        self.addCleanup(lambda: client.proc and client.proc.kill())
+        proc = client.proc
+        while not os.path.exists(ready):
+            time.sleep(0.01)
+
+        async def scenario():
+            ticks = 0
+
+            async def tick():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.05)
+                    ticks += 1
+            ticker = asyncio.create_task(tick())
+            await sup.check(client)
+            ticker.cancel()
+            return ticks
+
+        ticks = asyncio.run(scenario())
+        self.assertIsNotNone(proc.poll())
+        self.assertIsNone(client.proc)
+        # The loop kept running while the client was stopped and killed
+        self.assertGreaterEqual(ticks, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
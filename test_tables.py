@@ -0,0 +1,59 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import tables
+
+
+class TestTables(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_roundtrip(self):
+        computed = tables.compute_tables()
+        tables.write_tables(self.path, computed)
+        loaded = tables.load_tables(self.path)
+        self.assertEqual(set(loaded), set(computed))
+        for name, (_, items) in computed.items():
+            self.assertEqual(list(loaded[name]), items)
+
+    def test_module_tables_match_computed(self):
+        computed = tables.compute_tables()
+        self.assertEqual([i for line in tables.LINES for i in line], computed['lines'][1])
+        self.assertEqual(len(tables.PERMUTATIONS), 32)
+        self.assertEqual(list(tables.COMPLETING), computed['completing'][1])
+
+    def test_stale_or_missing_cache_is_ignored(self):
+        tables.write_tables(self.path, tables.compute_tables())
+        with open(self.path, 'r+b') as f:
+            f.write(struct.pack('<4sH', tables.MAGIC, tables.VERSION + 1))
+        self.assertIsNone(tables.load_tables(self.path))
+        self.assertIsNone(tables.load_tables(self.path + '.missing'))
+
+    def test_layout_matches_computed(self):
+        computed = tables.compute_tables()
+        self.assertEqual(tables.LAYOUT, {name: (fmt, len(items)) for name, (fmt, items) in computed.items()})
+
+    def test_truncated_cache_is_ignored(self):
+        tables.write_tables(self.path, tables.compute_tables())
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        for size in range(len(data)):
+            with open(self.path, 'wb') as f:
+                f.write(data[:size])
+            self.assertIsNone(tables.load_tables(self.path), size)
+
+    def test_table_of_another_size_is_ignored(self):
+        computed = tables.compute_tables()
+        computed['popcount'] = ('B', computed['popcount'][1][:8])
+        tables.write_tables(self.path, computed)
+        self.assertIsNone(tables.load_tables(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
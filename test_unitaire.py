@@ -1,6 +1,9 @@
+import os
+import tempfile
 import unittest
 import client
 import strategy
+from move_cache import MoveCache
 
 class TestClientAndStrategy(unittest.TestCase):
     def test_check_server_false(self):
@@ -22,5 +25,47 @@ class TestClientAndStrategy(unittest.TestCase):
         self.assertIsInstance(move['piece'], str)
         self.assertEqual(len(move['piece']), 4)
 
+class TestMoveCache(unittest.TestCase):
+    def test_symmetric_state_hits(self):
+        cache = MoveCache(8)
+        state = {'board': ['BDEC'] + [None]*15, 'piece': 'SLFP'}
+        self.assertIsNone(cache.lookup(state))
+        cache.store(state, {'pos': 5, 'piece': 'BLEC'})
+        # Same position rotated by a quarter turn: the corner moves to square 3
+        rotated = {'board': [None]*3 + ['BDEC'] + [None]*12, 'piece': 'SLFP'}
+        move = cache.lookup(rotated)
+        self.assertIsNotNone(move)
+        self.assertIsNone(rotated['board'][move['pos']])
+        self.assertNotIn(move['piece'], ('BDEC', 'SLFP'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_bounded(self):
+        cache = MoveCache(2)
+        # Boards with a different number of pieces are never symmetric
+        for placed in range(3):
+            board = ['BDEC', 'SLFP', 'BLEC'][:placed] + [None]*(16 - placed)
+            cache.store({'board': board, 'piece': 'SDFP'}, {'pos': 15, 'piece': None})
+        self.assertEqual(len(cache), 2)
+
+    def test_save_and_load(self):
+        cache = MoveCache(8)
+        state = {'board': [None]*16, 'piece': None}
+        cache.store(state, {'pos': None, 'piece': 'SDFP'})
+        fd, path = tempfile.mkstemp(suffix='.json')
+        os.close(fd)
+        try:
+            cache.save(path)
+            loaded = MoveCache(8)
+            self.assertEqual(loaded.load(path), 1)
+            self.assertEqual(loaded.lookup(state), {'pos': None, 'piece': 'SDFP'})
+        finally:
+            os.remove(path)
+
+    def test_malformed_state_is_not_cached(self):
+        cache = MoveCache(8)
+        self.assertIsNone(cache.lookup({'board': ['XXXX'] + [None]*15, 'piece': None}))
+        self.assertEqual(cache.stats()['misses'], 0)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,126 @@
+"""Binary snapshots of strategy_ultimate's transposition table.
+
+Keys (board, pending, ply, player_turn) are packed into 11 bytes, entries
+(depth, value, flag, best move, generation) into 7 more:
+
+    header: magic 'QTTS', version, generation, count
+    count records of 18 bytes
+
+Snapshots are written atomically and read back through a read-only
+memory map, optionally from a background thread so the caller is not
+blocked while the table is restored. Entries more than max_age
+generations older than the snapshot are dropped.
+"""
+
+import mmap
+import os
+import struct
+import threading
+
+from codec import POSITION_KEY_BYTES, code_to_piece, decode_board, encode_board, pack_position, piece_to_code, unpack_position
+
+MAGIC = b'QTTS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+ENTRY = struct.Struct('<bhBBH')
+RECORD_SIZE = POSITION_KEY_BYTES + ENTRY.size
+NO_MOVE = 255
+GENERATIONS = 1 << 16
+
+def encode_key(key):
+    """Pack a (board, pending, ply, player_turn) key into an integer."""
+    board, pending, ply, player_turn = key
+    packed = pack_position(encode_board(board), piece_to_code(pending))
+    return packed | ply << 85 | int(player_turn) << 86
+
+def decode_key(packed):
+    """Inverse of encode_key."""
+    codes, pending = unpack_position(packed & ((1 << 85) - 1))
+    return (tuple(decode_board(codes)), code_to_piece(pending), (packed >> 85) & 1, bool(packed >> 86))
+
+def encode_move(best):
+    """Byte code of a best move: a square, a piece code or NO_MOVE."""
+    if best is None:
+        return NO_MOVE
+    if isinstance(best, str):
+        return piece_to_code(best)
+    return best
+
+def decode_move(code, ply):
+    """Inverse of encode_move for an entry of the given ply kind."""
+    if code == NO_MOVE:
+        return None
+    # place plies store a square, give plies a piece
+    return code_to_piece(code) if ply == 1 else code
+
+def age(generation, entry_generation):
+    """Number of generations between an entry and the current generation."""
+    return (generation - entry_generation) % GENERATIONS
+
+def save_table(table, path, generation, max_age):
+    """Write table to path; returns the number of entries written."""
+    records = []
+    for key, (depth, value, flag, best, entry_generation) in list(table.items()):
+        if age(generation, entry_generation) > max_age or not -32768 <= value <= 32767:
+            continue
+        records.append(
+            encode_key(key).to_bytes(POSITION_KEY_BYTES, 'big')
+            + ENTRY.pack(min(depth, 127), int(value), flag, encode_move(best), entry_generation)
+        )
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, generation % GENERATIONS, len(records)))
+        f.write(b''.join(records))
+    os.replace(tmp, path)
+    return len(records)
+
+def read_generation(path):
+    """Generation stored in a snapshot, or None if there is no valid snapshot."""
+    try:
+        with open(path, 'rb') as f:
+            magic, version, generation, _ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC or version != VERSION:
+        return None
+    return generation
+
+def load_table(path, table, max_age, max_entries=None):
+    """
+    Merge a snapshot into table without overwriting live entries, stopping
+    once the table holds max_entries entries (None = no limit).
+    Returns the number of entries restored.
+    """
+    generation = read_generation(path)
+    if generation is None:
+        return 0
+    restored = 0
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            _, _, _, count = HEADER.unpack_from(data, 0)
+            offset = HEADER.size
+            for _ in range(count):
+                if offset + RECORD_SIZE > len(data):
+                    break
+                if max_entries is not None and len(table) >= max_entries:
+                    break
+                packed = int.from_bytes(data[offset:offset + POSITION_KEY_BYTES], 'big')
+                depth, value, flag, best, entry_generation = ENTRY.unpack_from(data, offset + POSITION_KEY_BYTES)
+                offset += RECORD_SIZE
+                if age(generation, entry_generation) > max_age:
+                    continue
+                key = decode_key(packed)
+                entry = (depth, value, flag, decode_move(best, key[2]), entry_generation)
+                if table.setdefault(key, entry) is entry:
+                    restored += 1
+    return restored
+
+def load_table_in_background(path, table, max_age, on_done=None, max_entries=None):
+    """Run load_table in a daemon thread; on_done(restored) is called when finished."""
+    def run():
+        restored = load_table(path, table, max_age, max_entries)
+        if on_done is not None:
+            on_done(restored)
+    thread = threading.Thread(target=run, name='tt-restore', daemon=True)
+    thread.start()
+    return thread
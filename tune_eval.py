@@ -0,0 +1,144 @@
+"""Texel-style tuning of the strategy_ultimate evaluation weights.
+
+The features of strategy_ultimate.EVAL_FEATURES are computed with NumPy
+for every position of one or more self-play datasets (selfplay.py). The
+weights are then fitted so that sigmoid(scale * evaluation) predicts the
+game outcome seen from the side to move (1 win, 0.5 draw, 0 loss):
+
+1. the scale is fitted with the current weights, so evaluation units are kept;
+2. the weights minimize the mean squared prediction error by full-batch
+   gradient descent (Adam), every step being a single matrix product.
+
+The weights are rescaled to integers (the transposition table stores
+int16 values) and written to eval_weights.json, which strategy_ultimate
+loads at import.
+"""
+
+import argparse
+import json
+import time
+
+import strategy_ultimate
+from codec import EMPTY
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError("tune_eval needs numpy (pip install numpy)")
+
+def feature_matrix(boards):
+    """EVAL_FEATURES of every board of an (N, 16) array of piece codes, as an (N, F) float array."""
+    require_numpy()
+    boards = np.asarray(boards, dtype=np.int64)
+    squares = boards[:, np.array(strategy_ultimate.LINES)]
+    empty = squares == EMPTY
+    ones = np.bitwise_and.reduce(np.where(empty, 15, squares), axis=2)
+    zeros = np.bitwise_and.reduce(np.where(empty, 15, ~squares & 15), axis=2)
+    popcount = np.array(strategy_ultimate.POPCOUNT)
+    shared = popcount[ones] + popcount[zeros]
+    empties = empty.sum(axis=2)
+
+    threat = (empties == 1) & (shared > 0)
+    completing_table = np.array(strategy_ultimate.COMPLETING, dtype=np.int64)
+    completing = np.where(threat, completing_table[ones] | completing_table[16 + zeros], 0)
+    completing = np.bitwise_or.reduce(completing, axis=1)
+    on_board = np.bitwise_or.reduce(np.where(boards != EMPTY, 1 << np.minimum(boards, 15), 0), axis=1)
+    completing &= ~on_board
+    dangerous = sum((completing >> bit) & 1 for bit in range(16))
+
+    parity = np.where((boards == EMPTY).sum(axis=1) % 2 == 0, 1, -1)
+    threats = threat.sum(axis=1)
+    columns = {
+        'shared1': (shared * (empties == 1)).sum(axis=1),
+        'shared2': (shared * (empties == 2)).sum(axis=1),
+        'shared3': (shared * (empties == 3)).sum(axis=1),
+        'threats': threats,
+        'dangerous': dangerous,
+        'parity': parity,
+        'threat_parity': threats * parity,
+    }
+    return np.stack([columns[name] for name in strategy_ultimate.EVAL_FEATURES], axis=1).astype(np.float64)
+
+def load_positions(directories):
+    """Features and targets (1 win, 0.5 draw, 0 loss for the side to move) of self-play datasets."""
+    require_numpy()
+    import selfplay
+    data = np.concatenate([selfplay.load_dataset(d) for d in directories])
+    return feature_matrix(data['board']), (data['outcome'].astype(np.float64) + 1) / 2
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+def loss(features, targets, weights, scale):
+    return float(np.mean((sigmoid(scale * (features @ weights)) - targets) ** 2))
+
+def fit_scale(features, targets, weights):
+    """Scale minimizing the loss of fixed weights (golden-section search on its logarithm)."""
+    low, high = np.log(1e-4), np.log(10.0)
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(60):
+        a = high - ratio * (high - low)
+        b = low + ratio * (high - low)
+        if loss(features, targets, weights, np.exp(a)) < loss(features, targets, weights, np.exp(b)):
+            high = b
+        else:
+            low = a
+    return float(np.exp((low + high) / 2))
+
+def tune(features, targets, weights, scale, iterations=2000, learning_rate=0.05, l2=0.0):
+    """Weights minimizing the loss for a fixed scale (full-batch Adam)."""
+    weights = np.array(weights, dtype=np.float64)
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    for step in range(1, iterations + 1):
+        p = sigmoid(scale * (features @ weights))
+        gradient = features.T @ ((p - targets) * p * (1 - p)) * (2 * scale / len(targets)) + 2 * l2 * weights
+        m = 0.9 * m + 0.1 * gradient
+        v = 0.999 * v + 0.001 * gradient ** 2
+        weights -= learning_rate * (m / (1 - 0.9 ** step)) / (np.sqrt(v / (1 - 0.999 ** step)) + 1e-12)
+    return weights
+
+def integer_weights(weights, max_weight):
+    """Weights rescaled so the largest is max_weight, rounded; returns (weights, factor)."""
+    largest = float(np.max(np.abs(weights)))
+    factor = max_weight / largest if largest else 1.0
+    return [int(round(w * factor)) for w in weights], factor
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune the strategy_ultimate evaluation weights')
+    parser.add_argument('data', nargs='+', help='Self-play dataset directories')
+    parser.add_argument('--out', default=strategy_ultimate.EVAL_WEIGHTS_PATH, help='Weights file to write')
+    parser.add_argument('--iterations', type=int, default=2000, help='Gradient steps')
+    parser.add_argument('--learning-rate', type=float, default=0.05, help='Adam step size')
+    parser.add_argument('--l2', type=float, default=0.0, help='L2 regularization of the weights')
+    parser.add_argument('--max-weight', type=int, default=16, help='Largest integer weight written')
+    args = parser.parse_args()
+
+    require_numpy()
+    start = time.time()
+    features, targets = load_positions(args.data)
+    initial = np.array([strategy_ultimate.eval_weights[name] for name in strategy_ultimate.EVAL_FEATURES],
+                       dtype=np.float64)
+    scale = fit_scale(features, targets, initial)
+    before = loss(features, targets, initial, scale)
+    tuned = tune(features, targets, initial, scale, args.iterations, args.learning_rate, args.l2)
+    after = loss(features, targets, tuned, scale)
+    weights, factor = integer_weights(tuned, args.max_weight)
+    with open(args.out, 'w', encoding='utf8') as f:
+        json.dump({
+            'weights': dict(zip(strategy_ultimate.EVAL_FEATURES, weights)),
+            'scale': scale / factor,
+            'positions': len(targets),
+            'loss': after,
+        }, f, indent=2)
+    print(f"[TUNE] {len(targets)} positions, loss {before:.5f} -> {after:.5f} "
+          f"en {time.time() - start:.1f}s; poids écrits dans {args.out}")
+    for name, weight in zip(strategy_ultimate.EVAL_FEATURES, weights):
+        print(f"  {name}: {weight}")
+
+if __name__ == '__main__':
+    main()